@@ -1,4 +1,5 @@
-import google.generativeai as genai
+from helpers.obtem_modelo_gemini import obtem_modelo_gemini
+from helpers.gera_texto_gemini import gera_texto_gemini
 
 def agente0_clarifica_pergunta(pergunta_original, api_key):
     """Usa o Gemini para corrigir erros de digitação e clarificar a intenção."""
@@ -6,8 +7,8 @@ def agente0_clarifica_pergunta(pergunta_original, api_key):
         return pergunta_original
 
     try:
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-2.5-flash')
+        # Cliente Gemini reusado entre consultas (configurado uma vez por API key)
+        model = obtem_modelo_gemini(api_key)
         
         prompt = f"""
 # INSTRUÇÕES:
@@ -25,9 +26,9 @@ SAÍDA: "Do que se trata o arquivo?"
 
 # CONSULTA CLARIFICADA:
 """
-        response = model.generate_content(prompt)
+        texto = gera_texto_gemini(model, prompt, nome_prompt='agente0_clarificacao')
         # Limita para garantir que seja apenas uma frase
-        return response.text.strip().split('\n')[0]
+        return texto.strip().split('\n')[0]
     
     except Exception:
         # Em caso de erro, retorna a pergunta original para não bloquear o fluxo
@@ -1,9 +1,11 @@
 import os
 import io
 import zipfile
+import itertools
 import pandas as pd
 import streamlit as st
-import google.generativeai as genai
+from helpers.obtem_modelo_gemini import obtem_modelo_gemini
+from helpers.gera_texto_gemini import gera_texto_gemini
 from helpers.normalize_text import normalize_text
 
 def agente1_identifica_arquivos(zip_bytes):
@@ -30,8 +32,10 @@ def agente1_identifica_arquivos(zip_bytes):
                             header = temp_df.columns.tolist()
                         
                         elif ext == '.xlsx':
-                            temp_df = pd.read_excel(data_in_memory, nrows=0)
-                            header = temp_df.columns.tolist()
+                            # Lê apenas a primeira linha da planilha em modo streaming
+                            wb, linhas = _abre_linhas_xlsx(data_in_memory)
+                            header = _cabecalho_xlsx(next(linhas, ()))
+                            wb.close()
                         
                         elif ext == '.txt':
                             data_in_memory.seek(0)
@@ -74,9 +78,8 @@ def agente1_interpreta_contexto_arquivo(api_key, file_info_list):
 
     contextos = {}
     try:
-        genai.configure(api_key=api_key)
-        # MODELO ATUALIZADO PARA gemini-2.5-flash
-        model = genai.GenerativeModel('gemini-2.5-flash')
+        # Cliente Gemini reusado entre consultas (configurado uma vez por API key)
+        model = obtem_modelo_gemini(api_key)
         
         prompt_parts = ["# PERSONA: Você é um Analista de Dados Sênior. Sua única função é INFERIR o CONTEÚDO e CONTEXTO de um arquivo de dados baseado no NOME e CABEÇALHO. DÊ UMA DESCRIÇÃO DE UMA ÚNICA FRASE CURTA. \n\n# ARQUIVOS PARA ANÁLISE:\n"]
         
@@ -85,9 +88,9 @@ def agente1_interpreta_contexto_arquivo(api_key, file_info_list):
         
         prompt_parts.append("\n# INFERÊNCIA:\nResponda APENAS com uma lista numerada, onde cada item é uma descrição concisa (uma frase) para o respectivo arquivo, focando no que ele representa. Ex: 'O arquivo representa dados de transações de cartão de crédito e a coluna CLASS indica fraude.'\n")
         
-        response = model.generate_content("".join(prompt_parts))
+        texto = gera_texto_gemini(model, "".join(prompt_parts), nome_prompt='agente1_contexto_arquivo')
         
-        descricoes = [line.strip() for line in response.text.split('\n') if line.strip().startswith(('1.', '2.', '3.', '-', '*')) or (len(line.strip()) > 5 and i > 0)]
+        descricoes = [line.strip() for line in texto.split('\n') if line.strip().startswith(('1.', '2.', '3.', '-', '*')) or (len(line.strip()) > 5 and i > 0)]
         
         for i, info in enumerate(file_info_list):
             if i < len(descricoes):
@@ -104,94 +107,207 @@ def agente1_interpreta_contexto_arquivo(api_key, file_info_list):
             
     return contextos
 
+def _detecta_separador_txt(first_line):
+    """Infere o separador de um arquivo TXT a partir da primeira linha."""
+    separator = r'\s+'
+    if ',' in first_line:
+        separator = ','
+    elif ';' in first_line:
+        separator = ';'
+    return separator
+
+def _itera_chunks_texto(zip_bytes, selected_file_name, start_row, chunk_size):
+    """
+    Lê um CSV/TXT do ZIP em lotes, descomprimindo o membro uma única vez.
+    O iterador do pd.read_csv (engine C) permanece aberto entre os lotes.
+    """
+    ext = os.path.splitext(selected_file_name)[1].lower()
+    skiprows = range(1, start_row + 1) if start_row > 0 else None
+
+    with zipfile.ZipFile(io.BytesIO(zip_bytes), "r") as z:
+        separator = ','
+        if ext == '.txt':
+            with z.open(selected_file_name, 'r') as file_in_zip:
+                first_line = io.TextIOWrapper(file_in_zip, encoding='utf-8', errors='ignore').readline().strip()
+            separator = _detecta_separador_txt(first_line)
+
+        with z.open(selected_file_name, 'r') as file_in_zip:
+            leitor = pd.read_csv(
+                file_in_zip,
+                sep=separator,
+                skiprows=skiprows,
+                chunksize=chunk_size,
+                encoding='utf-8',
+                engine='c',
+                on_bad_lines='skip'
+            )
+            with leitor:
+                for chunk in leitor:
+                    yield chunk
+
+def _abre_linhas_xlsx(xlsx_bytes_in_memory):
+    """
+    Abre a primeira planilha em modo read-only (streaming) e retorna o workbook
+    e um iterador sobre as linhas não vazias (apenas valores).
+    """
+    from openpyxl import load_workbook
+
+    wb = load_workbook(xlsx_bytes_in_memory, read_only=True, data_only=True)
+    ws = wb.worksheets[0]
+    linhas = (
+        linha for linha in ws.iter_rows(values_only=True)
+        if any(valor is not None for valor in linha)
+    )
+    return wb, linhas
+
+def _cabecalho_xlsx(primeira_linha):
+    """Converte a primeira linha da planilha em nomes de coluna (como o pandas)."""
+    return [
+        str(valor) if valor is not None else f"Unnamed: {i}"
+        for i, valor in enumerate(primeira_linha)
+    ]
+
+def _itera_chunks_xlsx(zip_bytes, selected_file_name, start_row, chunk_size):
+    """
+    Percorre as linhas da planilha uma única vez (openpyxl read-only) e gera
+    DataFrames de chunk_size linhas, sem reprocessar o XML a cada lote.
+    """
+    with zipfile.ZipFile(io.BytesIO(zip_bytes), "r") as z:
+        with z.open(selected_file_name, 'r') as file_in_zip:
+            xlsx_bytes_in_memory = io.BytesIO(file_in_zip.read())
+
+    wb, linhas = _abre_linhas_xlsx(xlsx_bytes_in_memory)
+    try:
+        header = _cabecalho_xlsx(next(linhas, ()))
+        num_cols = len(header)
+        linhas = itertools.islice(linhas, start_row, None)
+
+        while True:
+            lote = list(itertools.islice(linhas, chunk_size))
+            if not lote:
+                break
+            # Linhas curtas são completadas com None para manter o esquema
+            lote = [tuple(linha[:num_cols]) + (None,) * (num_cols - len(linha)) for linha in lote]
+            yield pd.DataFrame.from_records(lote, columns=header)
+    finally:
+        wb.close()
+
+def _fecha_leitor_chunks():
+    """Fecha o leitor de chunks ativo (se houver) e libera o membro do ZIP."""
+    leitor = st.session_state.get('leitor_chunks')
+    if leitor is not None:
+        leitor['iterador'].close()
+    st.session_state['leitor_chunks'] = None
+
+def _itera_chunks_arquivo(zip_bytes, selected_file_name, start_row, chunk_size):
+    """Seleciona o leitor em streaming adequado à extensão do arquivo."""
+    ext = os.path.splitext(selected_file_name)[1].lower()
+    if ext == '.xlsx':
+        return _itera_chunks_xlsx(zip_bytes, selected_file_name, start_row, chunk_size)
+    return _itera_chunks_texto(zip_bytes, selected_file_name, start_row, chunk_size)
+
+def _obtem_leitor_chunks(zip_bytes, selected_file_name, start_row, nrows):
+    """
+    Reaproveita o leitor guardado no session_state quando ele está posicionado
+    exatamente em start_row; caso contrário abre um novo a partir dessa linha.
+    """
+    leitor = st.session_state.get('leitor_chunks')
+    if (
+        leitor is None
+        or leitor['zip_bytes'] is not zip_bytes
+        or leitor['arquivo'] != selected_file_name
+        or leitor['proxima_linha'] != start_row
+        or leitor['tamanho_chunk'] != nrows
+    ):
+        _fecha_leitor_chunks()
+        leitor = {
+            'zip_bytes': zip_bytes,
+            'arquivo': selected_file_name,
+            'proxima_linha': start_row,
+            'tamanho_chunk': nrows,
+            'iterador': _itera_chunks_arquivo(zip_bytes, selected_file_name, start_row, nrows)
+        }
+        st.session_state['leitor_chunks'] = leitor
+    return leitor
+
+def agente1_conta_linhas_arquivo(zip_bytes, selected_file_name):
+    """
+    Retorna o total de linhas de dados (sem cabeçalho) do arquivo no ZIP.
+    Para XLSX usa a dimensão declarada na planilha; retorna None se indisponível.
+    """
+    ext = os.path.splitext(selected_file_name)[1].lower()
+
+    with zipfile.ZipFile(io.BytesIO(zip_bytes), "r") as z:
+        with z.open(selected_file_name, 'r') as file_in_zip:
+            if ext in ['.csv', '.txt']:
+                # Subtrai 1 para o cabeçalho
+                return sum(1 for line in io.TextIOWrapper(file_in_zip, encoding='utf-8', errors='ignore')) - 1
+
+            if ext == '.xlsx':
+                from openpyxl import load_workbook
+
+                wb = load_workbook(io.BytesIO(file_in_zip.read()), read_only=True, data_only=True)
+                try:
+                    max_row = wb.worksheets[0].max_row
+                finally:
+                    wb.close()
+                if max_row:
+                    return max_row - 1
+
+    return None
+
 def agente1_processa_arquivo_chunk(zip_bytes, selected_file_name, start_row, nrows, df_columns, expected_num_cols):
     """
     Processa um chunk do arquivo selecionado (CSV, XLSX, TXT) dentro do ZIP.
+    O arquivo é lido por um leitor contínuo mantido entre as chamadas.
     """
     ext = os.path.splitext(selected_file_name)[1].lower()
     
     try:
-        with zipfile.ZipFile(io.BytesIO(zip_bytes), "r") as z:
-            with z.open(selected_file_name, 'r') as file_in_zip:
-                file_bytes_in_memory = io.BytesIO(file_in_zip.read())
-                
-                chunk = pd.DataFrame()
-                
-                # Configurações de leitura
-                skiprows = range(1, start_row + 1) if start_row > 0 else 0
-                header = None if start_row > 0 else 'infer'
-
-                # Leitura de CSV
-                if ext == '.csv':
-                    chunk = pd.read_csv(
-                        file_bytes_in_memory,
-                        skiprows=skiprows,
-                        nrows=nrows,
-                        low_memory=False,
-                        header=header,
-                        encoding='utf-8',
-                        on_bad_lines='skip'
-                    )
-                
-                # Leitura de XLSX
-                elif ext == '.xlsx':
-                    chunk = pd.read_excel(file_bytes_in_memory, header=header, skiprows=skiprows, nrows=nrows)
-                        
-                # Leitura de TXT
-                elif ext == '.txt':
-                    # Tenta inferir o separador para leitura do chunk
-                    file_bytes_in_memory.seek(0)
-                    first_line = io.TextIOWrapper(file_bytes_in_memory, encoding='utf-8', errors='ignore').readline().strip()
-                    file_bytes_in_memory.seek(0)
-                    
-                    separator = '\s+'
-                    if ',' in first_line:
-                        separator = ','
-                    elif ';' in first_line:
-                        separator = ';'
-                        
-                    chunk = pd.read_csv(
-                        file_bytes_in_memory,
-                        skiprows=skiprows,
-                        nrows=nrows,
-                        low_memory=False,
-                        header=header,
-                        encoding='utf-8',
-                        sep=separator,
-                        engine='python',
-                        on_bad_lines='skip'
-                    )
-
-                if chunk.empty:
-                    return None, "Processamento de todos os lotes concluído."
-
-                # --- TRATAMENTO DE COLUNAS/ESQUEMA ---
-                if start_row == 0:
-                    # Captura o cabeçalho original (antes da normalização)
-                    if df_columns is None:
-                        st.session_state['df_columns'] = chunk.columns
-                    expected_num_cols = len(st.session_state['df_columns'])
-                    
+        chunk = pd.DataFrame()
+
+        # Leitura contínua (CSV/TXT via pd.read_csv, XLSX via openpyxl read-only)
+        if ext in ['.csv', '.xlsx', '.txt']:
+            leitor = _obtem_leitor_chunks(zip_bytes, selected_file_name, start_row, nrows)
+            chunk = next(leitor['iterador'], None)
+            if chunk is None:
+                _fecha_leitor_chunks()
+                return None, "Processamento de todos os lotes concluído."
+            leitor['proxima_linha'] += len(chunk)
+            if len(chunk) < nrows:
+                _fecha_leitor_chunks()
+
+        if chunk.empty:
+            return None, "Processamento de todos os lotes concluído."
+
+        # --- TRATAMENTO DE COLUNAS/ESQUEMA ---
+        if start_row == 0:
+            # Captura o cabeçalho original (antes da normalização)
+            if df_columns is None:
+                st.session_state['df_columns'] = chunk.columns
+            expected_num_cols = len(st.session_state['df_columns'])
+            
+        
+        if df_columns is not None:
+            # Correção de Length Mismatch para chunks subsequentes
+            current_cols = chunk.shape[1]
+            
+            if current_cols < expected_num_cols:
+                for i in range(current_cols, expected_num_cols):
+                    chunk[f'TEMP_FILL_{i}'] = pd.NA
+                chunk = chunk.iloc[:, :expected_num_cols]
+            
+            elif current_cols > expected_num_cols:
+                chunk = chunk.iloc[:, :expected_num_cols]
                 
-                if df_columns is not None:
-                    # Correção de Length Mismatch para chunks subsequentes
-                    current_cols = chunk.shape[1]
-                    
-                    if current_cols < expected_num_cols:
-                        for i in range(current_cols, expected_num_cols):
-                            chunk[f'TEMP_FILL_{i}'] = pd.NA
-                        chunk = chunk.iloc[:, :expected_num_cols]
-                    
-                    elif current_cols > expected_num_cols:
-                        chunk = chunk.iloc[:, :expected_num_cols]
-                        
-                    # Atribui os nomes de coluna originais (normalizados)
-                    chunk.columns = [normalize_text(col.strip().upper()) for col in st.session_state['df_columns']]
-                else:
-                    # Normalização das colunas
-                    chunk.columns = [normalize_text(col.strip().upper()) for col in chunk.columns]
+            # Atribui os nomes de coluna originais (normalizados)
+            chunk.columns = [normalize_text(col.strip().upper()) for col in st.session_state['df_columns']]
+        else:
+            # Normalização das colunas
+            chunk.columns = [normalize_text(col.strip().upper()) for col in chunk.columns]
 
-                return chunk, "Dados carregados e prontos para análise!"
+        return chunk, "Dados carregados e prontos para análise!"
             
     except Exception as e:
+        _fecha_leitor_chunks()
         return None, f"Erro ao processar o arquivo: header must be integer or list of integers {e}"
\ No newline at end of file
@@ -1,9 +1,62 @@
+import numpy as np
 import pandas as pd
-import google.generativeai as genai
+from helpers.obtem_modelo_gemini import obtem_modelo_gemini
+from helpers.gera_texto_gemini import gera_texto_gemini
 from helpers.normalize_text import normalize_text
+from helpers.codigo_tabela_literal import codigo_tabela_literal
+from modules.perfil_colunas import correlacao_perfil_df, histograma_perfil, resumo_perfil_df
+from modules.orcamento_prompt import monta_contexto_prompt
+
+def _codigo_histogramas_perfil(perfil, colunas):
+    """
+    Código que desenha os histogramas das 'colunas' a partir do perfil da ingestão (sem
+    varrer o df no sandbox). Retorna None se alguma coluna não tiver histograma no perfil.
+    """
+    histogramas = {}
+    for col in colunas:
+        if col not in perfil['colunas']:
+            return None
+        bordas, contagens = histograma_perfil(perfil, col)
+        if bordas is None:
+            return None
+        # Descarta os bins vazios nas pontas (a faixa do perfil dobra ao crescer)
+        preenchidos = np.nonzero(contagens)[0]
+        if len(preenchidos) > 0:
+            bordas = bordas[preenchidos[0]:preenchidos[-1] + 2]
+            contagens = contagens[preenchidos[0]:preenchidos[-1] + 1]
+        histogramas[str(col)] = ([float(f"{borda:.6g}") for borda in bordas], [int(c) for c in contagens])
+
+    return f"""
+import numpy as np
+
+# Histogramas do perfil calculado durante a ingestão: {{coluna: (bordas, contagens)}}
+histogramas = {histogramas!r}
+num_plots = len(histogramas)
+
+# Layout dinâmico (max 4 colunas) em uma única figura
+n_cols = min(4, num_plots)
+n_rows = int(np.ceil(num_plots / n_cols))
+fig, axes = plt.subplots(nrows=n_rows, ncols=n_cols, figsize=(4 * n_cols, 3 * n_rows))
+axes = np.atleast_1d(axes).flatten()
+
+for i, (col, (bordas, contagens)) in enumerate(histogramas.items()):
+    axes[i].bar(bordas[:-1], contagens, width=np.diff(bordas), align="edge", edgecolor="black")
+    axes[i].set_title(col, fontsize=10)
+    axes[i].tick_params(axis='x', rotation=45)
 
-def agente2_gera_codigo_pandas_eda(pergunta, api_key, df, retrieved_context=None, historico_conclusoes=None, file_context=None):
-    """Gera código Pandas para EDA e a conclusão em linguagem natural."""
+for j in range(num_plots, n_rows * n_cols):
+    fig.delaxes(axes[j])
+
+plt.suptitle("Distribuição de Dados - Histogramas para Colunas Numéricas", y=1.02, fontsize=14)
+plt.tight_layout()
+"""
+
+def agente2_gera_codigo_pandas_eda(pergunta, api_key, df, retrieved_context=None, historico_conclusoes=None, file_context=None, perfil=None, gerar_conclusoes=True):
+    """
+    Gera código Pandas para EDA e a conclusão em linguagem natural.
+    Com gerar_conclusoes=False a conclusão da análise geral fica a cargo de
+    agente2_gera_conclusoes (retorna None no lugar dela).
+    """
     if df is None:
         return "Erro: DataFrame não carregado. Faça o upload do arquivo primeiro.", None
 
@@ -11,11 +64,12 @@ def agente2_gera_codigo_pandas_eda(pergunta, api_key, df, retrieved_context=None
         return "Erro: Chave da API do Gemini não fornecida.", None
 
     try:
-        genai.configure(api_key=api_key)
-        # MODELO ATUALIZADO PARA gemini-2.5-flash
-        model = genai.GenerativeModel('gemini-2.5-flash')
+        # Cliente Gemini reusado entre consultas (configurado uma vez por API key)
+        model = obtem_modelo_gemini(api_key)
 
-        schema = '\n'.join([f"- {c} (dtype: {df[c].dtype})" for c in df.columns])
+        # Esquema, perfil, contexto RAG e histórico dentro do orçamento de tokens do prompt
+        contexto_prompt = monta_contexto_prompt(pergunta, df, retrieved_context, historico_conclusoes, perfil)
+        schema = contexto_prompt['esquema']
 
         pergunta_limpa = normalize_text(pergunta).upper()
         
@@ -34,6 +88,23 @@ print(resultado_df.to_string(index=False)) # Imprime sem o índice para limpeza
             conclusoes = "A análise revela o tipo de dado de cada coluna no conjunto de dados, auxiliando na verificação de consistência e na preparação para modelagem."
             return codigo_gerado, conclusoes
             
+        # 1.1 ESTATÍSTICAS DESCRITIVAS, NULOS E CORRELAÇÃO (respondidas pelo perfil, se ele cobre todo o df)
+        if perfil is not None and perfil.get('linhas') == len(df):
+            if any(keyword in pergunta_limpa for keyword in ["ESTATISTICAS DESCRITIVAS", "DESCRIBE", "RESUMO ESTATISTICO", "MEDIDAS DE TENDENCIA"]):
+                conclusoes = "O resumo estatístico de cada coluna (contagem, nulos, distintos, média, desvio padrão, mínimo, quartis e máximo) foi obtido do perfil calculado durante a ingestão; os quartis e distintos são aproximados."
+                return codigo_tabela_literal(resumo_perfil_df(perfil)), conclusoes
+
+            if any(keyword in pergunta_limpa for keyword in ["VALORES NULOS", "VALORES AUSENTES", "DADOS FALTANTES", "VALORES FALTANTES"]):
+                nulos_df = resumo_perfil_df(perfil)[['contagem', 'nulos']].copy()
+                nulos_df['percentual_nulos'] = (100 * nulos_df['nulos'] / perfil['linhas']).round(2)
+                conclusoes = f"A contagem de valores nulos por coluna foi obtida do perfil calculado durante a ingestão ({int(nulos_df['nulos'].sum())} nulos no total)."
+                return codigo_tabela_literal(nulos_df), conclusoes
+
+            correlacao_df = correlacao_perfil_df(perfil)
+            if correlacao_df is not None and "CORRELACAO" in pergunta_limpa and not any(k in pergunta_limpa for k in ["GRAFICO", "HEATMAP", "MAPA DE CALOR"]):
+                conclusoes = "A matriz de correlação de Pearson entre as colunas numéricas foi obtida da covariância acumulada durante a ingestão."
+                return codigo_tabela_literal(correlacao_df.round(4)), conclusoes
+
         # 2. PERGUNTAS SOBRE CONTEXTO GERAL (Gera apenas texto que será convertido em tabela 1x1)
         if any(keyword in pergunta_limpa for keyword in ["QUE SE TRATA O ARQUIVO", "CONTEUDO DO ARQUIVO", "REPRESENTA O ARQUIVO", "O QUE E ESSE DATASET"]):
             prompt_interpretacao = f"""
@@ -50,8 +121,8 @@ CONTEXTO DO NOME DO ARQUIVO: '{file_context}'.
 
 # DESCRIÇÃO FINAL DO CONTEÚDO
 """
-            response = model.generate_content(prompt_interpretacao)
-            texto_limpo = response.text.replace("'", "\\'").replace('"', '\\"').replace('\n', ' ').strip()
+            texto = gera_texto_gemini(model, prompt_interpretacao, nome_prompt='agente2_interpretacao', tokens_contexto=contexto_prompt['tokens'])
+            texto_limpo = texto.replace("'", "\\'").replace('"', '\\"').replace('\n', ' ').strip()
             # O executor de código irá criar um resultado_df a partir deste print para garantir a tabela.
             codigo_gerado = f"print('{texto_limpo}')"
             
@@ -64,6 +135,14 @@ CONTEXTO DO NOME DO ARQUIVO: '{file_context}'.
         if any(keyword in pergunta_limpa for keyword in ["OUTLIER", "BOXPLOT", "DISPERSAO", "HISTOGRAMA", "DISTRIBUICAO"]):
              
             plot_type = 'boxplot' if any(k in pergunta_limpa for k in ["OUTLIER", "BOXPLOT"]) else 'hist'
+
+            # Histogramas já acumulados no perfil (se ele cobre todo o df)
+            if plot_type == 'hist' and perfil is not None and perfil.get('linhas') == len(df):
+                colunas_numericas = df.select_dtypes(include='number').columns
+                codigo_gerado = _codigo_histogramas_perfil(perfil, colunas_numericas) if len(colunas_numericas) > 0 else None
+                if codigo_gerado is not None:
+                    conclusoes = "Os histogramas das colunas numéricas foram obtidos do perfil calculado durante a ingestão (bins de largura fixa), para visualizar a distribuição de cada coluna do dataset."
+                    return codigo_gerado, conclusoes
             plot_func = 'df.boxplot(column=col, ax=axes[i], grid=False)' if plot_type == 'boxplot' else 'axes[i].hist(df[col].dropna(), bins=20, edgecolor="black")'
             plot_title = 'Análise de Outliers - Boxplots para Colunas Numéricas' if plot_type == 'boxplot' else 'Distribuição de Dados - Histogramas para Colunas Numéricas'
             
@@ -105,9 +184,10 @@ else:
 
         # --- LÓGICA: GERAÇÃO DE CÓDIGO (RAG - ANÁLISE GERAL) ---
         
-        rag_context_str = f"\n\nCONTEXTO ADICIONAL DOS DADOS (RAG):\n{retrieved_context}" if retrieved_context else ""
-        historico_conclusoes_str = f"\n\nHISTÓRICO DE ANÁLISE E CONCLUSÕES ANTERIORES:\n{historico_conclusoes}" if historico_conclusoes else ""
+        rag_context_str = f"\n\nCONTEXTO ADICIONAL DOS DADOS (RAG):\n{contexto_prompt['rag']}" if contexto_prompt['rag'] else ""
+        historico_conclusoes_str = f"\n\nHISTÓRICO DE ANÁLISE E CONCLUSÕES ANTERIORES:\n{contexto_prompt['historico']}" if contexto_prompt['historico'] else ""
         file_context_str = f"\n\nCONTEXTO DO NOME DO ARQUIVO: '{file_context}'."
+        perfil_str = f"\n\nPERFIL DAS COLUNAS (pré-calculado na ingestão; use estes valores em vez de recalcular quando bastarem):\n{contexto_prompt['perfil']}" if contexto_prompt['perfil'] else ""
         
         prompt = f"""
 # PERSONA E OBJETIVO PRINCIPAL
@@ -119,6 +199,7 @@ Você DEVE gerar apenas o código Python.
 Esquema do DataFrame:
 {schema}
 {file_context_str}
+{perfil_str}
 {rag_context_str}
 {historico_conclusoes_str}
 
@@ -135,10 +216,19 @@ Esquema do DataFrame:
 
 # CÓDIGO PYTHON (PANDAS/MATPLOTLIB)
 """
-        response = model.generate_content(prompt)
-        codigo_gerado = response.text.replace("```python", "").replace("```", "").strip()
+        codigo_gerado = gera_texto_gemini(model, prompt, nome_prompt='agente2_codigo', tokens_contexto=contexto_prompt['tokens']).replace("```python", "").replace("```", "").strip()
         
-        # Agente 4: GERA AS CONCLUSÕES APÓS A ANÁLISE
+        # Agente 4: GERA AS CONCLUSÕES (pode ser adiado para rodar junto da execução do código)
+        conclusoes = agente2_gera_conclusoes(pergunta, codigo_gerado, api_key) if gerar_conclusoes else None
+
+        return codigo_gerado, conclusoes
+    except Exception as e:
+        return f"Erro ao chamar a API do Gemini: {e}", None
+
+def agente2_gera_conclusoes(pergunta, codigo_gerado, api_key):
+    """Agente 4: sintetiza em uma ou duas frases as conclusões da análise gerada."""
+    try:
+        model = obtem_modelo_gemini(api_key)
         conclusoes_prompt = f"""
 # PERSONA
 Você é um analista de dados sênior e seu único trabalho é sintetizar os resultados de uma análise e fornecer conclusões ou insights claros e objetivos para o usuário.
@@ -151,9 +241,6 @@ O resultado da análise (Código Python) foi:
 # TAREFA
 Com base na pergunta do usuário e nos resultados, forneça uma ou duas frases de conclusão sobre o que foi descoberto. Não mencione o código. Apenas a conclusão.
 """
-        conclusoes_response = model.generate_content(conclusoes_prompt)
-        conclusoes = conclusoes_response.text
-
-        return codigo_gerado, conclusoes
-    except Exception as e:
-        return f"Erro ao chamar a API do Gemini: {e}", None
\ No newline at end of file
+        return gera_texto_gemini(model, conclusoes_prompt, nome_prompt='agente2_conclusoes')
+    except Exception:
+        return None
\ No newline at end of file
@@ -0,0 +1,119 @@
+import re
+import json
+from helpers.obtem_modelo_gemini import obtem_modelo_gemini
+from helpers.gera_texto_gemini import gera_texto_gemini
+from modules.orcamento_prompt import monta_contexto_prompt
+
+# Resposta estruturada: pergunta clarificada, código e modelo de conclusão com marcadores
+ESQUEMA_CONSULTA_UNICA = {
+    'type': 'object',
+    'properties': {
+        'pergunta_clarificada': {'type': 'string'},
+        'codigo': {'type': 'string'},
+        'modelo_conclusao': {'type': 'string'}
+    },
+    'required': ['pergunta_clarificada', 'codigo', 'modelo_conclusao']
+}
+MAX_CARACTERES_RESULTADO = 500
+
+def agente_consulta_unica(pergunta, api_key, df, retrieved_context=None, historico_conclusoes=None, file_context=None, perfil=None, model=None):
+    """
+    Uma única chamada ao Gemini com saída JSON (esquema ESQUEMA_CONSULTA_UNICA) no lugar de
+    clarificação + código + conclusões. O modelo de conclusão é preenchido localmente com o
+    resultado executado (preenche_modelo_conclusao). 'model' permite injetar um modelo
+    (ex.: ModeloGeminiStub). Retorna o dict da resposta ou None em caso de falha.
+    """
+    if df is None:
+        return None
+    if model is None:
+        if not api_key:
+            return None
+        model = obtem_modelo_gemini(api_key)
+
+    # Esquema, perfil, contexto RAG e histórico dentro do orçamento de tokens do prompt
+    contexto_prompt = monta_contexto_prompt(pergunta, df, retrieved_context, historico_conclusoes, perfil)
+    schema = contexto_prompt['esquema']
+    perfil_str = f"\n\nPERFIL DAS COLUNAS (pré-calculado na ingestão):\n{contexto_prompt['perfil']}" if contexto_prompt['perfil'] else ""
+    rag_context_str = f"\n\nCONTEXTO ADICIONAL DOS DADOS (RAG):\n{contexto_prompt['rag']}" if contexto_prompt['rag'] else ""
+    historico_conclusoes_str = f"\n\nHISTÓRICO DE ANÁLISE E CONCLUSÕES ANTERIORES:\n{contexto_prompt['historico']}" if contexto_prompt['historico'] else ""
+
+    prompt = f"""
+# PERSONA E OBJETIVO PRINCIPAL
+Você é um assistente especialista em Análise Exploratória de Dados (E.D.A.) com Pandas.
+Em uma única resposta JSON você deve: (1) corrigir erros de digitação e clarificar a pergunta sem alterar o significado,
+(2) traduzi-la para código Python e (3) escrever um modelo de conclusão que será preenchido com o resultado real.
+
+# CONTEXTO DO DATAFRAME `df`
+Esquema do DataFrame:
+{schema}
+
+CONTEXTO DO NOME DO ARQUIVO: '{file_context}'.
+{perfil_str}
+{rag_context_str}
+{historico_conclusoes_str}
+
+# REGRAS DO CAMPO "codigo" (MUITO IMPORTANTE)
+1.  **Sempre use `df` como o nome do DataFrame. Ele já está carregado: NUNCA carregue ou salve arquivos.**
+2.  **Se o resultado for uma tabela, SEMPRE atribua-o a `resultado_df` e imprima `resultado_df` (ex: `print(resultado_df.to_string())`).**
+3.  **Para gráficos, use `matplotlib.pyplot` (importado como `plt`), com `plt.subplots()` e layout dinâmico (`numpy.ceil`).**
+4.  **Apenas código Python, sem explicações nem blocos markdown. EVITE zero à esquerda em números (ex: '8', não '08').**
+
+# REGRAS DO CAMPO "modelo_conclusao"
+Uma ou duas frases de conclusão, sem mencionar o código. Onde entraria um valor calculado, use apenas os marcadores:
+- {{valor}}: primeira célula de `resultado_df` (ou o texto impresso, se não houver tabela);
+- {{num_linhas}}: número de linhas de `resultado_df`;
+- {{resultado}}: resumo textual curto do resultado;
+- {{NOME_DA_COLUNA}}: valor da primeira linha de uma coluna de `resultado_df`.
+Não invente números: eles virão dos marcadores.
+
+# PERGUNTA DO USUÁRIO
+{pergunta}
+"""
+    try:
+        texto = gera_texto_gemini(
+            model,
+            prompt,
+            generation_config={'response_mime_type': 'application/json', 'response_schema': ESQUEMA_CONSULTA_UNICA},
+            nome_prompt='consulta_unica',
+            tokens_contexto=contexto_prompt['tokens']
+        )
+        resposta = json.loads(texto)
+    except Exception:
+        return None
+
+    if not isinstance(resposta, dict) or not all(isinstance(resposta.get(campo), str) for campo in ESQUEMA_CONSULTA_UNICA['required']):
+        return None
+    resposta['codigo'] = resposta['codigo'].replace("```python", "").replace("```", "").strip()
+    if not resposta['codigo']:
+        return None
+    resposta['pergunta_clarificada'] = resposta['pergunta_clarificada'].strip() or pergunta
+    return resposta
+
+def _formata_valor(valor):
+    if isinstance(valor, float):
+        return f"{valor:.4g}"
+    return str(valor)
+
+def preenche_modelo_conclusao(modelo_conclusao, resultado_texto, resultado_df):
+    """Preenche localmente os marcadores do modelo de conclusão com o resultado executado."""
+    valores = {}
+    if resultado_df is not None and not resultado_df.empty:
+        primeira_linha = resultado_df.iloc[0]
+        valores['valor'] = _formata_valor(primeira_linha.iloc[0])
+        valores['num_linhas'] = str(len(resultado_df))
+        valores['resultado'] = resultado_df.head(5).to_string()[:MAX_CARACTERES_RESULTADO]
+        for col, valor in primeira_linha.items():
+            valores.setdefault(str(col), _formata_valor(valor))
+    else:
+        texto = (resultado_texto or "").strip()
+        valores['valor'] = texto.split('\n')[0] if texto else ""
+        valores['num_linhas'] = "0"
+        valores['resultado'] = texto[:MAX_CARACTERES_RESULTADO]
+
+    # Especificações de formato ({valor:.2f}) são ignoradas: os valores já vêm formatados.
+    # Marcadores desconhecidos permanecem no texto.
+    return re.sub(
+        r"\{([^{}:!]+)(?:![rsa])?(?::[^{}]*)?\}",
+        lambda marcador: valores.get(marcador.group(1).strip(), marcador.group(0)),
+        modelo_conclusao
+    )
\ No newline at end of file
@@ -1,33 +1,115 @@
+import numpy as np
 import pandas as pd
 import streamlit as st
 
+# Inteiros candidatos, do menor para o maior
+TIPOS_INTEIROS = ['int8', 'int16', 'int32', 'int64']
+# Maior inteiro representado exatamente em float32
+MAX_INTEIRO_FLOAT32 = 2 ** 24
+
+def _menor_dtype_numerico(serie):
+    """Menor dtype que representa a série sem perda de faixa (int8/16/32/64, float32 ou float64)."""
+    valores = serie.dropna()
+    if valores.empty:
+        return 'float32'
+
+    minimo, maximo = valores.min(), valores.max()
+    inteiros = bool((valores % 1 == 0).all())
+    if inteiros and len(valores) == len(serie):
+        for dtype in TIPOS_INTEIROS:
+            info = np.iinfo(dtype)
+            if info.min <= minimo and maximo <= info.max:
+                return dtype
+    limite = MAX_INTEIRO_FLOAT32 if inteiros else np.finfo('float32').max
+    return 'float32' if max(abs(minimo), abs(maximo)) < limite else 'float64'
+
+def _alarga_dtype(dtype, serie):
+    """
+    Confere apenas a faixa (mínimo/máximo) do chunk contra o dtype do plano, sem
+    reinferir o tipo, e o alarga quando os valores não cabem.
+    """
+    valores = serie.dropna()
+    if valores.empty:
+        # Coluna inteira sem valores: inteiros não representam NaN
+        return np.promote_types(dtype, 'float32').name if np.dtype(dtype).kind == 'i' and len(serie) else dtype
+
+    minimo, maximo = valores.min(), valores.max()
+    origem_inteira = pd.api.types.is_integer_dtype(serie.dtype)
+    if np.dtype(dtype).kind == 'i':
+        if origem_inteira:
+            # Só os inteiros a partir da largura atual: o plano nunca encolhe
+            for candidato in TIPOS_INTEIROS[TIPOS_INTEIROS.index(dtype):]:
+                info = np.iinfo(candidato)
+                if info.min <= minimo and maximo <= info.max:
+                    return candidato
+            return 'float64'
+        # Origem float: o chunk tem NaN ou decimais, que um inteiro não representa
+        dtype = np.promote_types(dtype, 'float32').name
+
+    limite = MAX_INTEIRO_FLOAT32 if origem_inteira else np.finfo('float32').max
+    if dtype == 'float32' and max(abs(minimo), abs(maximo)) >= limite:
+        return 'float64'
+    return dtype
+
+def _infere_plano_coluna(serie):
+    """Decide o tipo da coluna (uma única vez, no primeiro chunk ou amostra)."""
+    temp_series = pd.to_numeric(serie, errors='coerce')
+
+    # 1. Numérico
+    if len(temp_series) > 0 and temp_series.notna().sum() / len(temp_series) > 0.8:
+        return {'tipo': 'Numeric', 'dtype': _menor_dtype_numerico(temp_series)}
+
+    # 2. Categórico
+    unicos = serie.dropna().unique()
+    if len(unicos) < 50 and len(unicos) < len(serie) / 2:
+        return {'tipo': 'Categorical', 'categorias': list(unicos)}
+
+    # 3. Texto/Objeto
+    return {'tipo': 'Object'}
+
+def _aplica_plano_coluna(serie, plano):
+    """Aplica o tipo planejado a um chunk, alargando o plano só quando os valores não cabem."""
+    if plano['tipo'] == 'Numeric':
+        if pd.api.types.is_numeric_dtype(serie.dtype):
+            temp_series = serie
+        else:
+            temp_series = pd.to_numeric(serie, errors='coerce')
+        plano['dtype'] = _alarga_dtype(plano['dtype'], temp_series)
+        return temp_series.astype(plano['dtype'])
+
+    if plano['tipo'] == 'Categorical':
+        # União de categorias: o concat dos chunks nunca volta para object
+        conhecidas = set(plano['categorias'])
+        novas = [valor for valor in serie.dropna().unique() if valor not in conhecidas]
+        plano['categorias'].extend(novas)
+        return serie.astype(pd.CategoricalDtype(plano['categorias']))
+
+    return serie
+
 def agente_limpeza_dados(df):
     """
     Identifica e converte colunas para tipos numéricos e categóricos.
+    Os tipos são inferidos uma vez (primeiro chunk) e guardados em
+    st.session_state['plano_tipos']; os chunks seguintes só aplicam o plano,
+    com números rebaixados para o menor dtype seguro (float32, int8/16...).
     Aplica a limpeza 'in-place' no DF.
     """
     if df is None:
         return None
 
+    if st.session_state.get('plano_tipos') is None:
+        st.session_state['plano_tipos'] = {}
+    plano_tipos = st.session_state['plano_tipos']
+
     # Iterar sobre uma cópia da lista de colunas para evitar problemas de modificação durante o loop
     for col in list(df.columns):
         if col not in df.columns: # Proteção caso a coluna seja excluída ou renomeada
              continue
 
-        temp_series = pd.to_numeric(df[col], errors='coerce')
-        
-        # 1. Numérico
-        if temp_series.notna().sum() / len(temp_series) > 0.8:
-            df[col] = temp_series
-            st.session_state['cleaned_status'][col] = 'Numeric'
-        
-        # 2. Categórico
-        elif df[col].nunique() < 50 and len(df[col].unique()) < len(df) / 2:
-            df[col] = df[col].astype('category')
-            st.session_state['cleaned_status'][col] = 'Categorical'
-        
-        # 3. Texto/Objeto
-        else:
-            st.session_state['cleaned_status'][col] = 'Object'
+        if col not in plano_tipos:
+            plano_tipos[col] = _infere_plano_coluna(df[col])
+
+        df[col] = _aplica_plano_coluna(df[col], plano_tipos[col])
+        st.session_state['cleaned_status'][col] = plano_tipos[col]['tipo']
     
     return df
\ No newline at end of file
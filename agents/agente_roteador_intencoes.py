@@ -0,0 +1,218 @@
+import re
+import pandas as pd
+from helpers.normalize_text import normalize_text
+from helpers.codigo_tabela_literal import codigo_tabela_literal
+from modules.perfil_colunas import correlacao_perfil_df, resumo_perfil_df
+
+# Perguntas longas costumam combinar pedidos: ficam com o Gemini
+MAX_PALAVRAS_ROTEAMENTO = 15
+# Pedidos de gráfico seguem para o agente2
+PALAVRAS_GRAFICO = ["GRAFICO", "PLOT", "HISTOGRAMA", "BOXPLOT", "HEATMAP", "MAPA DE CALOR", "DISPERSAO", "VISUALIZ"]
+# Nomes usuais da coluna alvo (balanceamento de classes)
+NOMES_COLUNA_ALVO = ["CLASS", "CLASSE", "TARGET", "ALVO", "LABEL", "ROTULO", "FRAUDE", "FRAUD", "Y"]
+MAX_CLASSES = 20
+TOP_N_PADRAO = 10
+MAX_CONTAGEM_VALORES = 20
+# Condições/filtros na pergunta ("têm Class igual a 1"): a contagem total não responde
+PALAVRAS_CONDICAO = ["IGUAL", "IGUAIS", "DIFERENTE", "MAIOR", "MENOR", "ACIMA", "ABAIXO", "ENTRE", "ONDE", "QUANDO", "SUPERIOR", "INFERIOR", "EXCETO", "SEM "]
+_PADRAO_CONDICAO = re.compile(r"[<>=!]|\d")
+
+INTENCOES = {
+    'formato': ["QUANTAS LINHAS", "QUANTAS COLUNAS", "NUMERO DE LINHAS", "NUMERO DE COLUNAS", "QUANTIDADE DE LINHAS", "QUANTOS REGISTROS", "DIMENSOES", "SHAPE", "TAMANHO DO DATASET"],
+    'nulos': ["VALORES NULOS", "VALORES AUSENTES", "DADOS FALTANTES", "VALORES FALTANTES", "MISSING", "NULOS"],
+    'estatisticas': ["ESTATISTICAS DESCRITIVAS", "DESCRIBE", "RESUMO ESTATISTICO", "MEDIDAS DE TENDENCIA"],
+    'contagem_valores': ["CONTAGEM DE VALORES", "FREQUENCIA", "VALUE COUNTS", "VALUE_COUNTS", "VALORES MAIS FREQUENTES", "VALORES MAIS COMUNS", "QUANTAS VEZES"],
+    'balanco_classes': ["BALANCEAMENTO", "BALANCEADO", "DESBALANCE", "PROPORCAO DE CLASSES", "PROPORCAO DAS CLASSES", "DISTRIBUICAO DAS CLASSES", "DISTRIBUICAO DE CLASSES", "PROPORCAO DE FRAUDES"],
+    'correlacao': ["CORRELACAO", "CORRELACIONADAS", "CORRELACIONADA"],
+    'top_n': ["MAIORES VALORES", "MENORES VALORES", "MAIORES", "MENORES", "TOP "],
+    'media_por_grupo': ["MEDIA DE", "MEDIA DO", "MEDIA DA", "VALOR MEDIO", "MEDIA POR"],
+}
+
+def _colunas_citadas(pergunta_limpa, df):
+    """Colunas do df citadas na pergunta (palavra inteira), na ordem em que aparecem."""
+    citadas = []
+    for col in df.columns:
+        nome = normalize_text(str(col)).upper()
+        encontrado = re.search(rf"(?<![A-Z0-9_]){re.escape(nome)}(?![A-Z0-9_])", pergunta_limpa)
+        if encontrado:
+            citadas.append((encontrado.start(), col))
+    return [col for _, col in sorted(citadas, key=lambda item: item[0])]
+
+def _numerica(df, col):
+    return pd.api.types.is_numeric_dtype(df[col].dtype) and not pd.api.types.is_bool_dtype(df[col].dtype)
+
+def _perfil_valido(perfil, df):
+    return perfil is not None and perfil.get('linhas') == len(df)
+
+def _tem_condicao(pergunta_limpa):
+    """Números, operadores ou palavras de comparação indicam um filtro sobre as linhas."""
+    return bool(_PADRAO_CONDICAO.search(pergunta_limpa)) or any(p in pergunta_limpa + " " for p in PALAVRAS_CONDICAO)
+
+def _formato(pergunta_limpa, df, colunas, perfil):
+    # Colunas citadas ou condições ("registros com Class igual a 1") pedem um filtro: fica com o Gemini
+    if colunas or _tem_condicao(pergunta_limpa):
+        return None
+    codigo = """
+resultado_df = pd.DataFrame({'DIMENSAO': ['Linhas', 'Colunas'], 'VALOR': [df.shape[0], df.shape[1]]})
+print(resultado_df.to_string(index=False))
+"""
+    return codigo, f"O conjunto de dados possui {len(df)} linhas e {len(df.columns)} colunas."
+
+def _nulos(pergunta_limpa, df, colunas, perfil):
+    if _tem_condicao(pergunta_limpa):
+        return None
+    if _perfil_valido(perfil, df):
+        nulos_df = resumo_perfil_df(perfil)[['contagem', 'nulos']].copy()
+        if colunas:
+            nulos_df = nulos_df.loc[[str(col) for col in colunas]]
+        nulos_df['percentual_nulos'] = (100 * nulos_df['nulos'] / perfil['linhas']).round(2)
+        if colunas:
+            return codigo_tabela_literal(nulos_df), f"As colunas citadas possuem {int(nulos_df['nulos'].sum())} valores nulos no total."
+        return codigo_tabela_literal(nulos_df), f"O conjunto de dados possui {int(nulos_df['nulos'].sum())} valores nulos no total."
+    selecao = f"df[{list(colunas)!r}]" if colunas else "df"
+    codigo = f"""
+resultado_df = pd.DataFrame({{'nulos': {selecao}.isna().sum(), 'percentual_nulos': ({selecao}.isna().mean() * 100).round(2)}})
+print(resultado_df.to_string())
+"""
+    if colunas:
+        return codigo, "A contagem e o percentual de valores nulos foram calculados para as colunas citadas."
+    return codigo, "A contagem e o percentual de valores nulos foram calculados para cada coluna."
+
+def _estatisticas(pergunta_limpa, df, colunas, perfil):
+    if not colunas and _perfil_valido(perfil, df):
+        return codigo_tabela_literal(resumo_perfil_df(perfil)), "O resumo estatístico de cada coluna foi obtido do perfil calculado durante a ingestão; quartis e distintos são aproximados."
+    selecao = f"df[{list(colunas)!r}]" if colunas else "df"
+    codigo = f"""
+resultado_df = {selecao}.describe(include='all').T
+print(resultado_df.to_string())
+"""
+    return codigo, "As estatísticas descritivas (contagem, média, desvio padrão, mínimo, quartis e máximo) foram calculadas."
+
+def _contagem_valores(pergunta_limpa, df, colunas, perfil):
+    if len(colunas) != 1:
+        return None
+    col = colunas[0]
+    codigo = f"""
+resultado_df = df[{col!r}].value_counts(dropna=False).head({MAX_CONTAGEM_VALORES}).rename_axis({col!r}).reset_index(name='contagem')
+print(resultado_df.to_string(index=False))
+"""
+    return codigo, f"A frequência dos valores mais comuns da coluna '{col}' foi calculada."
+
+def _coluna_alvo(df, colunas):
+    candidatas = list(colunas) or [col for col in df.columns if normalize_text(str(col)).upper() in NOMES_COLUNA_ALVO]
+    if len(candidatas) != 1:
+        return None
+    return candidatas[0]
+
+def _balanco_classes(pergunta_limpa, df, colunas, perfil):
+    col = _coluna_alvo(df, colunas)
+    if col is None:
+        return None
+    contagem = df[col].value_counts(dropna=False)
+    if len(contagem) > MAX_CLASSES or contagem.empty:
+        return None
+    codigo = f"""
+contagem = df[{col!r}].value_counts(dropna=False)
+resultado_df = pd.DataFrame({{'contagem': contagem, 'percentual': (contagem / contagem.sum() * 100).round(4)}}).rename_axis({col!r}).reset_index()
+print(resultado_df.to_string(index=False))
+"""
+    minoritaria = contagem.idxmin()
+    conclusoes = (f"A coluna '{col}' tem {len(contagem)} classes; a minoritária ({minoritaria}) representa "
+                  f"{contagem.min() / contagem.sum():.4%} dos registros.")
+    return codigo, conclusoes
+
+def _correlacao(pergunta_limpa, df, colunas, perfil):
+    if any(not _numerica(df, col) for col in colunas) or len(colunas) > 2:
+        return None
+    if len(colunas) == 2:
+        codigo = f"""
+resultado_df = df[{list(colunas)!r}].corr().round(4)
+print(resultado_df.to_string())
+"""
+        return codigo, f"A correlação de Pearson entre '{colunas[0]}' e '{colunas[1]}' foi calculada."
+    if len(colunas) == 1:
+        col = colunas[0]
+        codigo = f"""
+correlacoes = df.select_dtypes(include=np.number).corrwith(df[{col!r}]).drop({col!r})
+resultado_df = correlacoes.sort_values(key=abs, ascending=False).round(4).rename_axis('coluna').reset_index(name='correlacao')
+print(resultado_df.to_string(index=False))
+"""
+        return codigo, f"As correlações de Pearson das colunas numéricas com '{col}' foram calculadas e ordenadas pela intensidade."
+    correlacao_df = correlacao_perfil_df(perfil) if _perfil_valido(perfil, df) else None
+    if correlacao_df is not None:
+        return codigo_tabela_literal(correlacao_df.round(4)), "A matriz de correlação de Pearson entre as colunas numéricas foi obtida da covariância acumulada durante a ingestão."
+    codigo = """
+resultado_df = df.corr(numeric_only=True).round(4)
+print(resultado_df.to_string())
+"""
+    return codigo, "A matriz de correlação de Pearson entre as colunas numéricas foi calculada."
+
+def _top_n(pergunta_limpa, df, colunas, perfil):
+    numericas = [col for col in colunas if _numerica(df, col)]
+    if len(numericas) != 1:
+        return None
+    col = numericas[0]
+    encontrado = re.search(r"TOP\s*(\d+)|(\d+)\s+(?:MAIORES|MENORES)", pergunta_limpa)
+    n = int(next(g for g in encontrado.groups() if g)) if encontrado else TOP_N_PADRAO
+    funcao, descricao = ('nsmallest', 'menores') if "MENORES" in pergunta_limpa else ('nlargest', 'maiores')
+    codigo = f"""
+resultado_df = df.{funcao}({n}, {col!r})
+print(resultado_df.to_string())
+"""
+    return codigo, f"Foram listados os {n} registros com os {descricao} valores de '{col}'."
+
+def _media_por_grupo(pergunta_limpa, df, colunas, perfil):
+    posicao_por = pergunta_limpa.find(" POR ")
+    if posicao_por < 0:
+        return None
+    antes = [col for col in _colunas_citadas(pergunta_limpa[:posicao_por], df) if _numerica(df, col)]
+    depois = _colunas_citadas(pergunta_limpa[posicao_por:], df)
+    if len(antes) != 1 or len(depois) != 1 or antes[0] == depois[0]:
+        return None
+    valor, grupo = antes[0], depois[0]
+    codigo = f"""
+resultado_df = df.groupby({grupo!r}, observed=True)[{valor!r}].mean().reset_index(name={f'media_{valor}'!r})
+print(resultado_df.to_string(index=False))
+"""
+    return codigo, f"A média de '{valor}' foi calculada para cada valor de '{grupo}'."
+
+TEMPLATES = {
+    'formato': _formato,
+    'nulos': _nulos,
+    'estatisticas': _estatisticas,
+    'contagem_valores': _contagem_valores,
+    'balanco_classes': _balanco_classes,
+    'correlacao': _correlacao,
+    'top_n': _top_n,
+    'media_por_grupo': _media_por_grupo,
+}
+
+def agente_roteador_intencoes(pergunta, df, perfil=None):
+    """
+    Classificador local de intenções para perguntas frequentes de EDA (formato, nulos,
+    estatísticas, contagem de valores, balanceamento, correlação, top-N, média por grupo).
+    Retorna (codigo, conclusoes, intencao) a partir de templates revisados, sem chamar o
+    Gemini, ou (None, None, None) quando a confiança é baixa (nenhuma ou mais de uma
+    intenção, colunas não identificadas, pedidos de gráfico ou perguntas longas).
+    """
+    if df is None or not pergunta:
+        return None, None, None
+
+    pergunta_limpa = " ".join(normalize_text(pergunta).upper().split())
+    if len(pergunta_limpa.split()) > MAX_PALAVRAS_ROTEAMENTO or any(p in pergunta_limpa for p in PALAVRAS_GRAFICO):
+        return None, None, None
+
+    intencoes = [nome for nome, palavras in INTENCOES.items() if any(p in pergunta_limpa for p in palavras)]
+    if len(intencoes) != 1:
+        return None, None, None
+
+    intencao = intencoes[0]
+    try:
+        resultado = TEMPLATES[intencao](pergunta_limpa, df, _colunas_citadas(pergunta_limpa, df), perfil)
+    except Exception:
+        return None, None, None
+    if resultado is None:
+        return None, None, None
+
+    codigo, conclusoes = resultado
+    return codigo, conclusoes, intencao
\ No newline at end of file
@@ -0,0 +1,76 @@
+"""
+Relatório de recall@k x latência do índice aproximado (IVF/HNSW) contra o índice exato.
+
+Uso:
+    python -m benchmarks.recall_indice_ann [num_vetores] [tipo_ann] [compressao] [rerank]
+"""
+import sys
+import time
+import faiss
+import numpy as np
+from rag_components.adiciona_embeddings_indice import adiciona_embeddings_indice, descreve_indice
+
+def avalia_recall_latencia(index, embeddings, consultas, k=3):
+    """Compara o índice com uma busca exata (IndexFlatL2) sobre os mesmos embeddings."""
+    exato = faiss.IndexFlatL2(embeddings.shape[1])
+    exato.add(embeddings)
+
+    inicio = time.perf_counter()
+    _, I_exato = exato.search(consultas, k)
+    latencia_exata = (time.perf_counter() - inicio) / len(consultas)
+
+    inicio = time.perf_counter()
+    _, I_ann = index.search(consultas, k)
+    latencia_ann = (time.perf_counter() - inicio) / len(consultas)
+
+    acertos = sum(len(set(a) & set(e)) for a, e in zip(I_ann, I_exato))
+    return {
+        'recall_at_k': acertos / (k * len(consultas)),
+        'latencia_exata_ms': latencia_exata * 1000,
+        'latencia_ann_ms': latencia_ann * 1000,
+    }
+
+def _embeddings_sinteticos(num_vetores, dimension=384, num_grupos=200, seed=0):
+    """Gera vetores agrupados (mais próximos de embeddings reais que ruído uniforme)."""
+    rng = np.random.default_rng(seed)
+    centros = rng.normal(size=(num_grupos, dimension)).astype('float32')
+    grupos = rng.integers(0, num_grupos, size=num_vetores)
+    return centros[grupos] + 0.3 * rng.normal(size=(num_vetores, dimension)).astype('float32')
+
+def main(num_vetores=200_000, tipo_ann='ivf', compressao='nenhuma', rerank_exato=False, chunk_size=1000, k=3):
+    embeddings = _embeddings_sinteticos(num_vetores)
+    consultas = _embeddings_sinteticos(500, seed=1)
+
+    index = None
+    for inicio in range(0, num_vetores, chunk_size):
+        index = adiciona_embeddings_indice(
+            index, embeddings[inicio:inicio + chunk_size], tipo_ann=tipo_ann, limiar_ann=num_vetores // 2,
+            compressao=compressao, rerank_exato=rerank_exato
+        )
+
+    tamanho_float32 = embeddings.nbytes
+    tamanho_indice = faiss.serialize_index(index).nbytes
+    print(f"Índice: {descreve_indice(index)}")
+    print(f"Tamanho: {tamanho_indice / 2**20:.1f} MiB (vetores float32: {tamanho_float32 / 2**20:.1f} MiB, {tamanho_float32 / tamanho_indice:.1f}x)")
+    print(f"{'parâmetro':>12} | {'recall@' + str(k):>9} | {'exato (ms)':>10} | {'ANN (ms)':>9}")
+
+    base = faiss.downcast_index(index.base_index) if isinstance(index, faiss.IndexRefine) else index
+    if isinstance(base, faiss.IndexIVF):
+        nome, valores = 'nprobe', [1, 2, 4, 8, 16, 32, 64]
+    else:
+        nome, valores = 'efSearch', [16, 32, 64, 128, 256]
+
+    for valor in valores:
+        if nome == 'nprobe':
+            base.nprobe = valor
+        else:
+            base.hnsw.efSearch = valor
+        r = avalia_recall_latencia(index, embeddings, consultas, k)
+        print(f"{nome + '=' + str(valor):>12} | {r['recall_at_k']:>9.3f} | {r['latencia_exata_ms']:>10.3f} | {r['latencia_ann_ms']:>9.3f}")
+
+if __name__ == '__main__':
+    num_vetores = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    tipo_ann = sys.argv[2] if len(sys.argv) > 2 else 'ivf'
+    compressao = sys.argv[3] if len(sys.argv) > 3 else 'nenhuma'
+    rerank_exato = len(sys.argv) > 4 and sys.argv[4] == 'rerank'
+    main(num_vetores, tipo_ann, compressao, rerank_exato)
@@ -0,0 +1,49 @@
+"""
+Micro-benchmark da serialização linha -> documento em um arquivo numérico de 31 colunas
+(formato do dataset de fraude: TIME, V1..V28, AMOUNT, CLASS).
+
+Uso:
+    python -m benchmarks.serializacao_documentos [num_linhas]
+"""
+import sys
+import time
+import numpy as np
+import pandas as pd
+from rag_components.serializa_documentos import serializa_documentos
+
+def _df_sintetico(num_linhas, seed=0):
+    rng = np.random.default_rng(seed)
+    dados = {'TIME': rng.uniform(0, 172792, num_linhas).round()}
+    for i in range(1, 29):
+        dados[f'V{i}'] = rng.normal(size=num_linhas)
+    dados['AMOUNT'] = rng.exponential(88, num_linhas).round(2)
+    dados['CLASS'] = (rng.random(num_linhas) < 0.0017).astype('int64')
+    return pd.DataFrame(dados)
+
+def _serializacao_apply(chunk):
+    """Caminho anterior: laço por linha via apply(axis=1)."""
+    return chunk.astype(str).apply(lambda x: ' '.join(x), axis=1).tolist()
+
+def _cronometra(funcao, chunk, repeticoes=3):
+    melhor = float('inf')
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao(chunk)
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor
+
+def main(num_linhas=100_000, chunk_size=1000):
+    df = _df_sintetico(num_linhas)
+    chunks = [df.iloc[i:i + chunk_size] for i in range(0, num_linhas, chunk_size)]
+
+    tempo_apply = _cronometra(lambda _: [_serializacao_apply(c) for c in chunks], None)
+    tempo_vetorizado = _cronometra(lambda _: [serializa_documentos(c, colunas=list(df.columns), precisao=4) for c in chunks], None)
+
+    print(f"{num_linhas} linhas x {df.shape[1]} colunas, chunks de {chunk_size}")
+    print(f"apply(axis=1):  {tempo_apply:.3f} s ({num_linhas / tempo_apply:,.0f} linhas/s)")
+    print(f"vetorizado:     {tempo_vetorizado:.3f} s ({num_linhas / tempo_vetorizado:,.0f} linhas/s)")
+    print(f"speedup:        {tempo_apply / tempo_vetorizado:.1f}x")
+    print(f"exemplo: {serializa_documentos(df.head(1), colunas=list(df.columns), precisao=4)[0][:120]}...")
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -1 +1,7 @@
-from helpers.normalize_text import normalize_text
\ No newline at end of file
+from helpers.normalize_text import normalize_text
+from helpers.codigo_tabela_literal import codigo_tabela_literal
+from helpers.gera_texto_gemini import gera_texto_gemini
+from helpers.obtem_modelo_gemini import obtem_modelo_gemini
+from helpers.modelo_gemini_stub import ModeloGeminiStub
+from helpers.estima_tokens import estima_tokens
+from helpers.registra_tokens_prompt import registra_tokens_prompt
\ No newline at end of file
@@ -0,0 +1,62 @@
+import os
+import time
+import sqlite3
+import hashlib
+import tempfile
+import contextlib
+
+CAMINHO_CACHE_LLM = os.path.join(tempfile.gettempdir(), "eda_agent_cache_llm.sqlite")
+MAX_ENTRADAS_CACHE_LLM = 5_000
+# Validade das respostas em segundos (7 dias)
+TTL_CACHE_LLM = 7 * 24 * 3600
+
+def hash_prompt(prompt):
+    """Hash do prompt renderizado (parte da chave do cache)."""
+    return hashlib.sha256(prompt.encode('utf-8')).digest()
+
+def _conecta():
+    conn = sqlite3.connect(CAMINHO_CACHE_LLM, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS respostas ("
+        " modelo TEXT NOT NULL, hash BLOB NOT NULL, texto TEXT NOT NULL, criacao REAL NOT NULL, acesso REAL NOT NULL,"
+        " PRIMARY KEY (modelo, hash))"
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS respostas_acesso ON respostas (acesso)")
+    return conn
+
+def busca_resposta_cache(nome_modelo, hash_do_prompt, ttl=TTL_CACHE_LLM):
+    """
+    Busca a resposta pela chave (modelo, hash do prompt). Retorna o texto ou None
+    (respostas com mais de 'ttl' segundos são descartadas). Renova o acesso LRU.
+    """
+    agora = time.time()
+    with contextlib.closing(_conecta()) as conn, conn:
+        linha = conn.execute(
+            "SELECT texto, criacao FROM respostas WHERE modelo = ? AND hash = ?",
+            (nome_modelo, hash_do_prompt)
+        ).fetchone()
+        if linha is None:
+            return None
+        texto, criacao = linha
+        if agora - criacao > ttl:
+            conn.execute("DELETE FROM respostas WHERE modelo = ? AND hash = ?", (nome_modelo, hash_do_prompt))
+            return None
+        conn.execute("UPDATE respostas SET acesso = ? WHERE modelo = ? AND hash = ?", (agora, nome_modelo, hash_do_prompt))
+    return texto
+
+def grava_resposta_cache(nome_modelo, hash_do_prompt, texto, max_entradas=MAX_ENTRADAS_CACHE_LLM, ttl=TTL_CACHE_LLM):
+    """Grava a resposta e remove as expiradas e as menos usadas recentemente acima do limite."""
+    agora = time.time()
+    with contextlib.closing(_conecta()) as conn, conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO respostas (modelo, hash, texto, criacao, acesso) VALUES (?, ?, ?, ?, ?)",
+            (nome_modelo, hash_do_prompt, texto, agora, agora)
+        )
+        conn.execute("DELETE FROM respostas WHERE criacao < ?", (agora - ttl,))
+        excedente = conn.execute("SELECT COUNT(*) FROM respostas").fetchone()[0] - max_entradas
+        if excedente > 0:
+            conn.execute(
+                "DELETE FROM respostas WHERE rowid IN (SELECT rowid FROM respostas ORDER BY acesso LIMIT ?)",
+                (excedente,)
+            )
\ No newline at end of file
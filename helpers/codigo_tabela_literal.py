@@ -0,0 +1,9 @@
+def codigo_tabela_literal(tabela, comentario="Estatísticas do perfil calculado durante a ingestão"):
+    """Gera código que reconstrói uma tabela já calculada (sem varrer o df no sandbox)."""
+    return f"""
+import io
+
+# {comentario}
+resultado_df = pd.read_json(io.StringIO({tabela.to_json(orient='split')!r}), orient='split')
+print(resultado_df.to_string())
+"""
\ No newline at end of file
@@ -0,0 +1,6 @@
+# Aproximação usual para o Gemini: ~4 caracteres por token
+CARACTERES_POR_TOKEN = 4
+
+def estima_tokens(texto):
+    """Estimativa local do número de tokens (sem chamada ao modelo)."""
+    return (len(texto or "") + CARACTERES_POR_TOKEN - 1) // CARACTERES_POR_TOKEN
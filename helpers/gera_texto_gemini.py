@@ -0,0 +1,50 @@
+import json
+import sqlite3
+import streamlit as st
+from helpers.cache_respostas_llm import busca_resposta_cache, grava_resposta_cache, hash_prompt
+from helpers.registra_tokens_prompt import registra_tokens_prompt
+
+def _registra_stats(campo):
+    stats = st.session_state.get('cache_llm_stats') or {'acertos': 0, 'faltas': 0}
+    stats[campo] += 1
+    st.session_state['cache_llm_stats'] = stats
+
+def gera_texto_gemini(model, prompt, generation_config=None, nome_prompt='gemini', tokens_contexto=None):
+    """
+    Chama model.generate_content(prompt) e retorna o texto, passando pelo cache persistente
+    de respostas (chave: modelo + hash do prompt). Desligado com 'cache_llm_ativo' = False.
+    generation_config (ex.: saída JSON com esquema) é repassado ao modelo e entra na chave.
+    Todo prompt tem os tokens registrados (registra_tokens_prompt) sob 'nome_prompt', com o
+    detalhamento do orçamento (tokens_contexto) quando houver.
+    """
+    usar_cache = st.session_state.get('cache_llm_ativo', True)
+    nome_modelo = getattr(model, 'model_name', 'gemini')
+    if generation_config is None:
+        chave = hash_prompt(prompt)
+    else:
+        chave = hash_prompt(prompt + "\n" + json.dumps(generation_config, sort_keys=True))
+
+    if usar_cache:
+        try:
+            texto = busca_resposta_cache(nome_modelo, chave)
+        except sqlite3.Error:
+            texto = None
+        if texto is not None:
+            _registra_stats('acertos')
+            registra_tokens_prompt(nome_prompt, prompt, tokens_contexto, cache=True)
+            return texto
+
+    registra_tokens_prompt(nome_prompt, prompt, tokens_contexto)
+
+    if generation_config is None:
+        texto = model.generate_content(prompt).text
+    else:
+        texto = model.generate_content(prompt, generation_config=generation_config).text
+    _registra_stats('faltas')
+
+    if usar_cache:
+        try:
+            grava_resposta_cache(nome_modelo, chave, texto)
+        except sqlite3.Error:
+            pass
+    return texto
\ No newline at end of file
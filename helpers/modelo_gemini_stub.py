@@ -0,0 +1,26 @@
+import json
+from types import SimpleNamespace
+
+class ModeloGeminiStub:
+    """
+    Modelo local com a mesma interface usada do GenerativeModel (generate_content(...).text),
+    para exercitar os agentes sem rede. 'respostas' pode ser uma função prompt -> resposta,
+    uma lista (consumida em ordem) ou uma resposta fixa; dicts são devolvidos como JSON.
+    """
+
+    def __init__(self, respostas, model_name='stub'):
+        self.respostas = respostas
+        self.model_name = model_name
+        self.chamadas = []
+
+    def generate_content(self, prompt, generation_config=None):
+        self.chamadas.append((prompt, generation_config))
+        if callable(self.respostas):
+            resposta = self.respostas(prompt)
+        elif isinstance(self.respostas, list):
+            resposta = self.respostas.pop(0)
+        else:
+            resposta = self.respostas
+        if isinstance(resposta, dict):
+            resposta = json.dumps(resposta, ensure_ascii=False)
+        return SimpleNamespace(text=resposta)
\ No newline at end of file
@@ -0,0 +1,25 @@
+import streamlit as st
+from google import genai
+
+MODELO_GEMINI = 'gemini-2.5-flash'
+
+class _ModeloGemini:
+    """
+    Modelo com a interface usada pelos agentes (generate_content(...).text, model_name)
+    sobre um genai.Client próprio: a chave fica no cliente, sem configuração global do
+    processo compartilhada entre sessões.
+    """
+
+    def __init__(self, cliente, nome_modelo):
+        self.cliente = cliente
+        self.nome_modelo = nome_modelo
+        # Mesmo nome do GenerativeModel (chave do cache de respostas)
+        self.model_name = f"models/{nome_modelo}"
+
+    def generate_content(self, prompt, generation_config=None):
+        return self.cliente.models.generate_content(model=self.nome_modelo, contents=prompt, config=generation_config)
+
+@st.cache_resource(show_spinner=False)
+def obtem_modelo_gemini(api_key, nome_modelo=MODELO_GEMINI):
+    """Cria o cliente (com a própria chave) e o modelo uma única vez por chave/modelo (reusado por todos os agentes)."""
+    return _ModeloGemini(genai.Client(api_key=api_key), nome_modelo)
@@ -0,0 +1,27 @@
+import logging
+import streamlit as st
+from helpers.estima_tokens import estima_tokens
+
+logger = logging.getLogger(__name__)
+
+MAX_REGISTROS_LOG_PROMPT = 50
+
+def registra_tokens_prompt(nome_prompt, prompt, tokens_contexto=None, cache=False):
+    """
+    Registra (log + st.session_state['log_tokens_prompt'], exibido na interface) os tokens
+    estimados de um prompt e, se houver, o detalhamento das partes montadas pelo orçamento
+    (tokens_contexto: esquema, perfil, rag, historico e 'original'). 'cache' indica que a
+    resposta veio do cache (o prompt não foi enviado).
+    """
+    registro = {'prompt': nome_prompt, 'total': estima_tokens(prompt), 'cache': cache}
+    if tokens_contexto:
+        registro.update({parte: tokens for parte, tokens in tokens_contexto.items() if parte != 'original'})
+    logger.info("Prompt %s: ~%d tokens%s %s", nome_prompt, registro['total'], " (cache)" if cache else "", tokens_contexto or "")
+    try:
+        log = st.session_state.get('log_tokens_prompt') or []
+        log.append(registro)
+        st.session_state['log_tokens_prompt'] = log[-MAX_REGISTROS_LOG_PROMPT:]
+    except Exception:
+        # Threads sem contexto da sessão (ex.: ingestão em background): apenas o log
+        pass
+    return registro
@@ -1,32 +1,33 @@
 ﻿import streamlit as st
-import pandas as pd
-import zipfile
 import os
-import io
 import hashlib
 
 # --- Helpers, Modules and Sandboxing ---
 # MANTENDO TODAS AS IMPORTAÇÕES DO ARQUIVO ORIGINAL
 from helpers.normalize_text import normalize_text
 from modules.init_session_state import init_session_state
-from sandboxing.executa_codigo_seguro import executa_codigo_seguro
+from modules.consolida_df import consolida_df
+from modules.orquestra_consulta import orquestra_consulta, roteia_consulta
+from modules.perfil_colunas import atualiza_perfil
+from modules.ingestao_background import (
+    consulta_progresso_ingestao,
+    inicia_ingestao_background,
+    para_ingestao_background
+)
+from sandboxing.executa_codigo_seguro import aquece_sandbox
 
 # ------- Agents -------
 from agents.agente_limpeza_dados import agente_limpeza_dados
-from agents.agente0 import agente0_clarifica_pergunta
 from agents.agente1 import (
+    agente1_conta_linhas_arquivo,
     agente1_identifica_arquivos,
-    agente1_interpreta_contexto_arquivo,
-    agente1_processa_arquivo_chunk
+    agente1_interpreta_contexto_arquivo
 )
-from agents.agente2 import agente2_gera_codigo_pandas_eda
 from agents.agente3 import agente3_formatar_apresentacao
 
 # --- RAG Components ---
-from rag_components.create_faiss_index_for_chunk import create_faiss_index_for_chunk
-from rag_components.retrieve_context import retrieve_context
-from rag_components.save_progress import save_progress
-from rag_components.load_progress import load_progress
+from rag_components.armazem_documentos import ArmazemDocumentos
+from rag_components.load_progress import load_progress, load_perfil, load_indice_invertido
 
 # Importação da SentenceTransformer será feita via st.cache_resource
 
@@ -43,6 +44,8 @@ CHUNK_SIZE = 1000
 
 # --- Inicialização de Session State ---
 init_session_state()
+# Processos do sandbox importam as bibliotecas antes da primeira consulta
+aquece_sandbox()
 
 # --- Streamlit UI ---
 
@@ -59,6 +62,10 @@ with st.expander("🔑 Configurar API Key do Gemini", expanded=False):
         if submitted:
             st.session_state['gemini_api_key'] = api_key_input
             st.success("API Key salva com sucesso! Você pode fechar este menu.")
+    # Cache persistente das respostas do Gemini (desmarque para sempre consultar o modelo)
+    st.checkbox("Reaproveitar respostas do Gemini (cache em disco)", key='cache_llm_ativo')
+    # Uma única chamada estruturada (pergunta clarificada + código + modelo de conclusão)
+    st.checkbox("Modo de chamada única ao Gemini (mais rápido; conclusão preenchida com o resultado)", key='modo_consulta_unica')
             
 st.markdown("---")
 
@@ -99,16 +106,23 @@ with col_list:
         if zipfile_input is not None:
             st.session_state['zip_bytes'] = zipfile_input.getvalue()
             st.session_state['zip_hash'] = hashlib.md5(st.session_state['zip_bytes']).hexdigest()
+            para_ingestao_background()
+            st.session_state['ingestao_mensagem'] = None
             
             # Reseta estados importantes
             st.session_state['selected_file_name'] = None 
             st.session_state['df'] = None 
+            st.session_state['df_partes'] = []
             st.session_state['conclusoes_historico'] = "" 
             st.session_state['processed_percentage'] = 0
             st.session_state['available_files'] = []
             st.session_state['file_options_map'] = {}
             st.session_state['faiss_index'] = None
-            st.session_state['documents'] = []
+            st.session_state['faiss_versao'] += 1
+            st.session_state['faiss_backend'] = None
+            st.session_state['documents'] = ArmazemDocumentos()
+            st.session_state['indice_invertido'] = None
+            st.session_state['rag_linhas_amostradas'] = None
 
             with st.spinner("Analisando arquivos e gerando contexto com Gemini..."):
                 file_info_list = agente1_identifica_arquivos(st.session_state['zip_bytes'])
@@ -159,7 +173,11 @@ if st.session_state['available_files']:
         # Botão de Análise (Abaixo do Selectbox)
         if st.button(f"📊 Analisar Arquivo: {selected_file_name}", use_container_width=True) and selected_file_info:
             
-            # TODO: Mover a lógica pesada de 'Analisar' para uma função se possível para limpar o main
+            # Interrompe uma ingestão anterior antes de recarregar o estado
+            para_ingestao_background()
+            st.session_state['ingestao_mensagem'] = None
+            # Os tipos das colunas são reinferidos para o arquivo selecionado
+            st.session_state['plano_tipos'] = None
             
             expected_num_cols = selected_file_info['num_cols']
             
@@ -168,24 +186,30 @@ if st.session_state['available_files']:
             st.info(f"Tentando carregar progresso anterior para **{selected_file_name}**...")
             
             # Tenta carregar o progresso anterior
-            df_loaded, index_loaded, docs_loaded, lines_loaded_processed = load_progress(st.session_state['zip_hash'], selected_file_name)
+            df_loaded, index_loaded, docs_loaded, lines_loaded_processed, backend_loaded = load_progress(st.session_state['zip_hash'], selected_file_name)
             
             st.session_state['df'] = df_loaded
+            st.session_state['df_partes'] = [df_loaded] if df_loaded is not None else []
             st.session_state['faiss_index'] = index_loaded
+            st.session_state['faiss_versao'] += 1
+            st.session_state['faiss_backend'] = backend_loaded if index_loaded is not None else None
             st.session_state['documents'] = docs_loaded
+            # Blocos de postings salvos com o checkpoint (sem retokenizar o corpus)
+            st.session_state['indice_invertido'] = load_indice_invertido(st.session_state['zip_hash'], selected_file_name, docs_loaded)
+            st.session_state['rag_linhas_amostradas'] = None
             st.session_state['current_chunk_start'] = lines_loaded_processed # Onde deve continuar o chunking
+            # Perfil das colunas salvo com o checkpoint (ou recalculado a partir do df carregado)
+            perfil_loaded = load_perfil(st.session_state['zip_hash'], selected_file_name, lines_loaded_processed)
+            if perfil_loaded is None and df_loaded is not None:
+                perfil_loaded = atualiza_perfil(None, df_loaded)
+            st.session_state['perfil_colunas'] = perfil_loaded
             
             # Tenta obter o total de linhas real do arquivo
             total_lines_file = 0
             try:
-                ext = selected_file_info['extension']
-                if ext == '.csv' or ext == '.txt':
-                    with zipfile.ZipFile(io.BytesIO(st.session_state['zip_bytes']), "r") as z:
-                        with z.open(selected_file_name, 'r') as file_in_zip:
-                            # Subtrai 1 para o cabeçalho
-                            total_lines_file = sum(1 for line in io.TextIOWrapper(file_in_zip, encoding='utf-8', errors='ignore')) - 1 
-                else:
-                    # Para XLSX, apenas usamos uma estimativa inicial alta
+                total_lines_file = agente1_conta_linhas_arquivo(st.session_state['zip_bytes'], selected_file_name)
+                if total_lines_file is None:
+                    # Sem dimensão declarada na planilha, usamos uma estimativa inicial alta
                     total_lines_file = CHUNK_SIZE * 50 
                     
             except Exception as e:
@@ -199,8 +223,9 @@ if st.session_state['available_files']:
             # Verifica se o carregamento foi completo ou se precisa continuar
             if lines_loaded_processed > 0 and lines_loaded_processed >= total_lines_file:
                 st.session_state['df'] = agente_limpeza_dados(st.session_state['df'])
+                st.session_state['df_partes'] = [st.session_state['df']]
                 st.session_state['processed_percentage'] = 100
-                st.success(f"Processamento de **{selected_file_name}** concluído (total de linhas: {len(st.session_state['df'])}).")
+                st.session_state['ingestao_mensagem'] = ('concluido', f"Processamento de **{selected_file_name}** concluído (total de linhas: {len(st.session_state['df'])}).")
                 progress_bar = st.progress(1.0, text="Processamento finalizado. A ferramenta está pronta para uso!")
                 st.rerun() 
             
@@ -209,94 +234,67 @@ if st.session_state['available_files']:
                 st.info(f"Progresso parcial encontrado ({lines_loaded_processed} linhas). Continuaremos o processamento para as {total_lines_file - lines_loaded_processed} linhas restantes.")
                 st.session_state['df_columns'] = st.session_state['df'].columns # Garante que as colunas sejam mantidas
                 st.session_state['df'] = agente_limpeza_dados(st.session_state['df']) # Limpa a parte já carregada
+                st.session_state['df_partes'] = [st.session_state['df']]
             
             # --- INÍCIO DO NOVO PROCESSAMENTO (Se o carregamento falhou ou é a primeira vez) ---
             else:
                 st.info(f"Iniciando novo processamento para **{selected_file_name}** ({st.session_state['total_lines']} linhas estimadas)...")
                 st.session_state['df'] = None
+                st.session_state['df_partes'] = []
                 st.session_state['faiss_index'] = None
-                st.session_state['documents'] = []
+                st.session_state['faiss_versao'] += 1
+                st.session_state['faiss_backend'] = None
+                st.session_state['documents'] = ArmazemDocumentos()
+                st.session_state['indice_invertido'] = None
+                st.session_state['rag_linhas_amostradas'] = None
                 st.session_state['conclusoes_historico'] = ""
                 st.session_state['df_columns'] = None
                 st.session_state['processed_percentage'] = 0
                 st.session_state['cleaned_status'] = {}
+                st.session_state['perfil_colunas'] = None
                 st.session_state['current_chunk_start'] = 0
+                st.session_state['cache_embeddings_stats'] = {'documentos': 0, 'acertos': 0}
                 lines_loaded_processed = 0
 
 
-            # Loop de processamento de chunks
-            progress_bar = st.progress(lines_loaded_processed / st.session_state['total_lines'], 
-                                       text=f"Criando embeddings e índice RAG... {lines_loaded_processed}/{st.session_state['total_lines']} linhas...")
-            
-            start_row = lines_loaded_processed
-            
-            while start_row < st.session_state['total_lines'] or start_row == 0:
-                
-                chunk_processed, msg = agente1_processa_arquivo_chunk(
-                    st.session_state['zip_bytes'], 
-                    selected_file_name, 
-                    start_row, 
-                    CHUNK_SIZE, 
-                    st.session_state['df_columns'],
-                    expected_num_cols
-                )
-                
-                if chunk_processed is not None:
-                    
-                    # 1. Aplica limpeza e concatena
-                    chunk_processed = agente_limpeza_dados(chunk_processed)
-                    
-                    if st.session_state['df'] is None:
-                        st.session_state['df'] = chunk_processed
-                        st.session_state['df_columns'] = chunk_processed.columns
-                        # Re-calcula o número total de colunas esperado
-                        expected_num_cols = len(st.session_state['df_columns'])
-                    else:
-                        # Garante que as colunas do chunk coincidam com o DF principal
-                        if len(chunk_processed.columns) == len(st.session_state['df_columns']):
-                            chunk_processed.columns = st.session_state['df_columns']
-                        st.session_state['df'] = pd.concat([st.session_state['df'], chunk_processed], ignore_index=True)
-                    
-                    # 2. Cria índice RAG para o chunk
-                    create_faiss_index_for_chunk(chunk_processed)
-                    
-                    # 3. Atualiza progresso
-                    start_row += len(chunk_processed)
-                    st.session_state['current_chunk_start'] = start_row
-                    
-                    # Recalibra o total de linhas se necessário
-                    if len(chunk_processed) < CHUNK_SIZE and start_row < st.session_state['total_lines']:
-                         st.session_state['total_lines'] = start_row
-                         
-                    progress_value = min(start_row / st.session_state['total_lines'], 1.0) if st.session_state['total_lines'] > 0 else 1.0
-                    st.session_state['processed_percentage'] = progress_value * 100
-                    
-                    progress_bar.progress(progress_value, 
-                                          text=f"Criando embeddings e índice RAG... {start_row}/{st.session_state['total_lines']} linhas - {st.session_state['processed_percentage']:.1f}%")
-                    
-                    save_progress(st.session_state['zip_hash'], st.session_state['df'], st.session_state['faiss_index'], st.session_state['documents'], st.session_state['total_lines'])
-                    
-                    # Condição de parada (processou o último chunk)
-                    if len(chunk_processed) < CHUNK_SIZE:
-                        st.session_state['total_lines'] = start_row # Fixa o total de linhas
-                        break
-                        
-                else:
-                    if "todos os lotes concluído" in msg:
-                        st.session_state['total_lines'] = start_row # Fixa o total de linhas
-                        break
-                    st.error(msg)
-                    break
-            
-            if st.session_state['df'] is not None and len(st.session_state['df']) > 0:
-                st.session_state['total_lines'] = len(st.session_state['df'])
-                st.success(f"Processamento de **{selected_file_name}** concluído! Total de linhas carregadas: {len(st.session_state['df'])}")
-                progress_bar.progress(1.0, text="Processamento finalizado. A ferramenta está pronta para uso!")
-                st.session_state['processed_percentage'] = 100
-                st.rerun() 
-            else:
-                progress_bar.empty()
-                st.error("Falha ao carregar o arquivo. Verifique se o formato está correto.")
+            # Processamento dos chunks em background (a UI acompanha pela fila de progresso)
+            inicia_ingestao_background(selected_file_name, expected_num_cols, lines_loaded_processed, CHUNK_SIZE)
+            st.rerun()
+
+# Progresso da ingestão em background (atualizado periodicamente sem bloquear a página)
+@st.fragment(run_every=1.0)
+def exibe_progresso_ingestao():
+    status = consulta_progresso_ingestao()
+    if status is None:
+        return
+
+    total = max(status['total'], 1)
+    if status['estado'] == 'executando':
+        st.progress(min(status['linhas'] / total, 1.0),
+                    text=f"Criando embeddings e índice RAG... {status['linhas']}/{status['total']} linhas - {st.session_state['processed_percentage']:.1f}%")
+        if status['estatisticas']:
+            st.caption("Vazão por etapa (linhas/s): " + " | ".join(f"{etapa}: {vazao:,.0f}" for etapa, vazao in status['estatisticas'].items()))
+        # Ao atingir 5% a página inteira é recarregada uma vez para liberar a consulta
+        if st.session_state['processed_percentage'] >= 5.0 and not st.session_state['ingestao'].get('consulta_liberada'):
+            st.session_state['ingestao']['consulta_liberada'] = True
+            st.rerun()
+        return
+
+    # Fim da ingestão: guarda a mensagem final e recarrega a página inteira
+    st.session_state['ingestao_mensagem'] = (status['estado'], status['mensagem'])
+    st.session_state['ingestao'] = None
+    st.rerun()
+
+if st.session_state.get('ingestao') is not None:
+    exibe_progresso_ingestao()
+elif st.session_state.get('ingestao_mensagem'):
+    estado, mensagem = st.session_state['ingestao_mensagem']
+    if estado == 'concluido':
+        st.success(mensagem)
+    elif estado == 'erro':
+        st.error(mensagem)
+    else:
+        st.warning(mensagem)
 
 # Exibe o contexto do arquivo selecionado abaixo da seleção
 if st.session_state.get('selected_file_name'):
@@ -307,11 +305,25 @@ st.markdown("---")
 # --- Seção 2: Consulta à IA e Resultados ---
 st.header("2. Consulta e Análise da IA")
 
-if st.session_state['df'] is None or st.session_state['processed_percentage'] < 5.0:
+if (st.session_state['df'] is None and not st.session_state['df_partes']) or st.session_state['processed_percentage'] < 5.0:
     st.warning("⚠️ O processamento do arquivo deve estar em pelo menos 5% para que a consulta seja liberada.")
 else:
     if st.session_state['file_name_context'] and st.session_state['selected_file_name']:
         st.info(f"Pronto para analisar **{st.session_state['selected_file_name']}**. (Dados processados: **{st.session_state['processed_percentage']:.1f}%**).")
+        stats_cache = st.session_state['cache_embeddings_stats']
+        if stats_cache['documentos'] > 0:
+            st.caption(f"Cache de embeddings: {stats_cache['acertos']}/{stats_cache['documentos']} documentos reaproveitados ({stats_cache['acertos'] / stats_cache['documentos']:.1%}).")
+        stats_llm = st.session_state['cache_llm_stats']
+        if stats_llm['acertos'] + stats_llm['faltas'] > 0:
+            st.caption(f"Cache do Gemini: {stats_llm['acertos']} acertos e {stats_llm['faltas']} chamadas ao modelo.")
+        stats_sandbox = st.session_state['cache_sandbox_stats']
+        if stats_sandbox['acertos'] + stats_sandbox['faltas'] > 0:
+            st.caption(f"Cache do sandbox: {stats_sandbox['acertos']} resultados reaproveitados e {stats_sandbox['faltas']} execuções.")
+        log_tokens = st.session_state['log_tokens_prompt']
+        if log_tokens:
+            # Tokens estimados de cada prompt (mais recente primeiro); 'cache' = resposta sem chamada ao modelo
+            with st.expander(f"Tokens dos prompts ({len(log_tokens)} mais recentes)"):
+                st.dataframe(log_tokens[::-1], use_container_width=True, hide_index=True)
         
     # Colunas para a área de texto, botões de ação e status
     col_query, col_status = st.columns([3, 1])
@@ -349,53 +361,44 @@ else:
     if 'consultar_ia' in st.session_state and st.session_state['consultar_ia']:
         st.session_state['consultar_ia'] = False
         
-        if not st.session_state.get('gemini_api_key'):
-            st.error("Por favor, insira e salve sua API Key do Gemini no menu de Configurações.")
-        elif st.session_state['faiss_index'] is None or st.session_state['faiss_index'].ntotal == 0:
-            st.warning("O índice RAG não foi criado. Por favor, clique em 'Analisar Arquivo' e aguarde o progresso.")
-        else:
-            pergunta_original = pergunta 
-            
-            # --- ETAPA DE CLARIFICAÇÃO ---
-            with st.spinner("Clarificando sua pergunta e corrigindo possíveis erros de digitação..."):
-                pergunta_clarificada = agente0_clarifica_pergunta(pergunta_original, st.session_state['gemini_api_key'])
-            
-            pergunta_para_ia = pergunta_clarificada 
+        pergunta_original = pergunta 
+        df_to_use = consolida_df()
+        
+        # --- ORQUESTRAÇÃO DA CONSULTA ---
+        # Roteador local primeiro: perguntas frequentes não precisam da API Key nem do índice RAG
+        consulta = roteia_consulta(pergunta_original, df_to_use)
+        if consulta is None:
+            if not st.session_state.get('gemini_api_key'):
+                st.error("Por favor, insira e salve sua API Key do Gemini no menu de Configurações.")
+            elif st.session_state['faiss_index'] is None or st.session_state['faiss_index'].ntotal == 0:
+                st.warning("O índice RAG não foi criado. Por favor, clique em 'Analisar Arquivo' e aguarde o progresso.")
+            else:
+                # Clarificação em paralelo com a recuperação (RAG); conclusões em paralelo com a execução
+                with st.spinner("Clarificando a pergunta, gerando código e analisando dados..."):
+                    consulta = orquestra_consulta(pergunta_original, df_to_use, st.session_state['gemini_api_key'])
+        
+        if consulta is not None:
+            pergunta_para_ia = consulta['pergunta']
+            codigo_gerado, conclusoes = consulta['codigo'], consulta['conclusoes']
             
-            # Exibe a correção se ela ocorreu
-            if pergunta_para_ia != pergunta_original:
+            if consulta['intencao'] is not None:
+                st.caption(f"⚡ Resposta local (intenção: {consulta['intencao']}), sem chamadas ao Gemini.")
+            elif pergunta_para_ia != pergunta_original:
+                # Exibe a correção se ela ocorreu
                  st.warning(f"Sua consulta foi clarificada para: **{pergunta_para_ia}**")
             
-            with st.spinner("Gerando código e analisando dados..."):
-                df_to_use = st.session_state['df']
-                faiss_index = st.session_state['faiss_index']
-                documents = st.session_state['documents']
-                api_key = st.session_state['gemini_api_key']
-
-                # 1. Recupera o Contexto (RAG)
-                retrieved_context = retrieve_context(pergunta_para_ia, faiss_index, documents)
-                
-                # 2. Gera Código e Conclusão
-                codigo_gerado, conclusoes = agente2_gera_codigo_pandas_eda(
-                    pergunta_para_ia, 
-                    api_key, 
-                    df_to_use, 
-                    retrieved_context, 
-                    st.session_state['conclusoes_historico'],
-                    st.session_state['file_name_context'] 
-                )
-                
+            with st.spinner("Preparando o resultado..."):
                 if conclusoes:
                     # Adiciona a nova conclusão ao histórico e atualiza a sidebar
                     st.session_state['conclusoes_historico'] += f"\n- {conclusoes}"
                 
                 st.session_state['codigo_gerado'] = codigo_gerado
                 
-                # 3. Executa o Código
+                # 3. Resultado da execução do código
                 if codigo_gerado.startswith("Erro:"):
                     st.error(codigo_gerado)
                 else:
-                    resultado_texto, resultado_df, erro_execucao, img_bytes = executa_codigo_seguro(codigo_gerado, df_to_use)
+                    resultado_texto, resultado_df, erro_execucao, img_bytes = consulta['resultado']
                     
                     st.session_state['resultado_texto'] = resultado_texto
                     st.session_state['resultado_df'] = resultado_df
@@ -1 +1,6 @@
-from modules.init_session_state import init_session_state
\ No newline at end of file
+from modules.init_session_state import init_session_state
+from modules.acumula_chunk_df import acumula_chunk_df
+from modules.consolida_df import consolida_df
+from modules.perfil_colunas import atualiza_perfil, resumo_perfil_df, correlacao_perfil_df, perfil_texto
+from modules.orquestra_consulta import orquestra_consulta, roteia_consulta
+from modules.orcamento_prompt import monta_contexto_prompt
\ No newline at end of file
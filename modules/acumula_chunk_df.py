@@ -0,0 +1,15 @@
+import streamlit as st
+
+def acumula_chunk_df(chunk):
+    """
+    Acumula um chunk já limpo sem copiar o DataFrame principal.
+    A consolidação acontece sob demanda em consolida_df().
+    """
+    if chunk is None or chunk.empty:
+        return False
+
+    with st.session_state['rag_lock']:
+        if st.session_state.get('df_partes') is None:
+            st.session_state['df_partes'] = []
+        st.session_state['df_partes'].append(chunk)
+    return True
\ No newline at end of file
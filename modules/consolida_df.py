@@ -0,0 +1,40 @@
+import pandas as pd
+import streamlit as st
+
+def _alinha_categorias(partes):
+    """Unifica as categorias de colunas categóricas para que o concat preserve o dtype."""
+    for col in partes[0].columns:
+        series = [parte[col] for parte in partes if col in parte.columns]
+        if not all(isinstance(s.dtype, pd.CategoricalDtype) for s in series):
+            continue
+
+        categorias = series[0].cat.categories
+        for s in series[1:]:
+            categorias = categorias.append(s.cat.categories).unique()
+
+        for parte in partes:
+            if col in parte.columns and not parte[col].cat.categories.equals(categorias):
+                parte[col] = parte[col].cat.set_categories(categorias)
+
+def consolida_df():
+    """
+    Constrói o DataFrame consolidado a partir dos chunks acumulados (uma única cópia)
+    e o publica em st.session_state['df'].
+    """
+    # A trava evita que um chunk acumulado pela ingestão em background se perca
+    with st.session_state['rag_lock']:
+        partes = st.session_state.get('df_partes') or []
+
+        if len(partes) == 0:
+            return st.session_state.get('df')
+
+        if len(partes) == 1:
+            df = partes[0]
+        else:
+            _alinha_categorias(partes)
+            df = pd.concat(partes, ignore_index=True, copy=False)
+
+        # Mantém apenas o DataFrame consolidado para liberar os chunks individuais
+        st.session_state['df_partes'] = [df]
+        st.session_state['df'] = df
+        return df
\ No newline at end of file
@@ -0,0 +1,287 @@
+import time
+import queue
+import threading
+import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+from agents.agente_limpeza_dados import agente_limpeza_dados
+from agents.agente1 import agente1_processa_arquivo_chunk
+from modules.acumula_chunk_df import acumula_chunk_df
+from modules.consolida_df import consolida_df
+from modules.perfil_colunas import atualiza_perfil_sessao
+from rag_components.create_faiss_index_for_chunk import prepara_embeddings_chunk, adiciona_chunk_indice
+from rag_components.adiciona_documentos_resumo import adiciona_documentos_resumo
+from rag_components.save_progress import save_progress, save_documentos_resumo
+
+# Capacidade das filas entre as etapas (limita os chunks em memória)
+TAMANHO_FILA_ETAPAS = 2
+ETAPAS = ['leitura', 'limpeza', 'embedding', 'indice']
+_FIM = None
+
+def _publica(fila, estado, linhas, total, mensagem="", estatisticas=None):
+    fila.put({'estado': estado, 'linhas': linhas, 'total': total, 'mensagem': mensagem, 'estatisticas': estatisticas or {}})
+
+def _coloca(fila, item, parar):
+    """put bloqueante (backpressure) que desiste se a ingestão for interrompida."""
+    while not parar.is_set():
+        try:
+            fila.put(item, timeout=0.5)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+def _retira(fila, parar):
+    """get bloqueante que desiste se a ingestão for interrompida."""
+    while not parar.is_set():
+        try:
+            return fila.get(timeout=0.5)
+        except queue.Empty:
+            continue
+    return _FIM
+
+def _cria_pipeline(parar, tamanho_fila):
+    """Estado compartilhado pelas etapas: filas limitadas, erro e vazão por etapa."""
+    return {
+        'parar': parar,
+        'filas': {etapa: queue.Queue(maxsize=tamanho_fila) for etapa in ETAPAS[1:]},
+        'erro': None,
+        'estatisticas': {etapa: {'linhas': 0, 'segundos': 0.0} for etapa in ETAPAS},
+        'trava': threading.Lock(),
+    }
+
+def _registra(pipeline, etapa, linhas, inicio):
+    with pipeline['trava']:
+        pipeline['estatisticas'][etapa]['linhas'] += linhas
+        pipeline['estatisticas'][etapa]['segundos'] += time.perf_counter() - inicio
+
+def _vazao(pipeline):
+    """Linhas por segundo de trabalho efetivo de cada etapa."""
+    with pipeline['trava']:
+        return {
+            etapa: (e['linhas'] / e['segundos'] if e['segundos'] > 0 else 0.0)
+            for etapa, e in pipeline['estatisticas'].items()
+        }
+
+def _falha(pipeline, mensagem):
+    if pipeline['erro'] is None:
+        pipeline['erro'] = mensagem
+    pipeline['parar'].set()
+
+def _etapa_leitura(pipeline, zip_bytes, selected_file_name, expected_num_cols, start_row, chunk_size):
+    """Etapa 1: leitura dos chunks do arquivo (leitor contínuo do agente1)."""
+    saida = pipeline['filas']['limpeza']
+    try:
+        while (start_row < st.session_state['total_lines'] or start_row == 0) and not pipeline['parar'].is_set():
+            inicio = time.perf_counter()
+            if st.session_state['df_columns'] is not None:
+                expected_num_cols = len(st.session_state['df_columns'])
+
+            chunk_processed, msg = agente1_processa_arquivo_chunk(
+                zip_bytes,
+                selected_file_name,
+                start_row,
+                chunk_size,
+                st.session_state['df_columns'],
+                expected_num_cols
+            )
+
+            if chunk_processed is None:
+                if "todos os lotes concluído" in msg:
+                    st.session_state['total_lines'] = start_row # Fixa o total de linhas
+                    break
+                _falha(pipeline, msg)
+                return
+
+            chunk_start_row = start_row
+            start_row += len(chunk_processed)
+
+            # Recalibra o total de linhas se necessário
+            if len(chunk_processed) < chunk_size and start_row < st.session_state['total_lines']:
+                st.session_state['total_lines'] = start_row
+
+            _registra(pipeline, 'leitura', len(chunk_processed), inicio)
+            if not _coloca(saida, (chunk_start_row, chunk_processed), pipeline['parar']):
+                return
+
+            # Condição de parada (processou o último chunk)
+            if len(chunk_processed) < chunk_size:
+                st.session_state['total_lines'] = start_row # Fixa o total de linhas
+                break
+    except Exception as e:
+        _falha(pipeline, f"Erro na leitura: {e}")
+    finally:
+        _coloca(saida, _FIM, pipeline['parar'])
+
+def _etapa_limpeza(pipeline):
+    """Etapa 2: limpeza/tipagem e acúmulo do chunk no DataFrame."""
+    entrada, saida = pipeline['filas']['limpeza'], pipeline['filas']['embedding']
+    try:
+        while (item := _retira(entrada, pipeline['parar'])) is not _FIM:
+            chunk_start_row, chunk_processed = item
+            inicio = time.perf_counter()
+
+            # Aplica limpeza e acumula (a consolidação do DF é feita sob demanda)
+            chunk_processed = agente_limpeza_dados(chunk_processed)
+
+            if not st.session_state['df_partes']:
+                st.session_state['df_columns'] = chunk_processed.columns
+            else:
+                # Garante que as colunas do chunk coincidam com o DF principal
+                if len(chunk_processed.columns) == len(st.session_state['df_columns']):
+                    chunk_processed.columns = st.session_state['df_columns']
+            acumula_chunk_df(chunk_processed)
+
+            _registra(pipeline, 'limpeza', len(chunk_processed), inicio)
+            if not _coloca(saida, (chunk_start_row, chunk_processed), pipeline['parar']):
+                return
+    except Exception as e:
+        _falha(pipeline, f"Erro na limpeza: {e}")
+    finally:
+        _coloca(saida, _FIM, pipeline['parar'])
+
+def _etapa_embedding(pipeline):
+    """Etapa 3: serialização e embedding (a parte mais pesada de CPU)."""
+    entrada, saida = pipeline['filas']['embedding'], pipeline['filas']['indice']
+    try:
+        while (item := _retira(entrada, pipeline['parar'])) is not _FIM:
+            chunk_start_row, chunk_processed = item
+            inicio = time.perf_counter()
+            embeddings_chunk, docs_chunk = prepara_embeddings_chunk(chunk_processed, chunk_start_row)
+            _registra(pipeline, 'embedding', len(chunk_processed), inicio)
+            if not _coloca(saida, (chunk_start_row, chunk_processed, embeddings_chunk, docs_chunk), pipeline['parar']):
+                return
+    except Exception as e:
+        _falha(pipeline, f"Erro no embedding: {e}")
+    finally:
+        _coloca(saida, _FIM, pipeline['parar'])
+
+def _etapa_indice(pipeline, fila_progresso, zip_hash, selected_file_name):
+    """Etapa 4: índice FAISS e checkpoint incremental, na ordem dos chunks."""
+    entrada = pipeline['filas']['indice']
+    try:
+        while (item := _retira(entrada, pipeline['parar'])) is not _FIM:
+            chunk_start_row, chunk_processed, embeddings_chunk, docs_chunk = item
+            inicio = time.perf_counter()
+
+            bloco_invertido = adiciona_chunk_indice(embeddings_chunk, docs_chunk)
+            # Perfil das colunas na ordem dos chunks, coerente com o checkpoint
+            atualiza_perfil_sessao(chunk_processed)
+            save_progress(zip_hash, chunk_processed, embeddings_chunk, docs_chunk, chunk_start_row, st.session_state['total_lines'], selected_file_name, bloco_invertido=bloco_invertido)
+
+            _registra(pipeline, 'indice', len(chunk_processed), inicio)
+            _publica(fila_progresso, 'executando', chunk_start_row + len(chunk_processed), st.session_state['total_lines'], estatisticas=_vazao(pipeline))
+    except Exception as e:
+        _falha(pipeline, f"Erro na indexação: {e}")
+
+def _executa_ingestao(fila, parar, zip_bytes, zip_hash, selected_file_name, expected_num_cols, start_row, chunk_size):
+    """
+    Coordena a ingestão em background como um pipeline leitura -> limpeza -> embedding
+    -> índice/checkpoint, com uma thread por etapa ligadas por filas limitadas.
+    """
+    pipeline = _cria_pipeline(parar, st.session_state.get('ingestao_tamanho_fila', TAMANHO_FILA_ETAPAS))
+    ctx = get_script_run_ctx()
+    threads = [
+        threading.Thread(target=_etapa_leitura, args=(pipeline, zip_bytes, selected_file_name, expected_num_cols, start_row, chunk_size), daemon=True),
+        threading.Thread(target=_etapa_limpeza, args=(pipeline,), daemon=True),
+        threading.Thread(target=_etapa_embedding, args=(pipeline,), daemon=True),
+        threading.Thread(target=_etapa_indice, args=(pipeline, fila, zip_hash, selected_file_name), daemon=True),
+    ]
+    for etapa, thread in zip(ETAPAS, threads):
+        thread.name = f"ingestao-{etapa}"
+        add_script_run_ctx(thread, ctx)
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    try:
+        if pipeline['erro'] is not None:
+            _publica(fila, 'erro', st.session_state['current_chunk_start'], st.session_state['total_lines'], pipeline['erro'], _vazao(pipeline))
+            return
+        if parar.is_set():
+            _publica(fila, 'interrompido', st.session_state['current_chunk_start'], st.session_state['total_lines'], "Processamento interrompido.", _vazao(pipeline))
+            return
+
+        df = consolida_df()
+        if df is None or len(df) == 0:
+            _publica(fila, 'erro', 0, st.session_state['total_lines'], "Falha ao carregar o arquivo. Verifique se o formato está correto.")
+            return
+
+        # Modo de orçamento: acrescenta os documentos de perfil (colunas e grupos)
+        if st.session_state['rag_modo_corpus'] == 'orcamento':
+            embeddings_resumo, docs_resumo = adiciona_documentos_resumo(df)
+            save_documentos_resumo(zip_hash, embeddings_resumo, docs_resumo, selected_file_name)
+
+        st.session_state['total_lines'] = len(df)
+        _publica(fila, 'concluido', len(df), len(df), f"Processamento de **{selected_file_name}** concluído! Total de linhas carregadas: {len(df)}", _vazao(pipeline))
+
+    except Exception as e:
+        _publica(fila, 'erro', 0, st.session_state.get('total_lines', 0), f"Erro na ingestão: {e}")
+
+def inicia_ingestao_background(selected_file_name, expected_num_cols, start_row, chunk_size):
+    """
+    Inicia a ingestão em uma thread de background, desacoplada da execução do script.
+    A thread recebe o contexto da sessão para compartilhar o session_state com a UI.
+    """
+    para_ingestao_background()
+
+    fila = queue.Queue()
+    parar = threading.Event()
+    thread = threading.Thread(
+        target=_executa_ingestao,
+        args=(
+            fila,
+            parar,
+            st.session_state['zip_bytes'],
+            st.session_state['zip_hash'],
+            selected_file_name,
+            expected_num_cols,
+            start_row,
+            chunk_size
+        ),
+        name=f"ingestao-{selected_file_name}",
+        daemon=True
+    )
+    add_script_run_ctx(thread, get_script_run_ctx())
+
+    st.session_state['ingestao'] = {
+        'thread': thread,
+        'fila': fila,
+        'parar': parar,
+        'arquivo': selected_file_name,
+        'status': {'estado': 'executando', 'linhas': start_row, 'total': st.session_state['total_lines'], 'mensagem': "", 'estatisticas': {}}
+    }
+    thread.start()
+
+def consulta_progresso_ingestao():
+    """
+    Consome as mensagens de progresso da fila (chamado pela UI a cada atualização)
+    e retorna o status mais recente da ingestão, ou None se não houver ingestão.
+    """
+    ingestao = st.session_state.get('ingestao')
+    if ingestao is None:
+        return None
+
+    while True:
+        try:
+            ingestao['status'] = ingestao['fila'].get_nowait()
+        except queue.Empty:
+            break
+
+    status = ingestao['status']
+    st.session_state['current_chunk_start'] = status['linhas']
+    if status['estado'] == 'concluido':
+        st.session_state['processed_percentage'] = 100
+    elif status['total'] > 0:
+        st.session_state['processed_percentage'] = min(status['linhas'] / status['total'], 1.0) * 100
+    return status
+
+def para_ingestao_background(timeout=30):
+    """Sinaliza a interrupção da ingestão em andamento e aguarda o fim do chunk atual."""
+    ingestao = st.session_state.get('ingestao')
+    if ingestao is None:
+        return
+    ingestao['parar'].set()
+    if ingestao['thread'].is_alive() and ingestao['thread'] is not threading.current_thread():
+        ingestao['thread'].join(timeout)
+    st.session_state['ingestao'] = None
\ No newline at end of file
@@ -1,4 +1,21 @@
+import threading
 import streamlit as st
+from rag_components.adiciona_embeddings_indice import (
+    COMPRESSAO_INDICE,
+    LIMIAR_INDICE_ANN,
+    RERANK_EXATO,
+    TIPO_INDICE_ANN
+)
+from rag_components.serializa_documentos import PRECISAO_FLOAT
+from rag_components.create_faiss_index_for_chunk import MODO_CORPUS
+from rag_components.amostra_estratificada_chunk import ORCAMENTO_EMBEDDINGS
+from rag_components.executor_embeddings import NUM_PROCESSOS_EMBEDDING
+from rag_components.load_embedding_model import BACKEND_EMBEDDING
+from rag_components.retrieve_context_batch import MODO_BUSCA
+from rag_components.armazem_documentos import ArmazemDocumentos
+from modules.ingestao_background import TAMANHO_FILA_ETAPAS
+from modules.orcamento_prompt import ORCAMENTO_TOKENS_PROMPT
+from sandboxing.pool_sandbox import LIMITE_MEMORIA_SANDBOX_MB, LIMITE_TEMPO_SANDBOX, NUM_PROCESSOS_SANDBOX
 
 def init_session_state():
     if 'gemini_api_key' not in st.session_state:
@@ -18,20 +35,117 @@ def init_session_state():
         st.session_state['selected_file_name'] = None
     if 'df' not in st.session_state:
         st.session_state['df'] = None
+    if 'df_partes' not in st.session_state:
+        st.session_state['df_partes'] = []
+    # Ingestão em background e trava compartilhada (df_partes, índice e documentos)
+    if 'ingestao' not in st.session_state:
+        st.session_state['ingestao'] = None
+    if 'ingestao_mensagem' not in st.session_state:
+        st.session_state['ingestao_mensagem'] = None
+    if 'ingestao_tamanho_fila' not in st.session_state:
+        st.session_state['ingestao_tamanho_fila'] = TAMANHO_FILA_ETAPAS
+    if 'rag_lock' not in st.session_state:
+        st.session_state['rag_lock'] = threading.RLock()
     if 'df_columns' not in st.session_state:
         st.session_state['df_columns'] = None
     if 'faiss_index' not in st.session_state:
         st.session_state['faiss_index'] = None
+    # Versão do índice (chave dos caches de consultas) e caches LRU de consultas
+    if 'faiss_versao' not in st.session_state:
+        st.session_state['faiss_versao'] = 0
+    if 'cache_embeddings_consultas' not in st.session_state:
+        st.session_state['cache_embeddings_consultas'] = None
+    if 'cache_resultados_consultas' not in st.session_state:
+        st.session_state['cache_resultados_consultas'] = None
+    # Índice aproximado (IVF/HNSW) a partir de um número de vetores
+    if 'faiss_tipo_ann' not in st.session_state:
+        st.session_state['faiss_tipo_ann'] = TIPO_INDICE_ANN
+    if 'faiss_limiar_ann' not in st.session_state:
+        st.session_state['faiss_limiar_ann'] = LIMIAR_INDICE_ANN
+    # Compressão dos vetores do índice/checkpoint ('nenhuma', 'float16', 'sq8', 'pq')
+    if 'faiss_compressao' not in st.session_state:
+        st.session_state['faiss_compressao'] = COMPRESSAO_INDICE
+    if 'faiss_rerank_exato' not in st.session_state:
+        st.session_state['faiss_rerank_exato'] = RERANK_EXATO
+    # Serialização das linhas em documentos ('COL=valor'); None = todas as colunas
+    if 'rag_colunas_documento' not in st.session_state:
+        st.session_state['rag_colunas_documento'] = None
+    if 'rag_precisao_float' not in st.session_state:
+        st.session_state['rag_precisao_float'] = PRECISAO_FLOAT
+    # Backend de embedding ('minilm', 'minilm_onnx_int8', 'hashing') e o que construiu o índice atual
+    if 'embedding_backend' not in st.session_state:
+        st.session_state['embedding_backend'] = BACKEND_EMBEDDING
+    if 'faiss_backend' not in st.session_state:
+        st.session_state['faiss_backend'] = None
+    # Processos do pool de embedding em CPU (1 = no próprio processo)
+    if 'embedding_num_processos' not in st.session_state:
+        st.session_state['embedding_num_processos'] = NUM_PROCESSOS_EMBEDDING
+    # Cache persistente de embeddings (modelo, hash do documento)
+    if 'cache_embeddings_ativo' not in st.session_state:
+        st.session_state['cache_embeddings_ativo'] = True
+    if 'cache_embeddings_stats' not in st.session_state:
+        st.session_state['cache_embeddings_stats'] = {'documentos': 0, 'acertos': 0}
+    # Cache persistente de respostas do Gemini (chave: modelo + hash do prompt)
+    if 'cache_llm_ativo' not in st.session_state:
+        st.session_state['cache_llm_ativo'] = True
+    if 'cache_llm_stats' not in st.session_state:
+        st.session_state['cache_llm_stats'] = {'acertos': 0, 'faltas': 0}
+    # Modo de chamada única ao Gemini (saída JSON estruturada)
+    if 'modo_consulta_unica' not in st.session_state:
+        st.session_state['modo_consulta_unica'] = False
+    # Orçamento de tokens das partes variáveis do prompt e registro do consumo por prompt
+    if 'orcamento_tokens_prompt' not in st.session_state:
+        st.session_state['orcamento_tokens_prompt'] = ORCAMENTO_TOKENS_PROMPT
+    if 'log_tokens_prompt' not in st.session_state:
+        st.session_state['log_tokens_prompt'] = []
+    # Pool de processos do sandbox (0 = no próprio processo), limites e dataset publicado (Arrow)
+    if 'sandbox_num_processos' not in st.session_state:
+        st.session_state['sandbox_num_processos'] = NUM_PROCESSOS_SANDBOX
+    if 'sandbox_limite_tempo' not in st.session_state:
+        st.session_state['sandbox_limite_tempo'] = LIMITE_TEMPO_SANDBOX
+    if 'sandbox_limite_memoria_mb' not in st.session_state:
+        st.session_state['sandbox_limite_memoria_mb'] = LIMITE_MEMORIA_SANDBOX_MB
+    if 'sandbox_dataset' not in st.session_state:
+        st.session_state['sandbox_dataset'] = None
+    # Cache de resultados do sandbox (hash do código, por versão do dataset)
+    if 'cache_resultados_sandbox' not in st.session_state:
+        st.session_state['cache_resultados_sandbox'] = None
+    if 'cache_sandbox_stats' not in st.session_state:
+        st.session_state['cache_sandbox_stats'] = {'acertos': 0, 'faltas': 0}
+    # Corpus RAG: 'completo' (uma linha = um documento) ou 'orcamento' (amostra + resumos)
+    if 'rag_modo_corpus' not in st.session_state:
+        st.session_state['rag_modo_corpus'] = MODO_CORPUS
+    if 'rag_orcamento_embeddings' not in st.session_state:
+        st.session_state['rag_orcamento_embeddings'] = ORCAMENTO_EMBEDDINGS
+    if 'rag_coluna_estrato' not in st.session_state:
+        st.session_state['rag_coluna_estrato'] = None
+    # Linhas já amostradas no modo de orçamento (None = contar a partir de 'documents')
+    if 'rag_linhas_amostradas' not in st.session_state:
+        st.session_state['rag_linhas_amostradas'] = None
     if 'documents' not in st.session_state:
-        st.session_state['documents'] = []
+        # Documentos do RAG em buffer UTF-8 contíguo + offsets
+        st.session_state['documents'] = ArmazemDocumentos()
+    # Índice invertido (BM25) para buscas por valores literais e modo de busca do RAG
+    if 'indice_invertido' not in st.session_state:
+        st.session_state['indice_invertido'] = None
+    if 'rag_modo_busca' not in st.session_state:
+        st.session_state['rag_modo_busca'] = MODO_BUSCA
     if 'total_lines' not in st.session_state:
         st.session_state['total_lines'] = 0
     if 'processed_percentage' not in st.session_state:
         st.session_state['processed_percentage'] = 0
     if 'current_chunk_start' not in st.session_state:
         st.session_state['current_chunk_start'] = 0
+    if 'leitor_chunks' not in st.session_state:
+        st.session_state['leitor_chunks'] = None
     if 'cleaned_status' not in st.session_state:
         st.session_state['cleaned_status'] = {}
+    # Plano de tipos por coluna (inferido no primeiro chunk e aplicado aos demais)
+    if 'plano_tipos' not in st.session_state:
+        st.session_state['plano_tipos'] = None
+    # Perfil incremental das colunas (contagens, momentos, quantis, histogramas, covariância)
+    if 'perfil_colunas' not in st.session_state:
+        st.session_state['perfil_colunas'] = None
     if 'file_name_context' not in st.session_state:
         st.session_state['file_name_context'] = ""
     if 'conclusoes_historico' not in st.session_state:
@@ -0,0 +1,133 @@
+import re
+import streamlit as st
+from helpers.estima_tokens import estima_tokens
+from helpers.normalize_text import normalize_text
+from modules.perfil_colunas import perfil_texto
+
+# Orçamento (aproximado, em tokens) das partes variáveis do prompt e sua divisão
+ORCAMENTO_TOKENS_PROMPT = 6000
+DIVISAO_ORCAMENTO = {'esquema': 0.25, 'perfil': 0.2, 'rag': 0.35, 'historico': 0.2}
+# Conclusões mais recentes mantidas por inteiro; as anteriores viram um resumo
+CONCLUSOES_RECENTES = 3
+
+def _termos(texto):
+    return set(re.findall(r"[A-Z0-9]+", normalize_text(str(texto)).upper()))
+
+def ordena_colunas_relevancia(pergunta, colunas):
+    """
+    Ordena as colunas pela relevância para a pergunta: citação exata do nome primeiro,
+    depois termos em comum com o nome; o empate mantém a ordem original.
+    """
+    pergunta_limpa = " ".join(normalize_text(pergunta).upper().split())
+    termos_pergunta = _termos(pergunta)
+
+    def pontuacao(item):
+        posicao, col = item
+        nome = normalize_text(str(col)).upper()
+        citada = re.search(rf"(?<![A-Z0-9_]){re.escape(nome)}(?![A-Z0-9_])", pergunta_limpa) is not None
+        return (-int(citada), -len(_termos(col) & termos_pergunta), posicao)
+
+    return [col for _, col in sorted(enumerate(colunas), key=pontuacao)]
+
+def esquema_orcado(pergunta, df, max_tokens):
+    """
+    Esquema com as colunas mais relevantes por inteiro ('- COL (dtype: ...)') e um
+    resumo compacto das demais (quantidade por dtype e nomes até o limite).
+    Retorna (texto, colunas_detalhadas).
+    """
+    linhas, detalhadas, usados = [], [], 0
+    ordenadas = ordena_colunas_relevancia(pergunta, df.columns)
+    for col in ordenadas:
+        linha = f"- {col} (dtype: {df[col].dtype})"
+        if usados + estima_tokens(linha) > max_tokens * 0.8:
+            break
+        linhas.append(linha)
+        detalhadas.append(col)
+        usados += estima_tokens(linha)
+
+    restantes = [col for col in ordenadas if col not in set(detalhadas)]
+    if restantes:
+        por_dtype = {}
+        for col in restantes:
+            por_dtype[str(df[col].dtype)] = por_dtype.get(str(df[col].dtype), 0) + 1
+        tipos = ", ".join(f"{dtype}: {qtd}" for dtype, qtd in por_dtype.items())
+        resumo = f"- (+{len(restantes)} outras colunas; {tipos}): "
+        nomes = []
+        for col in restantes:
+            if usados + estima_tokens(resumo + ", ".join(nomes + [str(col)])) > max_tokens:
+                nomes.append("...")
+                break
+            nomes.append(str(col))
+        linhas.append(resumo + ", ".join(nomes))
+    return "\n".join(linhas), detalhadas
+
+def historico_orcado(historico_conclusoes, max_tokens):
+    """
+    Mantém as conclusões mais recentes por inteiro e resume as anteriores (primeira frase
+    de cada, das mais novas para as mais antigas) dentro do limite.
+    """
+    # O histórico é acumulado como "\n- conclusão" a cada consulta
+    conclusoes = [c.strip() for c in ("\n" + (historico_conclusoes or "")).split("\n- ") if c.strip()]
+    if not conclusoes:
+        return ""
+
+    recentes = conclusoes[-CONCLUSOES_RECENTES:]
+    texto_recentes = "\n".join(f"- {c}" for c in recentes)
+    while recentes and estima_tokens(texto_recentes) > max_tokens:
+        recentes = recentes[1:]
+        texto_recentes = "\n".join(f"- {c}" for c in recentes)
+
+    antigas = conclusoes[:len(conclusoes) - len(recentes)]
+    if not antigas:
+        return texto_recentes
+
+    resumo = []
+    orcamento_resumo = max_tokens - estima_tokens(texto_recentes)
+    for conclusao in reversed(antigas):
+        frase = conclusao.split(". ")[0].rstrip(".") + "."
+        if estima_tokens(" ".join([frase] + resumo)) > orcamento_resumo - 20:
+            break
+        resumo.insert(0, frase)
+    if not resumo:
+        return texto_recentes
+    return f"- Resumo de {len(antigas)} conclusões anteriores: {' '.join(resumo)}\n{texto_recentes}"
+
+def contexto_rag_orcado(retrieved_context, max_tokens):
+    """Mantém os documentos recuperados (um por linha, do mais relevante) que cabem no limite."""
+    linhas, usados = [], 0
+    for linha in (retrieved_context or "").split("\n"):
+        if usados + estima_tokens(linha) > max_tokens:
+            break
+        linhas.append(linha)
+        usados += estima_tokens(linha)
+    return "\n".join(linhas)
+
+def monta_contexto_prompt(pergunta, df, retrieved_context=None, historico_conclusoes=None, perfil=None, orcamento=None):
+    """
+    Monta as partes variáveis do prompt (esquema, perfil, contexto RAG e histórico)
+    dentro do orçamento de tokens. Retorna um dict com os textos e o detalhamento
+    ('tokens', incluindo o tamanho 'original' de cada parte antes do corte).
+    """
+    if orcamento is None:
+        orcamento = st.session_state.get('orcamento_tokens_prompt', ORCAMENTO_TOKENS_PROMPT)
+    limites = {parte: int(orcamento * fracao) for parte, fracao in DIVISAO_ORCAMENTO.items()}
+
+    esquema, detalhadas = esquema_orcado(pergunta, df, limites['esquema'])
+    texto_perfil = ""
+    if perfil:
+        colunas_perfil = [str(col) for col in detalhadas]
+        texto_perfil = perfil_texto(perfil, colunas=colunas_perfil)
+        texto_perfil = contexto_rag_orcado(texto_perfil, limites['perfil'])
+    contexto = {
+        'esquema': esquema,
+        'perfil': texto_perfil,
+        'rag': contexto_rag_orcado(retrieved_context, limites['rag']),
+        'historico': historico_orcado(historico_conclusoes, limites['historico'])
+    }
+    contexto['tokens'] = {parte: estima_tokens(texto) for parte, texto in contexto.items()}
+    contexto['tokens']['original'] = {
+        'esquema': estima_tokens("\n".join(f"- {c} (dtype: {df[c].dtype})" for c in df.columns)),
+        'rag': estima_tokens(retrieved_context),
+        'historico': estima_tokens(historico_conclusoes)
+    }
+    return contexto
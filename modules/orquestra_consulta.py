@@ -0,0 +1,116 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from agents.agente0 import agente0_clarifica_pergunta
+from agents.agente2 import agente2_gera_codigo_pandas_eda, agente2_gera_conclusoes
+from agents.agente_roteador_intencoes import agente_roteador_intencoes
+from agents.agente_consulta_unica import agente_consulta_unica, preenche_modelo_conclusao
+from helpers.obtem_modelo_gemini import obtem_modelo_gemini
+from rag_components.retrieve_context import retrieve_context
+from sandboxing.executa_codigo_seguro import executa_codigo_seguro
+
+def _vincula_contexto(ctx):
+    """Dá às threads do executor acesso ao session_state da sessão."""
+    add_script_run_ctx(threading.current_thread(), ctx)
+
+def _recupera_contexto(pergunta):
+    # Trava compartilhada com a ingestão em background
+    with st.session_state['rag_lock']:
+        return retrieve_context(pergunta, st.session_state['faiss_index'], st.session_state['documents'], backend=st.session_state['faiss_backend'])
+
+def roteia_consulta(pergunta_original, df):
+    """
+    Roteador local de intenções (templates, sem chamadas ao Gemini): não depende da API key
+    nem do índice RAG. Retorna o dict da consulta (ver orquestra_consulta), já com o
+    resultado executado, ou None se a pergunta precisar do Gemini.
+    """
+    if df is None:
+        return None
+
+    with st.session_state['rag_lock']:
+        codigo_gerado, conclusoes, intencao = agente_roteador_intencoes(pergunta_original, df, st.session_state['perfil_colunas'])
+    if intencao is None:
+        return None
+
+    consulta = {'pergunta': pergunta_original, 'intencao': intencao, 'codigo': codigo_gerado, 'conclusoes': conclusoes, 'resultado': None}
+    consulta['resultado'] = executa_codigo_seguro(codigo_gerado, df)
+    return consulta
+
+def orquestra_consulta(pergunta_original, df, api_key, model=None):
+    """
+    Executa uma consulta sobrepondo as etapas independentes:
+    - roteador local: perguntas frequentes não chamam o Gemini;
+    - a clarificação (Gemini) roda enquanto o contexto RAG é recuperado e o cliente é preparado;
+    - as conclusões (Gemini) são geradas enquanto o código roda no sandbox.
+    No modo 'modo_consulta_unica' uma só chamada estruturada (agente_consulta_unica) substitui
+    as três, e a conclusão é preenchida localmente com o resultado; 'model' permite injetar
+    um modelo local (ex.: ModeloGeminiStub). Em caso de falha volta ao fluxo normal, exceto
+    com 'model' injetado (retorna o erro em 'codigo', sem chamar o Gemini).
+    Retorna um dict com pergunta, intencao, codigo, conclusoes e resultado
+    (resultado_texto, resultado_df, erro_execucao, img_bytes) ou None se o código for um erro.
+    """
+    # 1. Roteador local de intenções (templates, sem chamadas ao Gemini)
+    consulta = roteia_consulta(pergunta_original, df)
+    if consulta is not None:
+        return consulta
+    consulta = {'pergunta': pergunta_original, 'intencao': None, 'codigo': None, 'conclusoes': None, 'resultado': None}
+
+    # 2. Modo de chamada única: clarificação + código + modelo de conclusão
+    if st.session_state.get('modo_consulta_unica') or model is not None:
+        resposta = agente_consulta_unica(
+            pergunta_original,
+            api_key,
+            df,
+            _recupera_contexto(pergunta_original),
+            st.session_state['conclusoes_historico'],
+            st.session_state['file_name_context'],
+            st.session_state['perfil_colunas'],
+            model=model
+        )
+        if resposta is not None:
+            consulta.update({'pergunta': resposta['pergunta_clarificada'], 'intencao': None, 'codigo': resposta['codigo']})
+            consulta['resultado'] = executa_codigo_seguro(resposta['codigo'], df)
+            resultado_texto, resultado_df, erro_execucao, _ = consulta['resultado']
+            if not erro_execucao:
+                consulta['conclusoes'] = preenche_modelo_conclusao(resposta['modelo_conclusao'], resultado_texto, resultado_df)
+            return consulta
+        if model is not None:
+            # Modelo injetado: o fluxo normal usaria o Gemini real (api_key)
+            consulta['codigo'] = "Erro: a resposta do modelo não pôde ser interpretada (consulta única)."
+            return consulta
+
+    with ThreadPoolExecutor(max_workers=2, thread_name_prefix="consulta", initializer=_vincula_contexto, initargs=(get_script_run_ctx(),)) as executor:
+        # 3. Clarificação em paralelo com a recuperação (especulativa, pela pergunta original)
+        futuro_clarificacao = executor.submit(agente0_clarifica_pergunta, pergunta_original, api_key)
+        obtem_modelo_gemini(api_key)
+        retrieved_context = _recupera_contexto(pergunta_original)
+
+        pergunta_para_ia = futuro_clarificacao.result()
+        if pergunta_para_ia != pergunta_original:
+            retrieved_context = _recupera_contexto(pergunta_para_ia)
+
+        # 4. Geração do código (as conclusões da análise geral ficam para o passo 5)
+        codigo_gerado, conclusoes = agente2_gera_codigo_pandas_eda(
+            pergunta_para_ia,
+            api_key,
+            df,
+            retrieved_context,
+            st.session_state['conclusoes_historico'],
+            st.session_state['file_name_context'],
+            st.session_state['perfil_colunas'],
+            gerar_conclusoes=False
+        )
+        consulta.update({'pergunta': pergunta_para_ia, 'codigo': codigo_gerado, 'conclusoes': conclusoes})
+        if codigo_gerado.startswith("Erro:"):
+            return consulta
+
+        # 5. Conclusões (Gemini) em paralelo com a execução do código no sandbox
+        futuro_conclusoes = None
+        if conclusoes is None:
+            futuro_conclusoes = executor.submit(agente2_gera_conclusoes, consulta['pergunta'], codigo_gerado, api_key)
+        consulta['resultado'] = executa_codigo_seguro(codigo_gerado, df)
+        if futuro_conclusoes is not None:
+            consulta['conclusoes'] = futuro_conclusoes.result()
+
+    return consulta
\ No newline at end of file
@@ -0,0 +1,233 @@
+import math
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# Compressão do resumo de quantis (estilo t-digest): ~DELTA_QUANTIS centróides por coluna
+DELTA_QUANTIS = 100
+# Histograma de largura fixa (número par: a faixa dobra juntando bins vizinhos)
+NUM_BINS_HISTOGRAMA = 20
+# Contagem aproximada de distintos (KMV: os K menores hashes)
+K_DISTINTOS = 1024
+# Limite de colunas da matriz de covariância
+MAX_COLUNAS_COVARIANCIA = 100
+
+def _coluna_numerica(serie):
+    return pd.api.types.is_numeric_dtype(serie.dtype) and not pd.api.types.is_bool_dtype(serie.dtype)
+
+def cria_perfil(df):
+    """Perfil vazio com as colunas (e o conjunto de colunas numéricas) do primeiro chunk."""
+    colunas = {}
+    for col in df.columns:
+        perfil_col = {'numerica': _coluna_numerica(df[col]), 'contagem': 0, 'nulos': 0, 'kmv': []}
+        if perfil_col['numerica']:
+            perfil_col.update({
+                'n': 0, 'min': None, 'max': None, 'media': 0.0, 'm2': 0.0,
+                'centroides': [],
+                'histograma': {'inicio': None, 'fim': None, 'contagens': [0] * NUM_BINS_HISTOGRAMA}
+            })
+        colunas[str(col)] = perfil_col
+
+    numericas = [col for col, p in colunas.items() if p['numerica']][:MAX_COLUNAS_COVARIANCIA]
+    return {
+        'linhas': 0,
+        'colunas': colunas,
+        'covariancia': {'colunas': numericas, 'n': 0, 'media': [0.0] * len(numericas), 'comomento': [[0.0] * len(numericas) for _ in numericas]}
+    }
+
+def _combina_momentos(n_a, media_a, m2_a, n_b, media_b, m2_b):
+    """Combina média e soma dos quadrados dos desvios de dois blocos (Welford/Chan)."""
+    n = n_a + n_b
+    delta = media_b - media_a
+    return n, media_a + delta * n_b / n, m2_a + m2_b + delta * delta * n_a * n_b / n
+
+def _escala_k(q):
+    return DELTA_QUANTIS / (2 * math.pi) * math.asin(2 * min(max(q, 0.0), 1.0) - 1)
+
+def _comprime_centroides(centroides):
+    """Funde centróides vizinhos enquanto cabem no limite da função de escala do t-digest."""
+    centroides = sorted(centroides)
+    total = sum(peso for _, peso in centroides)
+    comprimidos = []
+    media_atual, peso_atual = centroides[0]
+    acumulado, q_inicio = 0.0, 0.0
+    for media, peso in centroides[1:]:
+        if _escala_k((acumulado + peso_atual + peso) / total) - _escala_k(q_inicio) <= 1:
+            media_atual = (media_atual * peso_atual + media * peso) / (peso_atual + peso)
+            peso_atual += peso
+        else:
+            comprimidos.append([media_atual, peso_atual])
+            acumulado += peso_atual
+            q_inicio = acumulado / total
+            media_atual, peso_atual = media, peso
+    comprimidos.append([media_atual, peso_atual])
+    return comprimidos
+
+def _atualiza_quantis(perfil_col, valores):
+    # Pré-agrupa o chunk ordenado em grupos de mesmo tamanho (vetorizado) antes da fusão
+    ordenados = np.sort(valores)
+    num_grupos = min(len(ordenados), 4 * DELTA_QUANTIS)
+    limites = np.linspace(0, len(ordenados), num_grupos + 1).astype(int)[:-1]
+    pesos = np.diff(np.append(limites, len(ordenados)))
+    medias = np.add.reduceat(ordenados, limites) / pesos
+    novos = [[float(m), float(p)] for m, p in zip(medias, pesos)]
+    perfil_col['centroides'] = _comprime_centroides(perfil_col['centroides'] + novos)
+
+def _atualiza_histograma(histograma, valores):
+    minimo, maximo = float(valores.min()), float(valores.max())
+    if histograma['inicio'] is None:
+        histograma['inicio'] = minimo
+        histograma['fim'] = maximo if maximo > minimo else minimo + 1.0
+
+    # Dobra a faixa (juntando pares de bins) até cobrir os valores do chunk
+    metade = NUM_BINS_HISTOGRAMA // 2
+    while minimo < histograma['inicio'] or maximo > histograma['fim']:
+        contagens = histograma['contagens']
+        pares = [contagens[2 * i] + contagens[2 * i + 1] for i in range(metade)]
+        largura = histograma['fim'] - histograma['inicio']
+        if maximo > histograma['fim']:
+            histograma['contagens'] = pares + [0] * metade
+            histograma['fim'] = histograma['inicio'] + 2 * largura
+        else:
+            histograma['contagens'] = [0] * metade + pares
+            histograma['inicio'] = histograma['fim'] - 2 * largura
+
+    contagens, _ = np.histogram(valores, bins=NUM_BINS_HISTOGRAMA, range=(histograma['inicio'], histograma['fim']))
+    histograma['contagens'] = [int(a + b) for a, b in zip(histograma['contagens'], contagens)]
+
+def _atualiza_distintos(perfil_col, serie):
+    hashes = pd.util.hash_pandas_object(serie, index=False).to_numpy(dtype=np.uint64)
+    combinados = np.union1d(np.asarray(perfil_col['kmv'], dtype=np.uint64), hashes)[:K_DISTINTOS]
+    perfil_col['kmv'] = [int(h) for h in combinados]
+
+def _atualiza_covariancia(cov, chunk):
+    colunas = [col for col in cov['colunas'] if col in chunk.columns]
+    if len(colunas) != len(cov['colunas']) or not colunas:
+        return
+    X = chunk[colunas].to_numpy(dtype=np.float64)
+    X = X[np.isfinite(X).all(axis=1)]
+    if len(X) == 0:
+        return
+
+    n_a, n_b = cov['n'], len(X)
+    media_a, media_b = np.asarray(cov['media']), X.mean(axis=0)
+    desvios = X - media_b
+    comomento = np.asarray(cov['comomento']) + desvios.T @ desvios
+    delta = media_b - media_a
+    n = n_a + n_b
+    comomento += np.outer(delta, delta) * n_a * n_b / n
+    cov['n'] = n
+    cov['media'] = (media_a + delta * n_b / n).tolist()
+    cov['comomento'] = comomento.tolist()
+
+def atualiza_perfil(perfil, chunk):
+    """Atualiza o perfil com um chunk (uma passada por coluna, sem guardar linhas)."""
+    if perfil is None:
+        perfil = cria_perfil(chunk)
+
+    for col in chunk.columns:
+        perfil_col = perfil['colunas'].get(str(col))
+        if perfil_col is None:
+            continue
+        serie = chunk[col].dropna()
+        perfil_col['contagem'] += len(serie)
+        perfil_col['nulos'] += len(chunk) - len(serie)
+        if serie.empty:
+            continue
+        _atualiza_distintos(perfil_col, serie)
+
+        if perfil_col['numerica'] and _coluna_numerica(serie):
+            valores = serie.to_numpy(dtype=np.float64)
+            valores = valores[np.isfinite(valores)]
+            if len(valores) == 0:
+                continue
+            perfil_col['n'], perfil_col['media'], perfil_col['m2'] = _combina_momentos(
+                perfil_col['n'], perfil_col['media'], perfil_col['m2'],
+                len(valores), float(valores.mean()), float(((valores - valores.mean()) ** 2).sum())
+            )
+            minimo, maximo = float(valores.min()), float(valores.max())
+            perfil_col['min'] = minimo if perfil_col['min'] is None else min(perfil_col['min'], minimo)
+            perfil_col['max'] = maximo if perfil_col['max'] is None else max(perfil_col['max'], maximo)
+            _atualiza_quantis(perfil_col, valores)
+            _atualiza_histograma(perfil_col['histograma'], valores)
+
+    _atualiza_covariancia(perfil['covariancia'], chunk)
+    perfil['linhas'] += len(chunk)
+    return perfil
+
+def atualiza_perfil_sessao(chunk):
+    """Atualiza st.session_state['perfil_colunas'] sob a trava compartilhada com as consultas."""
+    with st.session_state['rag_lock']:
+        st.session_state['perfil_colunas'] = atualiza_perfil(st.session_state.get('perfil_colunas'), chunk)
+
+def quantil_perfil(perfil_col, q):
+    """Quantil aproximado por interpolação entre os centróides."""
+    centroides = perfil_col.get('centroides')
+    if not centroides:
+        return None
+    medias = np.array([m for m, _ in centroides])
+    pesos = np.array([p for _, p in centroides])
+    posicoes = np.cumsum(pesos) - pesos / 2
+    valor = float(np.interp(q * pesos.sum(), posicoes, medias))
+    return min(max(valor, perfil_col['min']), perfil_col['max'])
+
+def _desvio_padrao(perfil_col):
+    return math.sqrt(perfil_col['m2'] / (perfil_col['n'] - 1)) if perfil_col['n'] > 1 else 0.0
+
+def distintos_perfil(perfil_col):
+    """Número aproximado de valores distintos (exato abaixo de K_DISTINTOS)."""
+    kmv = perfil_col['kmv']
+    if len(kmv) < K_DISTINTOS:
+        return len(kmv)
+    return int((K_DISTINTOS - 1) / (kmv[-1] / 2.0 ** 64))
+
+def resumo_perfil_df(perfil):
+    """Tabela no estilo df.describe() (mais nulos e distintos) a partir do perfil."""
+    linhas = {}
+    for col, p in perfil['colunas'].items():
+        linha = {'contagem': p['contagem'], 'nulos': p['nulos'], 'distintos_aprox': distintos_perfil(p)}
+        if p['numerica'] and p['min'] is not None:
+            linha.update({
+                'media': p['media'],
+                'desvio_padrao': _desvio_padrao(p),
+                'min': p['min'],
+                '25%': quantil_perfil(p, 0.25),
+                '50%': quantil_perfil(p, 0.5),
+                '75%': quantil_perfil(p, 0.75),
+                'max': p['max']
+            })
+        linhas[col] = linha
+    return pd.DataFrame.from_dict(linhas, orient='index')
+
+def histograma_perfil(perfil, col):
+    """Histograma de largura fixa de uma coluna numérica: (bordas, contagens)."""
+    histograma = perfil['colunas'][col]['histograma']
+    if histograma['inicio'] is None:
+        return None, None
+    bordas = np.linspace(histograma['inicio'], histograma['fim'], NUM_BINS_HISTOGRAMA + 1)
+    return bordas, np.array(histograma['contagens'])
+
+def correlacao_perfil_df(perfil):
+    """Matriz de correlação de Pearson das colunas numéricas, a partir da covariância acumulada."""
+    cov = perfil['covariancia']
+    if cov['n'] < 2 or not cov['colunas']:
+        return None
+    comomento = np.asarray(cov['comomento'])
+    desvios = np.sqrt(np.diag(comomento))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        correlacao = comomento / np.outer(desvios, desvios)
+    return pd.DataFrame(correlacao, index=cov['colunas'], columns=cov['colunas'])
+
+def perfil_texto(perfil, max_colunas=60, colunas=None):
+    """Resumo compacto do perfil para os prompts (uma linha por coluna; opcionalmente só 'colunas')."""
+    if not perfil:
+        return ""
+    linhas = []
+    itens = [(col, perfil['colunas'][col]) for col in colunas if col in perfil['colunas']] if colunas is not None else list(perfil['colunas'].items())
+    for col, p in itens[:max_colunas]:
+        texto = f"- {col}: n={p['contagem']}, nulos={p['nulos']}, distintos~{distintos_perfil(p)}"
+        if p['numerica'] and p['min'] is not None:
+            texto += (f", media={p['media']:.4g}, desvio={_desvio_padrao(p):.4g}, min={p['min']:.4g}, "
+                      f"mediana~{quantil_perfil(p, 0.5):.4g}, max={p['max']:.4g}")
+        linhas.append(texto)
+    return "\n".join(linhas)
\ No newline at end of file
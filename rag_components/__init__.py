@@ -1,5 +1,17 @@
-from rag_components.load_embedding_model import load_embedding_model
+from rag_components.load_embedding_model import load_embedding_model, backend_embedding_ativo
 from rag_components.create_faiss_index_for_chunk import create_faiss_index_for_chunk
 from rag_components.retrieve_context import retrieve_context
-from rag_components.save_progress import save_progress
-from rag_components.load_progress import load_progress
\ No newline at end of file
+from rag_components.save_progress import save_progress, save_documentos_resumo
+from rag_components.load_progress import load_progress, load_perfil, load_indice_invertido
+from rag_components.diretorio_checkpoint import diretorio_checkpoint
+from rag_components.adiciona_embeddings_indice import adiciona_embeddings_indice
+from rag_components.codifica_bloco_embeddings import codifica_bloco_embeddings, decodifica_bloco_embeddings
+from rag_components.serializa_documentos import serializa_documentos
+from rag_components.codifica_documentos import codifica_documentos
+from rag_components.amostra_estratificada_chunk import amostra_estratificada_chunk
+from rag_components.adiciona_documentos_resumo import adiciona_documentos_resumo
+from rag_components.create_faiss_index_for_chunk import prepara_embeddings_chunk, adiciona_chunk_indice
+from rag_components.executor_embeddings import executa_embeddings
+from rag_components.retrieve_context_batch import retrieve_context_batch
+from rag_components.indice_invertido import busca_indice_invertido, constroi_indice_invertido
+from rag_components.armazem_documentos import ArmazemDocumentos
\ No newline at end of file
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+from rag_components.codifica_documentos import codifica_documentos
+from rag_components.adiciona_embeddings_indice import adiciona_embeddings_indice
+from rag_components.indice_invertido import atualiza_indice_invertido
+from rag_components.armazem_documentos import ArmazemDocumentos
+from rag_components.amostra_estratificada_chunk import detecta_coluna_estrato
+
+MAX_GRUPOS_RESUMO = 20
+MAX_COLUNAS_GRUPO = 30
+
+def _formata(valor):
+    if isinstance(valor, (float, np.floating)):
+        return f"{valor:.4g}"
+    return str(valor)
+
+def gera_documentos_resumo(df):
+    """Gera documentos de perfil: um por coluna e um por grupo da coluna de estrato."""
+    documentos = [f"RESUMO DATASET: linhas={len(df)} colunas={df.shape[1]} nomes={', '.join(map(str, df.columns))}"]
+
+    for col in df.columns:
+        serie = df[col]
+        partes = [f"RESUMO COLUNA {col}:", f"tipo={serie.dtype}", f"nulos={int(serie.isna().sum())}"]
+        if pd.api.types.is_numeric_dtype(serie.dtype):
+            desc = serie.describe()
+            partes += [f"{nome}={_formata(desc[nome])}" for nome in ['min', '25%', '50%', '75%', 'max', 'mean', 'std'] if nome in desc]
+        else:
+            contagem = serie.value_counts().head(5)
+            partes += [f"distintos={serie.nunique()}"] + [f"{valor}={n}" for valor, n in contagem.items()]
+        documentos.append(" ".join(partes))
+
+    coluna_estrato = detecta_coluna_estrato(df)
+    if coluna_estrato is not None:
+        numericas = [c for c in df.select_dtypes(include=np.number).columns if c != coluna_estrato][:MAX_COLUNAS_GRUPO]
+        grupos = df.groupby(coluna_estrato, observed=True)
+        medias = grupos[numericas].mean() if numericas else None
+        for valor, n in grupos.size().head(MAX_GRUPOS_RESUMO).items():
+            partes = [f"RESUMO GRUPO {coluna_estrato}={valor}:", f"linhas={n}", f"proporcao={n / len(df):.4%}"]
+            if medias is not None:
+                partes += [f"media_{c}={_formata(medias.loc[valor, c])}" for c in numericas]
+            documentos.append(" ".join(partes))
+
+    return documentos
+
+def adiciona_documentos_resumo(df):
+    """
+    Embedda os documentos de resumo no índice (modo de orçamento), após as linhas.
+    Retorna os embeddings e documentos adicionados (para o checkpoint).
+    """
+    if df is None or df.empty:
+        return None, []
+
+    docs_resumo = gera_documentos_resumo(df)
+    embeddings_resumo = codifica_documentos(docs_resumo)
+    with st.session_state['rag_lock']:
+        st.session_state['faiss_index'] = adiciona_embeddings_indice(st.session_state['faiss_index'], embeddings_resumo)
+        st.session_state['faiss_versao'] = st.session_state.get('faiss_versao', 0) + 1
+        if st.session_state['documents'] is None:
+            st.session_state['documents'] = ArmazemDocumentos()
+        # Índice invertido (BM25) com os mesmos ids do FAISS
+        atualiza_indice_invertido(docs_resumo, len(st.session_state['documents']))
+        st.session_state['documents'].extend(docs_resumo)
+
+    return embeddings_resumo, docs_resumo
\ No newline at end of file
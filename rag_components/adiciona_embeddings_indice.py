@@ -0,0 +1,155 @@
+import math
+import faiss
+import numpy as np
+import streamlit as st
+
+# Abaixo do limiar o índice é exato (Flat); acima dele migra para um índice aproximado
+LIMIAR_INDICE_ANN = 100_000
+TIPO_INDICE_ANN = 'ivf'  # 'ivf', 'hnsw' ou 'nenhum' (sempre Flat)
+# Compressão dos vetores: 'nenhuma' (float32), 'float16' (2x), 'sq8' (4x) ou 'pq' (16x)
+COMPRESSAO_INDICE = 'nenhuma'
+# Rerank exato (IndexRefineFlat): guarda também uma cópia float32 de todos os vetores, o que
+# devolve a memória economizada pela compressão (o índice fica maior que o Flat sem compressão).
+# Com ele ativo, o checkpoint grava os blocos em float32 para o rerank continuar exato na retomada.
+RERANK_EXATO = False
+AMOSTRAS_TREINO_POR_LISTA = 64
+HNSW_M = 32
+RERANK_K_FACTOR = 4
+
+_TIPOS_SQ = {
+    'float16': faiss.ScalarQuantizer.QT_fp16,
+    'sq8': faiss.ScalarQuantizer.QT_8bit,
+}
+
+def config_indice_faiss():
+    """Retorna a configuração de índice ativa (session_state com valores padrão)."""
+    return {
+        'tipo_ann': st.session_state.get('faiss_tipo_ann', TIPO_INDICE_ANN),
+        'limiar_ann': st.session_state.get('faiss_limiar_ann', LIMIAR_INDICE_ANN),
+        'compressao': st.session_state.get('faiss_compressao', COMPRESSAO_INDICE),
+        'rerank_exato': st.session_state.get('faiss_rerank_exato', RERANK_EXATO),
+    }
+
+def _indice_base(index):
+    """Retorna o índice interno quando há um rerank exato (IndexRefineFlat) por cima."""
+    if isinstance(index, faiss.IndexRefine):
+        return faiss.downcast_index(index.base_index)
+    return index
+
+def descreve_indice(index):
+    """Descreve o tipo do índice FAISS (registrado no manifesto do checkpoint)."""
+    if index is None:
+        return None
+    base = _indice_base(index)
+    descricao = {'ntotal': index.ntotal, 'rerank_exato': base is not index, 'classe': type(base).__name__}
+    if isinstance(base, faiss.IndexIVF):
+        descricao.update({'tipo': 'ivf', 'nlist': base.nlist, 'nprobe': base.nprobe})
+    elif isinstance(base, faiss.IndexHNSW):
+        descricao.update({'tipo': 'hnsw', 'M': HNSW_M, 'ef_search': base.hnsw.efSearch})
+    else:
+        descricao.update({'tipo': 'flat'})
+    return descricao
+
+def _indice_aproximado(index):
+    return isinstance(_indice_base(index), (faiss.IndexIVF, faiss.IndexHNSW))
+
+def _pq_m(dimension):
+    """Número de subquantizadores do PQ: ~d/4 bytes por vetor (16x menor que float32)."""
+    for m in range(max(1, dimension // 4), 0, -1):
+        if dimension % m == 0:
+            return m
+    return 1
+
+def _amostra_treino(vetores, num_amostras):
+    """Amostra determinística dos vetores para o treino de quantizadores."""
+    num_amostras = min(len(vetores), num_amostras)
+    amostra = np.random.default_rng(0).choice(len(vetores), num_amostras, replace=False)
+    return vetores[np.sort(amostra)]
+
+def _finaliza_indice(base, vetores, rerank_exato):
+    """Treina o índice (se necessário) e aplica o rerank exato opcional."""
+    index = base
+    if rerank_exato:
+        index = faiss.IndexRefineFlat(base)
+        index.k_factor = RERANK_K_FACTOR
+    if not index.is_trained:
+        index.train(vetores)
+    return index
+
+def _cria_indice_flat(vetores, compressao, rerank_exato):
+    """Índice da fase exata (busca exaustiva), com os vetores opcionalmente comprimidos."""
+    dimension = vetores.shape[1]
+    if compressao in _TIPOS_SQ:
+        base = faiss.IndexScalarQuantizer(dimension, _TIPOS_SQ[compressao])
+    elif compressao == 'pq':
+        # Com poucos vetores de treino, reduz os bits por código (k-means exige n >= 2^nbits)
+        nbits = int(max(1, min(8, math.floor(math.log2(max(2, len(vetores)))))))
+        base = faiss.IndexPQ(dimension, _pq_m(dimension), nbits)
+    else:
+        base = faiss.IndexFlatL2(dimension)
+    return _finaliza_indice(base, vetores, rerank_exato)
+
+def _cria_indice_ann(vetores, tipo_ann, compressao, rerank_exato):
+    """Cria o índice aproximado, treinado com uma amostra dos primeiros embeddings."""
+    num_vetores, dimension = vetores.shape
+
+    if tipo_ann == 'hnsw':
+        if compressao in _TIPOS_SQ:
+            base = faiss.IndexHNSWSQ(dimension, _TIPOS_SQ[compressao], HNSW_M)
+        elif compressao == 'pq':
+            base = faiss.IndexHNSWPQ(dimension, _pq_m(dimension), HNSW_M)
+        else:
+            base = faiss.IndexHNSWFlat(dimension, HNSW_M)
+        base.hnsw.efConstruction = 80
+        base.hnsw.efSearch = 64
+        return _finaliza_indice(base, _amostra_treino(vetores, 256 * AMOSTRAS_TREINO_POR_LISTA), rerank_exato)
+
+    nlist = int(min(65536, max(16, 4 * math.sqrt(num_vetores))))
+    quantizer = faiss.IndexFlatL2(dimension)
+    if compressao in _TIPOS_SQ:
+        base = faiss.IndexIVFScalarQuantizer(quantizer, dimension, nlist, _TIPOS_SQ[compressao])
+    elif compressao == 'pq':
+        base = faiss.IndexIVFPQ(quantizer, dimension, nlist, _pq_m(dimension), 8)
+    else:
+        base = faiss.IndexIVFFlat(quantizer, dimension, nlist)
+    base.nprobe = max(1, nlist // 16)
+
+    num_amostras = max(nlist, 256) * AMOSTRAS_TREINO_POR_LISTA
+    return _finaliza_indice(base, _amostra_treino(vetores, num_amostras), rerank_exato)
+
+def adiciona_embeddings_indice(index, embeddings, tipo_ann=None, limiar_ann=None, compressao=None, rerank_exato=None):
+    """
+    Adiciona embeddings ao índice, escolhendo o tipo pelo tamanho: Flat (exato) até o
+    limiar e, ao cruzá-lo, IVF ou HNSW com os vetores da fase Flat migrados.
+    A compressão (float16/SQ8/PQ) e o rerank exato valem para as duas fases.
+    Retorna o índice a ser usado daqui em diante (pode ser um novo objeto).
+    """
+    config = config_indice_faiss()
+    tipo_ann = tipo_ann or config['tipo_ann']
+    # 0 é um limiar válido (sempre aproximado): só None usa a configuração
+    limiar_ann = config['limiar_ann'] if limiar_ann is None else limiar_ann
+    compressao = compressao or config['compressao']
+    rerank_exato = config['rerank_exato'] if rerank_exato is None else rerank_exato
+    # Sem compressão os vetores já são exatos: o rerank não acrescenta nada
+    rerank_exato = rerank_exato and compressao != 'nenhuma'
+
+    embeddings = np.ascontiguousarray(embeddings, dtype='float32')
+    if len(embeddings) == 0:
+        return index
+
+    if index is None:
+        index = _cria_indice_flat(embeddings, compressao, rerank_exato)
+
+    if (
+        tipo_ann != 'nenhum'
+        and not _indice_aproximado(index)
+        and index.ntotal + len(embeddings) >= limiar_ann
+    ):
+        # Migração: os vetores da fase Flat passam para o índice aproximado
+        vetores = np.vstack([index.reconstruct_n(0, index.ntotal), embeddings]) if index.ntotal else embeddings
+        novo_index = _cria_indice_ann(vetores, tipo_ann, compressao, rerank_exato)
+        novo_index.add(vetores)
+        return novo_index
+
+    index.add(embeddings)
+    return index
\ No newline at end of file
@@ -0,0 +1,79 @@
+import math
+import numpy as np
+import streamlit as st
+from helpers.normalize_text import normalize_text
+
+ORCAMENTO_EMBEDDINGS = 20_000
+# Fração do orçamento reservada para os documentos de resumo (colunas/grupos)
+FRACAO_RESUMOS = 0.05
+COLUNAS_ESTRATO_CONHECIDAS = ['CLASS', 'CLASSE', 'TARGET', 'LABEL', 'FRAUD', 'FRAUDE', 'IS_FRAUD']
+
+def detecta_coluna_estrato(df):
+    """Retorna a coluna usada na estratificação (configurada ou um rótulo conhecido)."""
+    coluna = st.session_state.get('rag_coluna_estrato')
+    if coluna and coluna in df.columns:
+        return coluna
+    for col in df.columns:
+        if normalize_text(str(col)).upper() in COLUNAS_ESTRATO_CONHECIDAS:
+            return col
+    return None
+
+def _cotas_por_estrato(contagens, cota):
+    """Divide a cota igualmente entre os estratos, redistribuindo a sobra dos menores."""
+    cotas = {estrato: 0 for estrato in contagens}
+    restantes = dict(contagens)
+    while cota > 0 and restantes:
+        parcela = max(1, cota // len(restantes))
+        for estrato in sorted(restantes, key=restantes.get):
+            if cota <= 0:
+                break
+            pegar = min(parcela, restantes[estrato], cota)
+            cotas[estrato] += pegar
+            restantes[estrato] -= pegar
+            cota -= pegar
+        restantes = {e: n for e, n in restantes.items() if n > 0}
+    return cotas
+
+def amostra_estratificada_chunk(chunk, start_row):
+    """
+    Seleciona as linhas do chunk que serão embeddadas no modo de orçamento.
+    A cota do chunk é proporcional ao seu tamanho; dentro dele as classes recebem
+    a mesma parcela, o que sobre-representa as raras (ex.: fraudes em CLASS).
+    O consumo do orçamento vem do contador do próprio amostrador
+    ('rag_linhas_amostradas'), que não depende da etapa de índice já ter
+    acrescentado os documentos dos chunks anteriores.
+    """
+    orcamento = st.session_state.get('rag_orcamento_embeddings', ORCAMENTO_EMBEDDINGS)
+    orcamento_linhas = int(orcamento * (1 - FRACAO_RESUMOS))
+    total_lines = max(st.session_state.get('total_lines') or 0, start_row + len(chunk))
+
+    with st.session_state['rag_lock']:
+        ja_amostradas = st.session_state.get('rag_linhas_amostradas')
+        if ja_amostradas is None:
+            # Início ou retomada: parte dos documentos carregados do checkpoint
+            ja_amostradas = len(st.session_state.get('documents') or [])
+        cota = math.ceil(orcamento_linhas * len(chunk) / total_lines)
+        cota = max(0, min(cota, orcamento_linhas - ja_amostradas, len(chunk)))
+        # Reserva a cota antes da amostragem
+        st.session_state['rag_linhas_amostradas'] = ja_amostradas + cota
+    if cota == 0:
+        return chunk.iloc[0:0]
+    if cota >= len(chunk):
+        return chunk
+
+    rng = np.random.default_rng(start_row)
+    coluna_estrato = detecta_coluna_estrato(chunk)
+    if coluna_estrato is None:
+        posicoes = rng.choice(len(chunk), cota, replace=False)
+        return chunk.iloc[np.sort(posicoes)]
+
+    estratos = chunk[coluna_estrato].astype(str).to_numpy()
+    valores, contagens = np.unique(estratos, return_counts=True)
+    cotas = _cotas_por_estrato(dict(zip(valores, contagens)), cota)
+
+    posicoes = []
+    for estrato, n in cotas.items():
+        if n > 0:
+            candidatos = np.flatnonzero(estratos == estrato)
+            posicoes.append(rng.choice(candidatos, n, replace=False))
+    return chunk.iloc[np.sort(np.concatenate(posicoes))]
\ No newline at end of file
@@ -0,0 +1,91 @@
+import os
+from array import array
+from bisect import bisect_right
+import numpy as np
+
+class ArmazemDocumentos:
+    """
+    Armazena os documentos do RAG em buffers UTF-8 contíguos + offsets, em vez de um
+    objeto str por linha. Blocos vindos do checkpoint ficam mapeados em memória (mmap);
+    as strings só são materializadas no acesso (ex.: os top-k de uma busca).
+    Mesma interface de lista usada pelo restante do código (len, [], extend, iteração).
+    """
+
+    def __init__(self, documentos=None):
+        # Blocos congelados: (dados, offsets) com offsets[0] = 0 e len(offsets) = n + 1
+        self._blocos = []
+        self._inicios = []
+        self._num_congelados = 0
+        # Bloco aberto (recebe os documentos novos)
+        self._buffer = bytearray()
+        self._offsets = array('Q', [0])
+        if documentos:
+            self.extend(documentos)
+
+    def _congela_bloco_aberto(self):
+        if len(self._offsets) > 1:
+            self._blocos.append((self._buffer, self._offsets))
+            self._inicios.append(self._num_congelados)
+            self._num_congelados += len(self._offsets) - 1
+            self._buffer = bytearray()
+            self._offsets = array('Q', [0])
+
+    def adiciona_bloco(self, dados, offsets):
+        """Anexa um bloco já codificado (ex.: mapeado do checkpoint) ao final do armazém."""
+        if len(offsets) <= 1:
+            return
+        self._congela_bloco_aberto()
+        self._blocos.append((dados, offsets))
+        self._inicios.append(self._num_congelados)
+        self._num_congelados += len(offsets) - 1
+
+    def extend(self, documentos):
+        for documento in documentos:
+            self._buffer += documento.encode('utf-8')
+            self._offsets.append(len(self._buffer))
+
+    def append(self, documento):
+        self.extend([documento])
+
+    def __len__(self):
+        return self._num_congelados + len(self._offsets) - 1
+
+    def _documento(self, i):
+        if i >= self._num_congelados:
+            dados, offsets, j = self._buffer, self._offsets, i - self._num_congelados
+        else:
+            b = bisect_right(self._inicios, i) - 1
+            (dados, offsets), j = self._blocos[b], i - self._inicios[b]
+        return bytes(dados[int(offsets[j]):int(offsets[j + 1])]).decode('utf-8')
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._documento(j) for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("documento fora do intervalo")
+        return self._documento(i)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self._documento(i)
+
+    def tamanho_bytes(self):
+        """Bytes ocupados pelos textos (sem contar os offsets)."""
+        return int(sum(offsets[-1] for _, offsets in self._blocos)) + len(self._buffer)
+
+def codifica_documentos_utf8(documentos):
+    """Codifica documentos em (buffer UTF-8 contíguo, offsets uint64) para o checkpoint."""
+    codificados = [documento.encode('utf-8') for documento in documentos]
+    offsets = np.zeros(len(codificados) + 1, dtype=np.uint64)
+    if codificados:
+        np.cumsum([len(c) for c in codificados], out=offsets[1:])
+    return b"".join(codificados), offsets
+
+def abre_bloco_documentos(caminho_dados, caminho_offsets):
+    """Mapeia em memória um bloco de documentos do checkpoint (buffer + offsets)."""
+    offsets = np.load(caminho_offsets, mmap_mode='r')
+    if os.path.getsize(caminho_dados) == 0:
+        return b"", offsets
+    return np.memmap(caminho_dados, dtype=np.uint8, mode='r'), offsets
\ No newline at end of file
@@ -0,0 +1,48 @@
+import re
+import numpy as np
+import streamlit as st
+from cachetools import LRUCache
+from helpers.normalize_text import normalize_text
+from rag_components.load_embedding_model import load_embedding_model, backend_embedding_ativo
+
+TAMANHO_CACHE_CONSULTAS = 256
+
+def normaliza_consulta(consulta):
+    """Normaliza a consulta (acentos, caixa e espaços) para usá-la como chave de cache."""
+    return re.sub(r"\s+", " ", normalize_text(consulta).lower()).strip()
+
+def _cache(nome):
+    """LRU da sessão (embeddings de consultas ou resultados de busca)."""
+    if st.session_state.get(nome) is None:
+        st.session_state[nome] = LRUCache(maxsize=TAMANHO_CACHE_CONSULTAS)
+    return st.session_state[nome]
+
+def versao_indice(index):
+    """Versão do índice para as chaves de resultado: muda a cada adição ou troca de índice."""
+    return (st.session_state.get('faiss_versao', 0), id(index), index.ntotal)
+
+def embeddings_consultas(consultas, backend=None):
+    """
+    Codifica as consultas reaproveitando o LRU de embeddings (backend, consulta normalizada).
+    As consultas ausentes são codificadas juntas em uma única chamada ao modelo.
+    """
+    backend = backend or backend_embedding_ativo()
+    cache = _cache('cache_embeddings_consultas')
+    chaves = [(backend, normaliza_consulta(consulta)) for consulta in consultas]
+
+    faltantes = {}
+    for chave, consulta in zip(chaves, consultas):
+        if chave not in cache and chave not in faltantes:
+            faltantes[chave] = consulta
+
+    if faltantes:
+        model = load_embedding_model(backend)
+        novos = np.asarray(model.encode(list(faltantes.values()), show_progress_bar=False), dtype='float32')
+        for chave, vetor in zip(faltantes, novos):
+            cache[chave] = vetor
+
+    return np.vstack([cache[chave] for chave in chaves])
+
+def cache_resultados_consultas():
+    """LRU de resultados de busca, chaveado por (versão do índice, consulta normalizada, top_k)."""
+    return _cache('cache_resultados_consultas')
\ No newline at end of file
@@ -0,0 +1,73 @@
+import os
+import time
+import sqlite3
+import hashlib
+import tempfile
+import contextlib
+import numpy as np
+
+CAMINHO_CACHE_EMBEDDINGS = os.path.join(tempfile.gettempdir(), "eda_agent_cache_embeddings.sqlite")
+MAX_ENTRADAS_CACHE = 200_000
+_LOTE_SQL = 500
+
+def hash_documento(documento):
+    """Hash do texto do documento (parte da chave do cache)."""
+    return hashlib.sha1(documento.encode('utf-8')).digest()
+
+def _conecta():
+    conn = sqlite3.connect(CAMINHO_CACHE_EMBEDDINGS, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS embeddings ("
+        " modelo TEXT NOT NULL, hash BLOB NOT NULL, vetor BLOB NOT NULL, acesso REAL NOT NULL,"
+        " PRIMARY KEY (modelo, hash))"
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS embeddings_acesso ON embeddings (acesso)")
+    return conn
+
+def busca_embeddings_cache(nome_modelo, hashes):
+    """
+    Busca embeddings no cache persistente pela chave (modelo, hash do texto).
+    Retorna um dict hash -> vetor float32 apenas com os acertos (e renova o acesso LRU).
+    """
+    encontrados = {}
+    if not hashes:
+        return encontrados
+
+    with contextlib.closing(_conecta()) as conn, conn:
+        for inicio in range(0, len(hashes), _LOTE_SQL):
+            lote = hashes[inicio:inicio + _LOTE_SQL]
+            marcadores = ",".join("?" * len(lote))
+            linhas = conn.execute(
+                f"SELECT hash, vetor FROM embeddings WHERE modelo = ? AND hash IN ({marcadores})",
+                [nome_modelo, *lote]
+            ).fetchall()
+            for hash_doc, vetor in linhas:
+                encontrados[bytes(hash_doc)] = np.frombuffer(vetor, dtype='float32')
+
+        if encontrados:
+            agora = time.time()
+            conn.executemany(
+                "UPDATE embeddings SET acesso = ? WHERE modelo = ? AND hash = ?",
+                [(agora, nome_modelo, hash_doc) for hash_doc in encontrados]
+            )
+    return encontrados
+
+def grava_embeddings_cache(nome_modelo, hashes, vetores, max_entradas=MAX_ENTRADAS_CACHE):
+    """Grava embeddings no cache e remove os menos usados recentemente acima do limite."""
+    if not hashes:
+        return
+
+    agora = time.time()
+    vetores = np.asarray(vetores, dtype='float32')
+    with contextlib.closing(_conecta()) as conn, conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO embeddings (modelo, hash, vetor, acesso) VALUES (?, ?, ?, ?)",
+            [(nome_modelo, hash_doc, vetor.tobytes(), agora) for hash_doc, vetor in zip(hashes, vetores)]
+        )
+        excedente = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0] - max_entradas
+        if excedente > 0:
+            conn.execute(
+                "DELETE FROM embeddings WHERE rowid IN (SELECT rowid FROM embeddings ORDER BY acesso LIMIT ?)",
+                (excedente,)
+            )
\ No newline at end of file
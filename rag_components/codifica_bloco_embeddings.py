@@ -0,0 +1,27 @@
+import numpy as np
+
+def codifica_bloco_embeddings(embeddings, compressao):
+    """
+    Codifica um bloco de embeddings para o checkpoint conforme o modo de compressão.
+    Retorna (formato, arrays) para np.savez: float32, float16 (2x) ou sq8 (4x,
+    quantização escalar de 8 bits por dimensão, usada também no modo 'pq').
+    """
+    embeddings = np.asarray(embeddings, dtype='float32')
+
+    if compressao == 'float16':
+        return 'float16', {'vetores': embeddings.astype('float16')}
+
+    if compressao in ['sq8', 'pq']:
+        vmin = embeddings.min(axis=0)
+        escala = (embeddings.max(axis=0) - vmin) / 255.0
+        escala[escala == 0] = 1.0
+        codigos = np.clip(np.rint((embeddings - vmin) / escala), 0, 255).astype('uint8')
+        return 'sq8', {'codigos': codigos, 'vmin': vmin, 'escala': escala.astype('float32')}
+
+    return 'float32', {'vetores': embeddings}
+
+def decodifica_bloco_embeddings(formato, arrays):
+    """Reconstrói os embeddings float32 a partir do bloco gravado no checkpoint."""
+    if formato == 'sq8':
+        return arrays['codigos'].astype('float32') * arrays['escala'] + arrays['vmin']
+    return np.asarray(arrays['vetores'], dtype='float32')
\ No newline at end of file
@@ -0,0 +1,40 @@
+import numpy as np
+import streamlit as st
+from rag_components.load_embedding_model import BACKENDS_EMBEDDING, backend_embedding_ativo
+from rag_components.executor_embeddings import executa_embeddings
+from rag_components.cache_embeddings import busca_embeddings_cache, grava_embeddings_cache, hash_documento
+
+def codifica_documentos(documentos, backend=None):
+    """
+    Gera os embeddings dos documentos consultando antes o cache persistente
+    (modelo, hash do texto). Só os documentos ausentes (e distintos) são codificados.
+    """
+    if not documentos:
+        return np.empty((0, 0), dtype='float32')
+
+    backend = backend or backend_embedding_ativo()
+    nome_modelo = BACKENDS_EMBEDDING[backend]
+
+    hashes = [hash_documento(doc) for doc in documentos]
+    usar_cache = st.session_state.get('cache_embeddings_ativo', True)
+    encontrados = busca_embeddings_cache(nome_modelo, list(set(hashes))) if usar_cache else {}
+
+    # Documentos repetidos dentro do lote são codificados uma única vez
+    faltantes = {}
+    for hash_doc, doc in zip(hashes, documentos):
+        if hash_doc not in encontrados and hash_doc not in faltantes:
+            faltantes[hash_doc] = doc
+
+    if faltantes:
+        novos = executa_embeddings(list(faltantes.values()), backend)
+        encontrados.update(zip(faltantes.keys(), novos))
+        if usar_cache:
+            grava_embeddings_cache(nome_modelo, list(faltantes.keys()), novos)
+
+    # Estatísticas de acerto (por documento) para exibir a economia do cache
+    stats = st.session_state.get('cache_embeddings_stats') or {'documentos': 0, 'acertos': 0}
+    stats['documentos'] += len(documentos)
+    stats['acertos'] += len(documentos) - len(faltantes)
+    st.session_state['cache_embeddings_stats'] = stats
+
+    return np.vstack([encontrados[hash_doc] for hash_doc in hashes])
\ No newline at end of file
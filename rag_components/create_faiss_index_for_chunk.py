@@ -1,35 +1,61 @@
 import streamlit as st
-import faiss
-import numpy as np
-from rag_components.load_embedding_model import load_embedding_model
+from rag_components.codifica_documentos import codifica_documentos
+from rag_components.load_embedding_model import backend_embedding_ativo
+from rag_components.adiciona_embeddings_indice import adiciona_embeddings_indice
+from rag_components.indice_invertido import atualiza_indice_invertido
+from rag_components.armazem_documentos import ArmazemDocumentos
+from rag_components.serializa_documentos import serializa_documentos
+from rag_components.amostra_estratificada_chunk import amostra_estratificada_chunk
 
-def create_faiss_index_for_chunk(chunk):
-    """Cria/adiciona a um índice FAISS para um chunk específico."""
-    model = load_embedding_model()
-    
-    # 1. Pré-processamento
-    docs_chunk = chunk.astype(str).apply(lambda x: ' '.join(x), axis=1).tolist()
+# 'completo': um documento por linha; 'orcamento': amostra estratificada + resumos
+MODO_CORPUS = 'completo'
+
+def prepara_embeddings_chunk(chunk, start_row=0):
+    """
+    Etapa de embedding: serializa as linhas do chunk e gera os embeddings, sem tocar
+    no índice. No modo 'orcamento' só uma amostra estratificada das linhas é usada.
+    """
+    if st.session_state.get('rag_modo_corpus', MODO_CORPUS) == 'orcamento':
+        chunk = amostra_estratificada_chunk(chunk, start_row)
+
+    # 1. Pré-processamento (documentos 'COL=valor', montados coluna a coluna)
+    docs_chunk = serializa_documentos(chunk)
     
     # Verifica se há documentos para processar
     if not docs_chunk:
-        return True
+        return None, []
 
-    # 2. Embedding
-    embeddings_chunk = model.encode(docs_chunk, show_progress_bar=False)
-    
-    dimension = embeddings_chunk.shape[1]
-    
-    # 3. Criação/Adição ao Índice FAISS
-    if st.session_state['faiss_index'] is not None:
-        st.session_state['faiss_index'].add(np.array(embeddings_chunk).astype('float32'))
-    else:
-        index = faiss.IndexFlatL2(dimension)
-        index.add(np.array(embeddings_chunk).astype('float32'))
-        st.session_state['faiss_index'] = index
-        
-    # 4. Atualiza Documentos
-    if st.session_state['documents'] is None:
-        st.session_state['documents'] = []
-    st.session_state['documents'].extend(docs_chunk)
-    
-    return True
\ No newline at end of file
+    # 2. Embedding (com cache persistente por hash do documento)
+    embeddings_chunk = codifica_documentos(docs_chunk)
+    return embeddings_chunk, docs_chunk
+
+def adiciona_chunk_indice(embeddings_chunk, docs_chunk):
+    """
+    Etapa de indexação: adiciona os embeddings ao índice FAISS (Flat -> IVF/HNSW conforme
+    o tamanho) e os documentos, sob a trava compartilhada com as consultas.
+    Retorna o bloco do índice invertido do chunk (gravado com o checkpoint).
+    """
+    if embeddings_chunk is None or not docs_chunk:
+        return None
+
+    with st.session_state['rag_lock']:
+        if st.session_state['faiss_index'] is None:
+            # O índice registra o backend que o construiu
+            st.session_state['faiss_backend'] = backend_embedding_ativo()
+        st.session_state['faiss_index'] = adiciona_embeddings_indice(st.session_state['faiss_index'], embeddings_chunk)
+        st.session_state['faiss_versao'] = st.session_state.get('faiss_versao', 0) + 1
+        if st.session_state['documents'] is None:
+            st.session_state['documents'] = ArmazemDocumentos()
+        # Índice invertido (BM25) com os mesmos ids do FAISS
+        bloco_invertido = atualiza_indice_invertido(docs_chunk, len(st.session_state['documents']))
+        st.session_state['documents'].extend(docs_chunk)
+    return bloco_invertido
+
+def create_faiss_index_for_chunk(chunk, start_row=0):
+    """
+    Cria/adiciona a um índice FAISS para um chunk específico.
+    Retorna os embeddings e documentos do chunk (usados no checkpoint incremental).
+    """
+    embeddings_chunk, docs_chunk = prepara_embeddings_chunk(chunk, start_row)
+    adiciona_chunk_indice(embeddings_chunk, docs_chunk)
+    return embeddings_chunk, docs_chunk
\ No newline at end of file
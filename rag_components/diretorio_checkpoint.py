@@ -0,0 +1,8 @@
+import hashlib
+import os
+import tempfile
+
+def diretorio_checkpoint(file_hash, selected_file_name):
+    """Retorna o diretório de checkpoint (segmentos + manifesto) do arquivo selecionado."""
+    unique_file_hash = hashlib.md5((file_hash + selected_file_name).encode()).hexdigest()
+    return os.path.join(tempfile.gettempdir(), f"{unique_file_hash}_checkpoint")
\ No newline at end of file
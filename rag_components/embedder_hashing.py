@@ -0,0 +1,37 @@
+import numpy as np
+
+DIMENSAO_HASHING = 512
+
+class EmbedderHashing:
+    """
+    Embedder sem modelo (instantâneo e offline): vetoriza os termos 'COL=valor' e os
+    valores isolados por hashing (estilo TF-IDF, normalizado em L2). Mesma interface
+    encode() do SentenceTransformer.
+    """
+
+    def __init__(self, dimensao=DIMENSAO_HASHING):
+        from sklearn.feature_extraction.text import HashingVectorizer
+
+        self.dimensao = dimensao
+        self._vetorizador = HashingVectorizer(
+            n_features=dimensao,
+            analyzer=self._termos,
+            alternate_sign=True,
+            norm='l2',
+            dtype=np.float32
+        )
+
+    @staticmethod
+    def _termos(documento):
+        termos = []
+        for token in documento.lower().split():
+            termos.append(token)
+            if '=' in token:
+                termos.append(token.split('=', 1)[1])
+        return termos
+
+    def get_sentence_embedding_dimension(self):
+        return self.dimensao
+
+    def encode(self, documentos, show_progress_bar=False, **kwargs):
+        return self._vetorizador.transform(documentos).toarray()
\ No newline at end of file
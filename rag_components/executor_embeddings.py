@@ -0,0 +1,54 @@
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import streamlit as st
+from rag_components.load_embedding_model import load_embedding_model, carrega_backend_embedding
+
+# 1 = embedding no próprio processo; N > 1 = pool de N processos (CPU)
+NUM_PROCESSOS_EMBEDDING = 1
+TAMANHO_LOTE_EMBEDDING = 128
+
+# Modelo carregado uma vez em cada processo do pool
+_modelo_processo = None
+
+def _inicializa_processo(backend, threads_por_processo):
+    """Inicializador dos processos: limita as threads do torch e carrega o backend."""
+    global _modelo_processo
+    import torch
+
+    torch.set_num_threads(threads_por_processo)
+    _modelo_processo = carrega_backend_embedding(backend)
+
+def _codifica_lote(documentos):
+    return np.asarray(_modelo_processo.encode(documentos, show_progress_bar=False), dtype='float32')
+
+@st.cache_resource
+def obtem_executor_embeddings(num_processos, backend):
+    """Cria (uma única vez por tamanho e backend) o pool de processos de embedding."""
+    threads_por_processo = max(1, (os.cpu_count() or 1) // num_processos)
+    return ProcessPoolExecutor(
+        max_workers=num_processos,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_inicializa_processo,
+        initargs=(backend, threads_por_processo)
+    )
+
+def executa_embeddings(documentos, backend):
+    """
+    Gera os embeddings dos documentos. Com embedding_num_processos > 1 os documentos
+    são divididos em lotes distribuídos pelo pool e os resultados voltam na ordem original.
+    """
+    num_processos = st.session_state.get('embedding_num_processos', NUM_PROCESSOS_EMBEDDING)
+
+    # O backend de hashing é barato demais para compensar o envio entre processos
+    if num_processos <= 1 or backend == 'hashing' or len(documentos) <= TAMANHO_LOTE_EMBEDDING:
+        model = load_embedding_model(backend)
+        return np.asarray(model.encode(documentos, show_progress_bar=False), dtype='float32')
+
+    # Lotes de tamanho fixo mantêm todos os processos ocupados mesmo com chunks desiguais
+    tamanho_lote = max(TAMANHO_LOTE_EMBEDDING, -(-len(documentos) // (num_processos * 4)))
+    lotes = [documentos[i:i + tamanho_lote] for i in range(0, len(documentos), tamanho_lote)]
+
+    executor = obtem_executor_embeddings(num_processos, backend)
+    return np.vstack(list(executor.map(_codifica_lote, lotes)))
\ No newline at end of file
@@ -0,0 +1,188 @@
+import heapq
+import math
+import re
+from array import array
+from collections import Counter
+import numpy as np
+import streamlit as st
+from helpers.normalize_text import normalize_text
+
+# Parâmetros do BM25
+BM25_K1 = 1.5
+BM25_B = 0.75
+# Termos presentes em mais que esta fração dos documentos (ex.: nomes de colunas) são ignorados na busca
+FRACAO_MAX_TERMO = 0.5
+# Números não inteiros (quase únicos: V1..V28, Amount) são indexados por faixa com estes dígitos significativos
+DIGITOS_FAIXA_NUMERICA = 3
+# Candidatos do BM25 conferidos contra o valor literal exato da consulta (por top_k)
+CANDIDATOS_POR_RESULTADO = 20
+
+_PADRAO_TOKEN = re.compile(r"-?\d+(?:\.\d+)?(?:e[-+]?\d+)?|[a-z_][a-z0-9_]*")
+_PADRAO_LITERAL = re.compile(r"\d{3,}|\d+\.\d+|[a-z_]+\d+[a-z0-9_]*|\"[^\"]+\"|'[^']+'")
+
+def _normaliza_token(token):
+    """Números '2125.870' e '2125.87' (ou '1.0' e '1') viram o mesmo termo."""
+    if '.' in token and 'e' not in token and token[-1:].isdigit():
+        token = token.rstrip('0').rstrip('.')
+    return token
+
+def _termo_indice(token):
+    """Números não inteiros viram a sua faixa ('~2.13e+03' para 2125.87); os demais termos ficam iguais."""
+    if token[:1].isdigit() or token[:1] == '-':
+        if '.' in token or 'e' in token:
+            return f"~{float(token):.{DIGITOS_FAIXA_NUMERICA}g}"
+    return token
+
+def tokeniza_texto(texto, exato=False):
+    """
+    Quebra documentos/consultas em termos (palavras e números inteiros ou decimais).
+    Sem 'exato', números não inteiros viram faixas (termos do índice).
+    """
+    texto = normalize_text(str(texto)).lower()
+    tokens = [_normaliza_token(token) for token in _PADRAO_TOKEN.findall(texto)]
+    if exato:
+        return tokens
+    return [_termo_indice(token) for token in tokens]
+
+def consulta_literal(consulta):
+    """Indica se a consulta cita valores literais (números, IDs, trechos entre aspas)."""
+    return bool(_PADRAO_LITERAL.search(normalize_text(consulta).lower()))
+
+def cria_indice_invertido():
+    """
+    Índice invertido vazio: blocos de postings (um por chunk/segmento), comprimento de
+    cada documento e total de termos.
+    """
+    return {'blocos': [], 'comprimentos': array('I'), 'total_termos': 0}
+
+def cria_bloco_indice_invertido(documentos, inicio):
+    """
+    Postings compactos de um lote de documentos (ids a partir de 'inicio'): termos
+    ordenados, posição inicial de cada termo e arrays numpy de ids e frequências.
+    """
+    termos_postings, docs, frequencias, comprimentos = [], array('I'), array('I'), array('I')
+    for doc_id, documento in enumerate(documentos, start=inicio):
+        termos = Counter(tokeniza_texto(documento))
+        termos_postings.extend(termos.keys())
+        docs.extend([doc_id] * len(termos))
+        frequencias.extend(termos.values())
+        comprimentos.append(sum(termos.values()))
+
+    termos_postings = np.array(termos_postings, dtype=str)
+    ordem = np.argsort(termos_postings, kind='stable')
+    termos, inicios = np.unique(termos_postings[ordem], return_index=True)
+    return {
+        'inicio': inicio,
+        'termos': termos,
+        'inicios': np.append(inicios, len(ordem)).astype(np.int64),
+        'docs': np.asarray(docs, dtype=np.uint32)[ordem],
+        'frequencias': np.minimum(np.asarray(frequencias, dtype=np.uint32)[ordem], np.iinfo(np.uint16).max).astype(np.uint16),
+        'comprimentos': np.asarray(comprimentos, dtype=np.uint32)
+    }
+
+def codifica_bloco_indice_invertido(bloco):
+    """Arrays do bloco para o checkpoint (.npz), com ids relativos ao início do bloco."""
+    return {
+        'termos': bloco['termos'],
+        'inicios': bloco['inicios'],
+        'docs': (bloco['docs'] - np.uint32(bloco['inicio'])).astype(np.uint32),
+        'frequencias': bloco['frequencias'],
+        'comprimentos': bloco['comprimentos']
+    }
+
+def decodifica_bloco_indice_invertido(arrays, inicio):
+    """Bloco a partir dos arrays do checkpoint, com os ids a partir de 'inicio'."""
+    return {
+        'inicio': inicio,
+        'termos': arrays['termos'],
+        'inicios': arrays['inicios'],
+        'docs': (arrays['docs'] + np.uint32(inicio)).astype(np.uint32),
+        'frequencias': arrays['frequencias'],
+        'comprimentos': arrays['comprimentos']
+    }
+
+def adiciona_bloco_indice_invertido(indice, bloco):
+    """Acrescenta um bloco de postings ao índice (os ids do bloco seguem 'documents')."""
+    comprimentos = indice['comprimentos']
+    # Preenche eventuais documentos que não passaram pelo índice invertido
+    if len(comprimentos) < bloco['inicio']:
+        comprimentos.extend([0] * (bloco['inicio'] - len(comprimentos)))
+    comprimentos.extend(bloco['comprimentos'].tolist())
+    indice['total_termos'] += int(bloco['comprimentos'].sum())
+    indice['blocos'].append(bloco)
+    return indice
+
+def adiciona_documentos_indice_invertido(indice, documentos, inicio):
+    """
+    Adiciona os documentos ao índice invertido. Os ids seguem a posição na lista
+    'documents' (os mesmos ids do índice FAISS), começando em 'inicio'.
+    Retorna o bloco criado (gravado com o checkpoint).
+    """
+    bloco = cria_bloco_indice_invertido(documentos, inicio)
+    adiciona_bloco_indice_invertido(indice, bloco)
+    return bloco
+
+def constroi_indice_invertido(documentos):
+    """Reconstrói o índice invertido a partir de todos os documentos (checkpoints sem os blocos salvos)."""
+    indice = cria_indice_invertido()
+    if documentos:
+        adiciona_documentos_indice_invertido(indice, documentos, 0)
+    return indice
+
+def atualiza_indice_invertido(documentos, inicio):
+    """Atualiza o índice invertido da sessão (chamado sob a trava 'rag_lock'). Retorna o bloco criado."""
+    if st.session_state.get('indice_invertido') is None:
+        st.session_state['indice_invertido'] = constroi_indice_invertido(st.session_state['documents'][:inicio])
+    return adiciona_documentos_indice_invertido(st.session_state['indice_invertido'], documentos, inicio)
+
+def _postings(indice, termo):
+    """Ids e frequências de um termo, reunidos de todos os blocos."""
+    docs, frequencias = [], []
+    for bloco in indice['blocos']:
+        posicao = np.searchsorted(bloco['termos'], termo)
+        if posicao < len(bloco['termos']) and bloco['termos'][posicao] == termo:
+            inicio, fim = bloco['inicios'][posicao], bloco['inicios'][posicao + 1]
+            docs.append(bloco['docs'][inicio:fim])
+            frequencias.append(bloco['frequencias'][inicio:fim])
+    if not docs:
+        return None, None
+    return np.concatenate(docs), np.concatenate(frequencias).astype(np.float64)
+
+def busca_indice_invertido(indice, consulta, top_k=3, documentos=None):
+    """
+    Busca BM25: percorre só as listas de postings dos termos da consulta.
+    Números não inteiros da consulta buscam a sua faixa; com 'documentos', os melhores
+    candidatos que contêm o valor exato sobem para o topo.
+    Retorna uma lista de (id do documento, pontuação), da maior para a menor.
+    """
+    if not indice or not indice['comprimentos']:
+        return []
+
+    num_docs = len(indice['comprimentos'])
+    media_comprimento = indice['total_termos'] / num_docs or 1.0
+    comprimentos = np.asarray(indice['comprimentos'], dtype=np.float64)
+    ids, pontuacoes = [], []
+
+    for termo in set(tokeniza_texto(consulta)):
+        docs, frequencias = _postings(indice, termo)
+        if docs is None or len(docs) > FRACAO_MAX_TERMO * num_docs:
+            continue
+        idf = math.log(1 + (num_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+        normalizacao = BM25_K1 * (1 - BM25_B + BM25_B * comprimentos[docs] / media_comprimento)
+        ids.append(docs)
+        pontuacoes.append(idf * frequencias * (BM25_K1 + 1) / (frequencias + normalizacao))
+
+    if not ids:
+        return []
+    unicos, posicoes = np.unique(np.concatenate(ids), return_inverse=True)
+    totais = np.bincount(posicoes, weights=np.concatenate(pontuacoes))
+    resultados = [(int(doc_id), float(pontuacao)) for doc_id, pontuacao in zip(unicos, totais)]
+
+    exatos = {token for token in tokeniza_texto(consulta, exato=True) if _termo_indice(token) != token}
+    if not exatos or documentos is None:
+        return heapq.nlargest(top_k, resultados, key=lambda item: item[1])
+
+    candidatos = heapq.nlargest(top_k * CANDIDATOS_POR_RESULTADO, resultados, key=lambda item: item[1])
+    def acertos_exatos(item):
+        return len(exatos & set(tokeniza_texto(documentos[item[0]], exato=True))) if item[0] < len(documentos) else 0
+    return sorted(candidatos, key=lambda item: (acertos_exatos(item), item[1]), reverse=True)[:top_k]
@@ -1,7 +1,47 @@
 import streamlit as st
 
-@st.cache_resource
-def load_embedding_model():
-    """Carrega o modelo de embedding uma única vez."""
+NOME_MODELO_EMBEDDING = 'paraphrase-MiniLM-L6-v2'
+ARQUIVO_ONNX_INT8 = 'onnx/model_quint8_avx2.onnx'
+BACKEND_EMBEDDING = 'minilm'
+
+# Registro de backends: nome -> identificador (gravado no índice e usado na chave do cache)
+BACKENDS_EMBEDDING = {
+    'minilm': f'sentence-transformers:{NOME_MODELO_EMBEDDING}',
+    'minilm_onnx_int8': f'onnx-int8:{NOME_MODELO_EMBEDDING}:{ARQUIVO_ONNX_INT8}',
+    'hashing': 'hashing:512',
+}
+
+def backend_embedding_ativo():
+    """
+    Backend em uso: o que construiu o índice atual (para manter os vetores compatíveis)
+    ou, sem índice, o configurado em session_state['embedding_backend'].
+    """
+    backend = st.session_state.get('faiss_backend') or st.session_state.get('embedding_backend', BACKEND_EMBEDDING)
+    if backend not in BACKENDS_EMBEDDING:
+        raise ValueError(f"Backend de embedding desconhecido: {backend}")
+    return backend
+
+def carrega_backend_embedding(backend):
+    """Instancia o backend de embedding (sem cache; usado também pelos processos do pool)."""
+    if backend == 'hashing':
+        from rag_components.embedder_hashing import EmbedderHashing
+        return EmbedderHashing()
+
     from sentence_transformers import SentenceTransformer
-    return SentenceTransformer('paraphrase-MiniLM-L6-v2')
\ No newline at end of file
+    if backend == 'minilm_onnx_int8':
+        # Requer sentence-transformers[onnx] (optimum + onnxruntime)
+        return SentenceTransformer(
+            NOME_MODELO_EMBEDDING,
+            backend='onnx',
+            device='cpu',
+            model_kwargs={'file_name': ARQUIVO_ONNX_INT8}
+        )
+    return SentenceTransformer(NOME_MODELO_EMBEDDING)
+
+@st.cache_resource
+def _carrega_backend_cache(backend):
+    return carrega_backend_embedding(backend)
+
+def load_embedding_model(backend=None):
+    """Carrega o modelo de embedding (do backend ativo ou do informado) uma única vez."""
+    return _carrega_backend_cache(backend or backend_embedding_ativo())
\ No newline at end of file
@@ -1,36 +1,181 @@
-import hashlib
+import json
 import os
 import pickle
-import tempfile
-import faiss
+import numpy as np
+import pandas as pd
+from rag_components.diretorio_checkpoint import diretorio_checkpoint
+from rag_components.adiciona_embeddings_indice import adiciona_embeddings_indice
+from rag_components.codifica_bloco_embeddings import decodifica_bloco_embeddings
+from rag_components.armazem_documentos import ArmazemDocumentos, abre_bloco_documentos, codifica_documentos_utf8
+from rag_components.indice_invertido import (
+    adiciona_bloco_indice_invertido,
+    adiciona_documentos_indice_invertido,
+    cria_indice_invertido,
+    decodifica_bloco_indice_invertido
+)
+
+def _le_segmento_dados(diretorio, segmento):
+    """Lê o segmento de dados (Parquet ou pickle) registrado no manifesto."""
+    caminho = os.path.join(diretorio, segmento["dados"])
+    if segmento.get("formato_dados") == "pickle":
+        with open(caminho, "rb") as f:
+            return pickle.load(f)
+    return pd.read_parquet(caminho)
+
+def _le_documentos_embeddings(diretorio, registro):
+    """
+    Lê o bloco de documentos (buffer UTF-8 + offsets, mapeado em memória) e o bloco de
+    embeddings (decodificado) de um registro do manifesto.
+    """
+    if registro.get("formato_documentos") == "utf8":
+        documentos = abre_bloco_documentos(
+            os.path.join(diretorio, registro["documentos"]),
+            os.path.join(diretorio, registro["offsets_documentos"])
+        )
+    else:
+        # Checkpoints antigos: lista de documentos em JSON
+        with open(os.path.join(diretorio, registro["documentos"]), "r", encoding="utf-8") as f:
+            documentos = codifica_documentos_utf8(json.load(f))
+    embeddings = None
+    if registro.get("embeddings"):
+        with np.load(os.path.join(diretorio, registro["embeddings"])) as arrays:
+            embeddings = decodifica_bloco_embeddings(registro.get("formato_embeddings"), arrays)
+    return documentos, embeddings
 
 def load_progress(file_hash, selected_file_name):
-    """Carrega o progresso do disco, se existir."""
+    """
+    Carrega o progresso do disco, se existir, a partir do manifesto de segmentos.
+    Retorna (df, faiss_index, documents, linha_de_retomada, backend_embedding). A leitura
+    para no primeiro segmento inconsistente, de modo que df, índice e documentos coincidem.
+    """
     try:
-        unique_file_hash = hashlib.md5((file_hash + selected_file_name).encode()).hexdigest()
-        temp_dir = tempfile.gettempdir()
-        
-        df_path = os.path.join(temp_dir, f"{unique_file_hash}_df.pkl")
-        faiss_path = os.path.join(temp_dir, f"{unique_file_hash}_faiss_index.bin")
-        docs_path = os.path.join(temp_dir, f"{unique_file_hash}_documents.pkl")
-        meta_path = os.path.join(temp_dir, f"{unique_file_hash}_metadata.txt")
-
-        # Verifica se todos os arquivos essenciais existem
-        if os.path.exists(df_path) and os.path.exists(faiss_path) and os.path.exists(docs_path):
-            with open(df_path, "rb") as f:
-                df = pickle.load(f)
-            faiss_index = faiss.read_index(faiss_path)
-            with open(docs_path, "rb") as f:
-                documents = pickle.load(f)
-            
-            total_lines = 0
-            if os.path.exists(meta_path):
-                 with open(meta_path, "r") as f:
-                    total_lines = int(f.read())
-            
-            # Retorna o total de linhas do DF carregado, que é o número real de linhas processadas
-            return df, faiss_index, documents, len(df)
-        return None, None, None, 0
+        diretorio = diretorio_checkpoint(file_hash, selected_file_name)
+        manifest_path = os.path.join(diretorio, "manifest.json")
+
+        if not os.path.exists(manifest_path):
+            return None, None, None, 0, None
+
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifesto = json.load(f)
+
+        partes, blocos_embeddings, documents = [], [], ArmazemDocumentos()
+        linha_retomada = 0
+
+        for segmento in manifesto.get("segmentos", []):
+            if segmento["linha_inicio"] != linha_retomada:
+                break
+            try:
+                parte = _le_segmento_dados(diretorio, segmento)
+                docs_segmento, embeddings = _le_documentos_embeddings(diretorio, segmento)
+            except Exception:
+                break
+
+            num_linhas = segmento["linha_fim"] - segmento["linha_inicio"]
+            num_embeddings = 0 if embeddings is None else len(embeddings)
+            if len(parte) != num_linhas or len(docs_segmento[1]) - 1 != num_embeddings:
+                break
+
+            partes.append(parte)
+            documents.adiciona_bloco(*docs_segmento)
+            if embeddings is not None:
+                blocos_embeddings.append(embeddings)
+            linha_retomada = segmento["linha_fim"]
+
+        if not partes:
+            return None, None, None, 0, None
+
+        # Documentos de resumo (modo de orçamento), válidos apenas para as linhas atuais
+        resumo = manifesto.get("resumo")
+        if resumo and resumo.get("linha_fim") == linha_retomada:
+            try:
+                docs_resumo, embeddings_resumo = _le_documentos_embeddings(diretorio, resumo)
+                if embeddings_resumo is not None and len(docs_resumo[1]) - 1 == len(embeddings_resumo):
+                    documents.adiciona_bloco(*docs_resumo)
+                    blocos_embeddings.append(embeddings_resumo)
+            except Exception:
+                pass
+
+        df = pd.concat(partes, ignore_index=True) if len(partes) > 1 else partes[0]
+
+        # Reconstrói o índice bloco a bloco com a mesma configuração registrada no
+        # manifesto, reproduzindo a escolha (e a migração) de tipo feita na ingestão
+        config_indice = manifesto.get("config_indice") or {}
+        faiss_index = None
+        for embeddings in blocos_embeddings:
+            faiss_index = adiciona_embeddings_indice(
+                faiss_index,
+                embeddings,
+                tipo_ann=config_indice.get("tipo_ann"),
+                limiar_ann=config_indice.get("limiar_ann"),
+                compressao=config_indice.get("compressao"),
+                rerank_exato=config_indice.get("rerank_exato")
+            )
+
+        # Retorna a linha exata de retomada registrada no manifesto
+        return df, faiss_index, documents, linha_retomada, manifesto.get("backend_embedding")
     except Exception as e:
         # print(f"Erro ao carregar o progresso: {e}")
-        return None, None, None, 0
\ No newline at end of file
+        return None, None, None, 0, None
+
+def load_perfil(file_hash, selected_file_name, linha_fim):
+    """
+    Carrega o perfil das colunas salvo no checkpoint, se ele (e o registro do manifesto)
+    corresponder exatamente às linhas carregadas (linha_fim); caso contrário retorna None.
+    """
+    try:
+        diretorio = diretorio_checkpoint(file_hash, selected_file_name)
+        with open(os.path.join(diretorio, "manifest.json"), "r", encoding="utf-8") as f:
+            registro = json.load(f).get("perfil")
+        if not registro or registro.get("linha_fim") != linha_fim:
+            return None
+        with open(os.path.join(diretorio, registro["arquivo"]), "r", encoding="utf-8") as f:
+            perfil = json.load(f)
+        if perfil.get("linhas") != linha_fim:
+            return None
+        return perfil
+    except Exception:
+        return None
+
+def load_indice_invertido(file_hash, selected_file_name, documentos):
+    """
+    Monta o índice invertido (BM25) dos documentos carregados a partir dos blocos de
+    postings salvos com cada segmento (e com o resumo), sem retokenizar o corpus.
+    Registros sem bloco legível (checkpoints antigos) e documentos restantes são
+    tokenizados a partir de 'documentos'.
+    """
+    indice = cria_indice_invertido()
+    total = len(documentos or [])
+    inicio = 0
+    try:
+        diretorio = diretorio_checkpoint(file_hash, selected_file_name)
+        with open(os.path.join(diretorio, "manifest.json"), "r", encoding="utf-8") as f:
+            manifesto = json.load(f)
+        registros = list(manifesto.get("segmentos", []))
+        if manifesto.get("resumo"):
+            registros.append(manifesto["resumo"])
+    except Exception:
+        registros = []
+
+    # Mesma ordem dos documentos em load_progress: segmentos e, por último, o resumo
+    for registro in registros:
+        num_documentos = registro.get("num_documentos", 0)
+        if inicio + num_documentos > total:
+            break
+        bloco = None
+        if registro.get("indice_invertido"):
+            try:
+                with np.load(os.path.join(diretorio, registro["indice_invertido"])) as arrays:
+                    bloco = decodifica_bloco_indice_invertido(arrays, inicio)
+                if len(bloco['comprimentos']) != num_documentos:
+                    bloco = None
+            except Exception:
+                bloco = None
+        if bloco is None:
+            adiciona_documentos_indice_invertido(indice, documentos[inicio:inicio + num_documentos], inicio)
+        else:
+            adiciona_bloco_indice_invertido(indice, bloco)
+        inicio += num_documentos
+
+    if inicio < total:
+        adiciona_documentos_indice_invertido(indice, documentos[inicio:total], inicio)
+    return indice
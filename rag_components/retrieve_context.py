@@ -1,17 +1,9 @@
-import numpy as np
-from rag_components.load_embedding_model import load_embedding_model
+from rag_components.retrieve_context_batch import retrieve_context_batch
 
-def retrieve_context(query, index, documents, top_k=3):
-    """Recupera os documentos mais relevantes do índice FAISS para uma dada consulta."""
-    model = load_embedding_model()
-    query_embedding = model.encode([query])
-    
-    if index is None or index.ntotal == 0:
-        return ""
-    
-    # Faiss espera np.float32, então convertemos a query embedding
-    D, I = index.search(np.array(query_embedding).astype('float32'), top_k)
-    
-    retrieved_docs = [documents[i] for i in I[0] if i < len(documents)]
-    
-    return "\n".join(retrieved_docs)
\ No newline at end of file
+def retrieve_context(query, index, documents, top_k=3, backend=None):
+    """
+    Recupera os documentos mais relevantes do índice FAISS para uma dada consulta.
+    A consulta é codificada pelo mesmo backend que construiu o índice, e embeddings e
+    resultados repetidos vêm dos caches LRU da sessão.
+    """
+    return retrieve_context_batch([query], index, documents, top_k=top_k, backend=backend)[0]
\ No newline at end of file
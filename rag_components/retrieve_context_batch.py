@@ -0,0 +1,81 @@
+import numpy as np
+import streamlit as st
+from rag_components.load_embedding_model import backend_embedding_ativo
+from rag_components.indice_invertido import busca_indice_invertido, consulta_literal
+from rag_components.cache_consultas import (
+    cache_resultados_consultas,
+    embeddings_consultas,
+    normaliza_consulta,
+    versao_indice
+)
+
+# 'hibrida': consultas literais vão ao BM25, as demais fundem BM25 e FAISS;
+# 'semantica': só FAISS; 'palavras': só BM25
+MODO_BUSCA = 'hibrida'
+# Constante da fusão por posição recíproca (Reciprocal Rank Fusion)
+RRF_K = 60
+
+def _funde_rankings(rankings, top_k):
+    """Fusão por posição recíproca: soma 1 / (RRF_K + posição) de cada ranking."""
+    pontuacoes = {}
+    for ranking in rankings:
+        for posicao, doc_id in enumerate(ranking):
+            pontuacoes[doc_id] = pontuacoes.get(doc_id, 0.0) + 1.0 / (RRF_K + posicao + 1)
+    return sorted(pontuacoes, key=pontuacoes.get, reverse=True)[:top_k]
+
+def retrieve_context_batch(queries, index, documents, top_k=3, backend=None, indice_invertido=None, modo_busca=None):
+    """
+    Recupera o contexto de várias consultas de uma vez: as consultas sem resultado em
+    cache são codificadas juntas e buscadas em uma única chamada ao FAISS.
+    Consultas com valores literais (números, IDs) são respondidas pelo índice invertido
+    (BM25), sem varrer os vetores. Retorna uma lista de strings, na ordem das consultas.
+    """
+    if indice_invertido is None:
+        indice_invertido = st.session_state.get('indice_invertido')
+    if modo_busca is None:
+        modo_busca = st.session_state.get('rag_modo_busca', MODO_BUSCA)
+    if not indice_invertido:
+        modo_busca = 'semantica'
+    if index is None or index.ntotal == 0:
+        if modo_busca == 'semantica':
+            return ["" for _ in queries]
+        modo_busca = 'palavras'
+
+    backend = backend or backend_embedding_ativo()
+    cache = cache_resultados_consultas()
+    versao = versao_indice(index) if index is not None else (st.session_state.get('faiss_versao', 0),)
+    chaves = [(versao, backend, modo_busca, normaliza_consulta(query), top_k) for query in queries]
+
+    pendentes = {}
+    for chave, query in zip(chaves, queries):
+        if chave not in cache and chave not in pendentes:
+            pendentes[chave] = query
+
+    # 1. Índice invertido (custo proporcional às listas de postings dos termos)
+    rankings_bm25 = {}
+    if modo_busca != 'semantica':
+        for chave, query in pendentes.items():
+            rankings_bm25[chave] = [doc_id for doc_id, _ in busca_indice_invertido(indice_invertido, query, top_k, documents)]
+
+    # 2. FAISS só para as consultas que precisam do ranking semântico
+    semanticas = [
+        chave for chave, query in pendentes.items()
+        if modo_busca == 'semantica'
+        or (modo_busca == 'hibrida' and not (consulta_literal(query) and rankings_bm25[chave]))
+    ]
+    rankings_faiss = {}
+    if semanticas:
+        query_embeddings = embeddings_consultas([pendentes[chave] for chave in semanticas], backend)
+        # Faiss espera np.float32
+        D, I = index.search(np.ascontiguousarray(query_embeddings, dtype='float32'), top_k)
+        for chave, ids in zip(semanticas, I):
+            # Índices aproximados (IVF) podem devolver -1 quando há menos de top_k vizinhos
+            rankings_faiss[chave] = [int(i) for i in ids if i >= 0]
+
+    for chave in pendentes:
+        rankings = [r for r in (rankings_bm25.get(chave), rankings_faiss.get(chave)) if r]
+        ids = rankings[0] if len(rankings) == 1 else _funde_rankings(rankings, top_k)
+        retrieved_docs = [documents[i] for i in ids if 0 <= i < len(documents)]
+        cache[chave] = "\n".join(retrieved_docs)
+
+    return [cache[chave] for chave in chaves]
\ No newline at end of file
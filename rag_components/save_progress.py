@@ -1,36 +1,231 @@
 import streamlit as st
 import os
+import json
 import pickle
-import hashlib
-import faiss
-import tempfile
+import uuid
+import numpy as np
+from rag_components.diretorio_checkpoint import diretorio_checkpoint
+from rag_components.adiciona_embeddings_indice import config_indice_faiss, descreve_indice
+from rag_components.codifica_bloco_embeddings import codifica_bloco_embeddings
+from rag_components.armazem_documentos import codifica_documentos_utf8
+from rag_components.indice_invertido import codifica_bloco_indice_invertido, cria_bloco_indice_invertido
 
-def save_progress(file_hash, df, faiss_index, documents, total_lines):
-    """Salva o progresso no disco."""
+MANIFESTO = "manifest.json"
+# Prefixos dos arquivos de dados do checkpoint (os não referenciados pelo manifesto são órfãos)
+PREFIXOS_ARQUIVOS_CHECKPOINT = ("segmento_", "embeddings_", "documentos_", "indice_invertido_", "perfil_")
+
+def _grava_atomico(caminho, escrever, modo="wb"):
+    """Grava em um arquivo temporário e o renomeia, para nunca deixar um arquivo pela metade."""
+    caminho_tmp = caminho + ".tmp"
+    with open(caminho_tmp, modo) as f:
+        escrever(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(caminho_tmp, caminho)
+
+def _le_manifesto(diretorio):
+    """Lê o manifesto do checkpoint (ou retorna um manifesto vazio)."""
+    caminho = os.path.join(diretorio, MANIFESTO)
+    if not os.path.exists(caminho):
+        return {"versao": 1, "total_lines": 0, "segmentos": []}
+    with open(caminho, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def _arquivos_manifesto(manifesto):
+    """Arquivos referenciados pelo manifesto (segmentos, resumo e perfil)."""
+    registros = list(manifesto.get("segmentos", [])) + [manifesto.get("resumo") or {}]
+    arquivos = {
+        registro.get(campo)
+        for registro in registros
+        for campo in ("dados", "embeddings", "documentos", "offsets_documentos", "indice_invertido")
+    }
+    arquivos.add((manifesto.get("perfil") or {}).get("arquivo"))
+    return {arquivo for arquivo in arquivos if arquivo}
+
+def _commit_manifesto(diretorio, manifesto):
+    """
+    Grava o manifesto (ponto de commit) e só depois remove os arquivos que ele não
+    referencia mais (segmentos descartados, gerações anteriores, temporários).
+    """
+    _grava_atomico(
+        os.path.join(diretorio, MANIFESTO),
+        lambda f: json.dump(manifesto, f, ensure_ascii=False, indent=1),
+        modo="w"
+    )
+    referenciados = _arquivos_manifesto(manifesto)
+    for nome in os.listdir(diretorio):
+        if nome.startswith(PREFIXOS_ARQUIVOS_CHECKPOINT) and nome not in referenciados:
+            try:
+                os.remove(os.path.join(diretorio, nome))
+            except OSError:
+                pass
+
+def _compressao_checkpoint(config_indice):
+    """
+    Compressão dos blocos de embeddings: a do índice, exceto com rerank exato, que precisa
+    dos vetores originais (float32) para continuar exato após a retomada.
+    """
+    if config_indice.get('rerank_exato'):
+        return 'nenhuma'
+    return config_indice['compressao']
+
+def _grava_segmento_dados(caminho_base, chunk):
+    """Grava o chunk em Parquet; recorre ao pickle se o esquema não for suportado pelo Arrow."""
     try:
-        if st.session_state.get('selected_file_name'):
-            unique_file_hash = hashlib.md5((file_hash + st.session_state['selected_file_name']).encode()).hexdigest()
-            
-            temp_dir = tempfile.gettempdir()
-            
-            # Garante que o df não está vazio antes de salvar
-            if df is not None and not df.empty:
-                with open(os.path.join(temp_dir, f"{unique_file_hash}_df.pkl"), "wb") as f:
-                    pickle.dump(df, f)
-            
-            # Garante que o índice foi criado antes de salvar
-            if faiss_index is not None and faiss_index.ntotal > 0:
-                faiss.write_index(faiss_index, os.path.join(temp_dir, f"{unique_file_hash}_faiss_index.bin"))
-                
-            if documents:
-                with open(os.path.join(temp_dir, f"{unique_file_hash}_documents.pkl"), "wb") as f:
-                    pickle.dump(documents, f)
+        caminho = caminho_base + ".parquet"
+        _grava_atomico(caminho, lambda f: chunk.to_parquet(f, index=False))
+        return os.path.basename(caminho), "parquet"
+    except Exception:
+        caminho = caminho_base + ".pkl"
+        _grava_atomico(caminho, lambda f: pickle.dump(chunk, f))
+        return os.path.basename(caminho), "pickle"
+
+def _grava_documentos(diretorio, nome_base, documentos):
+    """Grava os documentos como buffer UTF-8 contíguo + offsets (mapeáveis em memória na carga)."""
+    dados, offsets = codifica_documentos_utf8(list(documentos or []))
+    arquivo_documentos = f"{nome_base}.utf8"
+    arquivo_offsets = f"{nome_base}_offsets.npy"
+    _grava_atomico(os.path.join(diretorio, arquivo_documentos), lambda f: f.write(dados))
+    _grava_atomico(os.path.join(diretorio, arquivo_offsets), lambda f: np.save(f, offsets))
+    return arquivo_documentos, arquivo_offsets
+
+def _grava_indice_invertido(diretorio, nome_base, bloco_invertido, documentos):
+    """Grava o bloco de postings (BM25) dos documentos; a retomada não precisa retokenizá-los."""
+    if bloco_invertido is None:
+        bloco_invertido = cria_bloco_indice_invertido(list(documentos or []), 0)
+    arquivo = f"{nome_base}.npz"
+    arrays = codifica_bloco_indice_invertido(bloco_invertido)
+    _grava_atomico(os.path.join(diretorio, arquivo), lambda f: np.savez(f, **arrays))
+    return arquivo
+
+def save_progress(file_hash, chunk, embeddings_chunk, docs_chunk, start_row, total_lines, selected_file_name=None, bloco_invertido=None):
+    """
+    Salva o progresso de forma incremental: um segmento de dados, um bloco de embeddings,
+    os documentos do chunk e o seu bloco do índice invertido (recriado se não for passado).
+    O manifesto (gravado por último, de forma atômica) é a única fonte de verdade sobre
+    quais segmentos são válidos.
+    """
+    try:
+        selected_file_name = selected_file_name or st.session_state.get('selected_file_name')
+        if selected_file_name:
+            diretorio = diretorio_checkpoint(file_hash, selected_file_name)
+            os.makedirs(diretorio, exist_ok=True)
+
+            manifesto = _le_manifesto(diretorio)
             
-            with open(os.path.join(temp_dir, f"{unique_file_hash}_metadata.txt"), "w") as f:
-                f.write(str(total_lines))
-                
+            # Descarta segmentos que não terminam exatamente onde este chunk começa
+            # (ex.: reprocessamento a partir do início)
+            segmentos = [s for s in manifesto["segmentos"] if s["linha_fim"] <= start_row]
+            if segmentos and segmentos[-1]["linha_fim"] != start_row:
+                segmentos = []
+            if not segmentos and start_row != 0:
+                return False
+
+            # Garante que o chunk não está vazio antes de salvar
+            if chunk is None or chunk.empty:
+                return False
+
+            # Nomes únicos por gravação: um reprocessamento nunca sobrescreve arquivos
+            # que o manifesto atual ainda referencia
+            id_segmento = len(segmentos)
+            nome_segmento = f"{id_segmento:06d}_{uuid.uuid4().hex[:8]}"
+            caminho_base = os.path.join(diretorio, f"segmento_{nome_segmento}")
+            arquivo_dados, formato_dados = _grava_segmento_dados(caminho_base, chunk)
+
+            config_indice = config_indice_faiss()
+            arquivo_embeddings, formato_embeddings = None, None
+            if embeddings_chunk is not None and len(embeddings_chunk) > 0:
+                # O bloco segue o modo de compressão do índice (float32/float16/sq8; float32 com rerank exato)
+                formato_embeddings, arrays = codifica_bloco_embeddings(embeddings_chunk, _compressao_checkpoint(config_indice))
+                arquivo_embeddings = f"embeddings_{nome_segmento}.npz"
+                _grava_atomico(
+                    os.path.join(diretorio, arquivo_embeddings),
+                    lambda f: np.savez(f, **arrays)
+                )
+
+            arquivo_documentos, arquivo_offsets = _grava_documentos(diretorio, f"documentos_{nome_segmento}", docs_chunk)
+            arquivo_invertido = _grava_indice_invertido(diretorio, f"indice_invertido_{nome_segmento}", bloco_invertido, docs_chunk)
+
+            segmentos.append({
+                "id": id_segmento,
+                "linha_inicio": start_row,
+                "linha_fim": start_row + len(chunk),
+                "dados": arquivo_dados,
+                "formato_dados": formato_dados,
+                "embeddings": arquivo_embeddings,
+                "formato_embeddings": formato_embeddings,
+                "documentos": arquivo_documentos,
+                "offsets_documentos": arquivo_offsets,
+                "formato_documentos": "utf8",
+                "num_documentos": len(docs_chunk or []),
+                "indice_invertido": arquivo_invertido
+            })
+            # Perfil das colunas acumulado até o fim deste segmento (um arquivo por segmento:
+            # o perfil do manifesto anterior continua intacto até o novo manifesto)
+            perfil = st.session_state.get('perfil_colunas')
+            if perfil is not None and perfil.get('linhas') == start_row + len(chunk):
+                arquivo_perfil = f"perfil_{nome_segmento}.json"
+                _grava_atomico(
+                    os.path.join(diretorio, arquivo_perfil),
+                    lambda f: json.dump(perfil, f),
+                    modo="w"
+                )
+                manifesto["perfil"] = {"arquivo": arquivo_perfil, "linha_fim": start_row + len(chunk)}
+            else:
+                manifesto.pop("perfil", None)
+
+            manifesto["segmentos"] = segmentos
+            # Novas linhas tornam os documentos de resumo obsoletos
+            manifesto.pop("resumo", None)
+            manifesto["total_lines"] = total_lines
+            manifesto["arquivo"] = selected_file_name
+            manifesto["config_indice"] = config_indice
+            manifesto["indice"] = descreve_indice(st.session_state.get('faiss_index'))
+            manifesto["backend_embedding"] = st.session_state.get('faiss_backend')
+
+            # Ponto de commit: só após o manifesto o segmento passa a existir
+            _commit_manifesto(diretorio, manifesto)
             return True
         return False
     except Exception as e:
         # st.error(f"Erro ao salvar o progresso: {e}") 
+        return False
+
+def save_documentos_resumo(file_hash, embeddings_resumo, docs_resumo, selected_file_name=None):
+    """
+    Salva os documentos de resumo (modo de orçamento) no checkpoint. Eles não
+    correspondem a linhas do df e ficam registrados à parte no manifesto.
+    """
+    try:
+        selected_file_name = selected_file_name or st.session_state.get('selected_file_name')
+        if selected_file_name and docs_resumo:
+            diretorio = diretorio_checkpoint(file_hash, selected_file_name)
+            manifesto = _le_manifesto(diretorio)
+            if not manifesto["segmentos"]:
+                return False
+
+            config_indice = config_indice_faiss()
+            nome_resumo = f"resumo_{uuid.uuid4().hex[:8]}"
+            formato_embeddings, arrays = codifica_bloco_embeddings(embeddings_resumo, _compressao_checkpoint(config_indice))
+            arquivo_embeddings = f"embeddings_{nome_resumo}.npz"
+            _grava_atomico(os.path.join(diretorio, arquivo_embeddings), lambda f: np.savez(f, **arrays))
+            arquivo_documentos, arquivo_offsets = _grava_documentos(diretorio, f"documentos_{nome_resumo}", docs_resumo)
+            arquivo_invertido = _grava_indice_invertido(diretorio, f"indice_invertido_{nome_resumo}", None, docs_resumo)
+
+            manifesto["resumo"] = {
+                "linha_fim": manifesto["segmentos"][-1]["linha_fim"],
+                "embeddings": arquivo_embeddings,
+                "formato_embeddings": formato_embeddings,
+                "documentos": arquivo_documentos,
+                "offsets_documentos": arquivo_offsets,
+                "formato_documentos": "utf8",
+                "num_documentos": len(docs_resumo),
+                "indice_invertido": arquivo_invertido
+            }
+            manifesto["indice"] = descreve_indice(st.session_state.get('faiss_index'))
+            manifesto["backend_embedding"] = st.session_state.get('faiss_backend')
+            _commit_manifesto(diretorio, manifesto)
+            return True
+        return False
+    except Exception as e:
         return False
\ No newline at end of file
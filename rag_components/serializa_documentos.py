@@ -0,0 +1,31 @@
+import pandas as pd
+import streamlit as st
+
+PRECISAO_FLOAT = 4
+
+def serializa_documentos(chunk, colunas=None, precisao=None):
+    """
+    Converte as linhas do chunk em documentos 'COL=valor COL=valor ...'.
+    A montagem é feita coluna a coluna (operações vetorizadas), sem laço por linha.
+    """
+    if colunas is None:
+        colunas = st.session_state.get('rag_colunas_documento')
+    if precisao is None:
+        precisao = st.session_state.get('rag_precisao_float', PRECISAO_FLOAT)
+
+    colunas = [col for col in (colunas or chunk.columns) if col in chunk.columns]
+    if chunk.empty or not colunas:
+        return []
+
+    documentos = None
+    for col in colunas:
+        serie = chunk[col]
+        if pd.api.types.is_float_dtype(serie.dtype):
+            valores = serie.round(precisao).astype(str)
+        else:
+            valores = serie.astype(str)
+
+        termo = f"{col}=" + valores
+        documentos = termo if documentos is None else documentos + " " + termo
+
+    return documentos.tolist()
\ No newline at end of file
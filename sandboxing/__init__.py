@@ -1 +1,4 @@
-from sandboxing.executa_codigo_seguro import executa_codigo_seguro
\ No newline at end of file
+from sandboxing.executa_codigo_seguro import executa_codigo_seguro
+from sandboxing.executa_codigo_local import executa_codigo_local
+from sandboxing.executa_codigo_seguro import aquece_sandbox
+from sandboxing.cache_resultados_sandbox import cache_resultados_sandbox
\ No newline at end of file
@@ -0,0 +1,32 @@
+import hashlib
+import streamlit as st
+from cachetools import LRUCache
+
+# Limite (MB) do cache de resultados: texto + resultado_df + png
+TAMANHO_CACHE_SANDBOX_MB = 256
+
+def chave_codigo(codigo):
+    """Hash do código executado (chave do cache dentro de uma versão do dataset)."""
+    return hashlib.sha256(codigo.encode('utf-8')).hexdigest()
+
+def tamanho_resultado(resultado):
+    """Tamanho aproximado (bytes) de (resultado_texto, resultado_df, erro, img_bytes)."""
+    resultado_texto, resultado_df, _, img_bytes = resultado
+    tamanho = len(resultado_texto or "") + len(img_bytes or b"")
+    if resultado_df is not None:
+        tamanho += int(resultado_df.memory_usage(index=True, deep=True).sum())
+    return max(tamanho, 1)
+
+def cache_resultados_sandbox(versao):
+    """
+    LRU (limitado em bytes) dos resultados do sandbox da versão atual do dataset.
+    Uma versão nova (ex.: a ingestão acrescentou linhas) descarta os resultados anteriores.
+    """
+    cache = st.session_state.get('cache_resultados_sandbox')
+    if cache is None or cache['versao'] != versao:
+        cache = {
+            'versao': versao,
+            'lru': LRUCache(maxsize=TAMANHO_CACHE_SANDBOX_MB * 1024 * 1024, getsizeof=tamanho_resultado)
+        }
+        st.session_state['cache_resultados_sandbox'] = cache
+    return cache['lru']
@@ -0,0 +1,113 @@
+import os
+import uuid
+import shutil
+import weakref
+import tempfile
+import logging
+import streamlit as st
+
+logger = logging.getLogger(__name__)
+
+# Um subdiretório por processo do Streamlit (pid): arquivos de processos encerrados são órfãos
+DIRETORIO_DATASET_SANDBOX = os.path.join(tempfile.gettempdir(), "eda_agent_sandbox")
+
+# Tabela Arrow aberta (memory map) no processo do sandbox: (caminho, tabela)
+_tabela_processo = None
+
+def versao_dataset(df):
+    """
+    Versão do DataFrame da sessão: muda quando o df é substituído (nova consolidação
+    após acréscimo de chunks, novo arquivo) ou muda de tamanho. Retorna o registro
+    st.session_state['sandbox_dataset'] ({'df', 'linhas', 'versao', 'caminho'}).
+    """
+    registro = st.session_state.get('sandbox_dataset')
+    if registro is not None and registro['df'] is df and registro['linhas'] == len(df):
+        return registro
+
+    if registro is not None:
+        _remove_arquivo(registro['caminho'])
+    # Guardar a referência ao df impede que outro objeto reaproveite o mesmo id
+    registro = {'df': df, 'linhas': len(df), 'versao': (registro['versao'] + 1) if registro else 1, 'caminho': None}
+    st.session_state['sandbox_dataset'] = registro
+    return registro
+
+def _remove_arquivo(caminho):
+    if not caminho:
+        return
+    try:
+        os.remove(caminho)
+    except OSError:
+        # Ainda mapeado por um processo (Windows) ou já removido
+        pass
+
+def _processo_ativo(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        # Sem permissão para sinalizar: o processo existe
+        pass
+    return True
+
+def limpa_datasets_orfaos():
+    """
+    Remove os datasets publicados por processos do Streamlit que já terminaram (ex.: o
+    servidor foi reiniciado sem encerrar as sessões). Chamado ao criar o pool do sandbox.
+    """
+    if not os.path.isdir(DIRETORIO_DATASET_SANDBOX):
+        return
+    for nome in os.listdir(DIRETORIO_DATASET_SANDBOX):
+        caminho = os.path.join(DIRETORIO_DATASET_SANDBOX, nome)
+        if nome.isdigit() and _processo_ativo(int(nome)):
+            continue
+        if os.path.isdir(caminho):
+            shutil.rmtree(caminho, ignore_errors=True)
+        else:
+            _remove_arquivo(caminho)
+
+def publica_dataset_compartilhado(df):
+    """
+    Grava (uma vez por versão do df) o dataset em formato Arrow IPC sem compressão, para
+    que os processos do sandbox o abram por memory map sem cópia pelo Streamlit.
+    O arquivo é removido quando a versão muda ou quando o df deixa de existir (fim da sessão).
+    Retorna o caminho do arquivo ou None se o df não puder ser convertido para Arrow.
+    """
+    registro = versao_dataset(df)
+    if registro['caminho'] is not None:
+        return registro['caminho']
+
+    try:
+        import pyarrow as pa
+        from pyarrow import feather
+
+        diretorio = os.path.join(DIRETORIO_DATASET_SANDBOX, str(os.getpid()))
+        os.makedirs(diretorio, exist_ok=True)
+        caminho = os.path.join(diretorio, f"dataset_{uuid.uuid4().hex}.arrow")
+        feather.write_feather(pa.Table.from_pandas(df, preserve_index=True), caminho, compression='uncompressed')
+    except Exception as e:
+        logger.warning("Dataset não publicado para o sandbox (%s); execução no próprio processo.", e)
+        return None
+
+    registro['caminho'] = caminho
+    weakref.finalize(df, _remove_arquivo, caminho)
+    return caminho
+
+def carrega_dataset_compartilhado(caminho, copia=False):
+    """
+    (Processo do sandbox) Abre o arquivo Arrow por memory map, mantendo a tabela da
+    última versão, e monta o DataFrame da consulta. Sem 'copia', colunas numéricas sem
+    nulos apontam para as páginas mapeadas (somente leitura).
+    """
+    global _tabela_processo
+    import pyarrow as pa
+
+    if _tabela_processo is None or _tabela_processo[0] != caminho:
+        _tabela_processo = None
+        with pa.memory_map(caminho, 'r') as origem:
+            _tabela_processo = (caminho, pa.ipc.open_file(origem).read_all())
+
+    tabela = _tabela_processo[1]
+    if copia:
+        return tabela.to_pandas()
+    return tabela.to_pandas(split_blocks=True)
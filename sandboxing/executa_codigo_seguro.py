@@ -1,62 +1,65 @@
-import io
-import contextlib
-import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
-from helpers.normalize_text import normalize_text
+import streamlit as st
+from sandboxing.executa_codigo_local import executa_codigo_local
+from sandboxing.dataset_compartilhado import publica_dataset_compartilhado, versao_dataset
+from sandboxing.cache_resultados_sandbox import cache_resultados_sandbox, chave_codigo
+from sandboxing.pool_sandbox import (
+    LIMITE_MEMORIA_SANDBOX_MB,
+    LIMITE_TEMPO_SANDBOX,
+    NUM_PROCESSOS_SANDBOX,
+    executa_codigo_pool,
+    obtem_pool_sandbox
+)
 
-def executa_codigo_seguro(codigo, df):
-    """Executa o código Pandas/Matplotlib gerado em um ambiente isolado."""
-    if codigo.startswith("Erro:"):
-        return codigo, None, None, None
+def aquece_sandbox():
+    """Cria o pool do sandbox (processos importam as bibliotecas em paralelo ao uso do app)."""
+    num_processos = st.session_state.get('sandbox_num_processos', NUM_PROCESSOS_SANDBOX)
+    if num_processos > 0:
+        obtem_pool_sandbox(num_processos, st.session_state.get('sandbox_limite_memoria_mb', LIMITE_MEMORIA_SANDBOX_MB))
 
-    output_stream = io.StringIO()
-    local_vars = {'df': df, 'pd': pd, 'plt': plt, 'normalize_text': normalize_text, 'np': np} # Adiciona np
-    img_bytes = None
+def _executa_codigo(codigo, df):
+    num_processos = st.session_state.get('sandbox_num_processos', NUM_PROCESSOS_SANDBOX)
+    if num_processos > 0:
+        caminho_dataset = publica_dataset_compartilhado(df)
+        if caminho_dataset is not None:
+            return executa_codigo_pool(
+                codigo,
+                caminho_dataset,
+                num_processos,
+                st.session_state.get('sandbox_limite_tempo', LIMITE_TEMPO_SANDBOX),
+                st.session_state.get('sandbox_limite_memoria_mb', LIMITE_MEMORIA_SANDBOX_MB)
+            )
 
-    try:
-        with contextlib.redirect_stdout(output_stream):
-            # Adiciona o df de forma segura para o exec
-            local_vars['df'] = df.copy() 
-            exec(codigo, {"__builtins__": __builtins__}, local_vars)
-        
-        # --- Lógica Aprimorada de Captura de Gráfico ---
-        # Captura apenas a primeira figura (esperamos que seja a figura com todos os subplots)
-        if len(plt.get_fignums()) > 0:
-            for fig_num in plt.get_fignums():
-                plt.figure(fig_num)
-                buf = io.BytesIO()
-                
-                # Garante que layout está ajustado para subplots
-                try:
-                    plt.tight_layout()
-                except Exception:
-                    pass
-                    
-                plt.savefig(buf, format="png")
-                img_bytes = buf.getvalue()
-                buf.close()
-                plt.close(fig_num)
-                break
-        
-        resultado_texto = output_stream.getvalue().strip()
-        resultado_df = local_vars.get('resultado_df')
+    return executa_codigo_local(codigo, df.copy())
 
-        # Normaliza Series para DataFrame
-        if isinstance(resultado_df, pd.Series):
-            resultado_df = resultado_df.reset_index()
-            if len(resultado_df.columns) == 2 and 'index' in resultado_df.columns:
-                resultado_df.columns = ['Categoria', 'Valor']
-        
-        # BLOCO CRÍTICO: GARANTE QUE TODO TEXTO SEJA CONVERTIDO EM DATAFRAME (TABELA)
-        if resultado_df is None and resultado_texto and not img_bytes:
-            # Cria um DataFrame de 1x1 com a resposta textual
-            resultado_df = pd.DataFrame({'INFORMAÇÃO': [resultado_texto]})
-            # Limpa o resultado_texto para que o Streamlit priorize resultado_df
-            resultado_texto = ""
+def executa_codigo_seguro(codigo, df):
+    """
+    Executa o código Pandas/Matplotlib gerado em um ambiente isolado: um processo do pool
+    do sandbox, que lê o dataset por memory map (Arrow) e tem limites de tempo e memória.
+    Com sandbox_num_processos = 0 (ou df não convertível para Arrow) executa no próprio
+    processo sobre uma cópia do df.
+    Resultados sem erro ficam no cache da versão do dataset (chave: hash do código), de
+    modo que repetir uma consulta não executa o código de novo.
+    Retorna (resultado_texto, resultado_df, erro, img_bytes).
+    """
+    if codigo.startswith("Erro:"):
+        return codigo, None, None, None
 
-        return resultado_texto, resultado_df, None, img_bytes
+    registro = versao_dataset(df)
+    cache = cache_resultados_sandbox((registro['versao'], registro['linhas']))
+    chave = chave_codigo(codigo)
+    stats = st.session_state.get('cache_sandbox_stats') or {'acertos': 0, 'faltas': 0}
+    st.session_state['cache_sandbox_stats'] = stats
+    if chave in cache:
+        stats['acertos'] += 1
+        return cache[chave]
 
-    except Exception as e:
-        error_message = f"Erro ao executar o código gerado pela IA:\n\n{e}\n\nCódigo que falhou:\n```python\n{codigo}\n```"
-        return error_message, None, error_message, None
\ No newline at end of file
+    stats['faltas'] += 1
+    resultado = _executa_codigo(codigo, df)
+    # Erros (inclusive tempo limite) podem ser transitórios: não entram no cache
+    if resultado[2] is None:
+        try:
+            cache[chave] = resultado
+        except ValueError:
+            # Resultado maior que o cache inteiro
+            pass
+    return resultado
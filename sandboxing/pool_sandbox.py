@@ -0,0 +1,134 @@
+import os
+import queue
+import logging
+import multiprocessing
+import streamlit as st
+from sandboxing.dataset_compartilhado import limpa_datasets_orfaos
+
+logger = logging.getLogger(__name__)
+
+# Processos pré-aquecidos do sandbox (0 = executa no próprio processo do Streamlit)
+NUM_PROCESSOS_SANDBOX = 2
+# Tempo máximo (s) de uma execução; ao exceder, o processo é encerrado e recriado
+LIMITE_TEMPO_SANDBOX = 60
+# Memória (MB) que o código pode alocar além do uso do processo após o aquecimento
+LIMITE_MEMORIA_SANDBOX_MB = 2048
+# Tempo máximo (s) para um processo novo terminar os imports
+TEMPO_AQUECIMENTO_SANDBOX = 120
+
+def _memoria_dados_atual():
+    """Segmento de dados (heap e mapeamentos privados, em bytes) do processo atual, via /proc (Linux)."""
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[5]) * os.sysconf("SC_PAGE_SIZE")
+
+def _limita_memoria(limite_memoria_mb):
+    """
+    Limita a memória alocada pelo código (RLIMIT_DATA). Diferente de RLIMIT_AS, não conta
+    o arquivo Arrow mapeado somente leitura: um dataset grande não esgota o limite.
+    """
+    try:
+        import resource
+
+        limite = _memoria_dados_atual() + limite_memoria_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_DATA, (limite, limite))
+    except (ImportError, AttributeError, OSError, ValueError) as e:
+        # Sem 'resource' ou /proc (ex.: Windows) vale apenas o limite de tempo
+        logger.warning("Limite de memória do sandbox indisponível: %s", e)
+
+def _erro_sandbox(codigo, motivo):
+    mensagem = f"Erro ao executar o código gerado pela IA:\n\n{motivo}\n\nCódigo que falhou:\n```python\n{codigo}\n```"
+    return mensagem, None, mensagem, None
+
+def _processo_sandbox(conexao, limite_memoria_mb):
+    """
+    Laço de um processo do sandbox: importa as bibliotecas uma vez, avisa que está
+    pronto e executa cada (codigo, caminho_dataset) recebido até receber None.
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    # Importado (e o alocador do Arrow iniciado) antes do limite: as arenas reservadas
+    # pelo alocador não contam como memória do código
+    import pyarrow as pa
+    pa.table({'aquecimento': [0.0]}).to_pandas()
+    from sandboxing.executa_codigo_local import executa_codigo_local
+    from sandboxing.dataset_compartilhado import carrega_dataset_compartilhado
+
+    _limita_memoria(limite_memoria_mb)
+    conexao.send('pronto')
+
+    while True:
+        tarefa = conexao.recv()
+        if tarefa is None:
+            break
+        codigo, caminho = tarefa
+        try:
+            resultado = executa_codigo_local(codigo, carrega_dataset_compartilhado(caminho))
+            # Colunas mapeadas são somente leitura: se o código as alterou, repete com cópia
+            if resultado[2] and "read-only" in resultado[2]:
+                resultado = executa_codigo_local(codigo, carrega_dataset_compartilhado(caminho, copia=True))
+        except MemoryError:
+            resultado = _erro_sandbox(codigo, f"limite de memória do sandbox ({limite_memoria_mb} MB) excedido.")
+        except Exception as e:
+            # Arquivo do dataset removido ou ilegível: responde com o erro em vez de encerrar o processo
+            resultado = _erro_sandbox(codigo, f"o dataset do sandbox não pôde ser aberto ({e}).")
+        plt.close('all')
+        try:
+            conexao.send(resultado)
+        except Exception as e:
+            # Resultado que não pode ser serializado (ex.: objetos arbitrários em resultado_df)
+            conexao.send(_erro_sandbox(codigo, f"resultado não pôde ser enviado pelo sandbox: {e}"))
+
+def _inicia_processo(limite_memoria_mb):
+    contexto = multiprocessing.get_context('spawn')
+    conexao, conexao_processo = contexto.Pipe()
+    processo = contexto.Process(target=_processo_sandbox, args=(conexao_processo, limite_memoria_mb), daemon=True)
+    processo.start()
+    conexao_processo.close()
+    return {'processo': processo, 'conexao': conexao, 'pronto': False}
+
+def _encerra_processo(trabalhador):
+    processo = trabalhador['processo']
+    if processo.is_alive():
+        processo.kill()
+    processo.join(timeout=5)
+    trabalhador['conexao'].close()
+
+@st.cache_resource
+def obtem_pool_sandbox(num_processos, limite_memoria_mb):
+    """Cria (uma única vez por configuração) o pool de processos do sandbox, compartilhado entre as sessões."""
+    limpa_datasets_orfaos()
+    livres = queue.Queue()
+    for _ in range(num_processos):
+        livres.put(_inicia_processo(limite_memoria_mb))
+    return {'livres': livres, 'limite_memoria_mb': limite_memoria_mb}
+
+def executa_codigo_pool(codigo, caminho_dataset, num_processos, limite_tempo, limite_memoria_mb):
+    """
+    Executa o código em um processo livre do pool (espera se todos estiverem ocupados).
+    Se o processo exceder o tempo ou morrer (ex.: limite de memória), é encerrado e
+    substituído por um novo. Retorna (resultado_texto, resultado_df, erro, img_bytes).
+    """
+    pool = obtem_pool_sandbox(num_processos, limite_memoria_mb)
+    trabalhador = pool['livres'].get()
+    motivo = None
+    try:
+        if not trabalhador['pronto']:
+            if not trabalhador['conexao'].poll(TEMPO_AQUECIMENTO_SANDBOX):
+                raise EOFError("processo do sandbox não iniciou")
+            trabalhador['conexao'].recv()
+            trabalhador['pronto'] = True
+
+        trabalhador['conexao'].send((codigo, caminho_dataset))
+        if trabalhador['conexao'].poll(limite_tempo):
+            return trabalhador['conexao'].recv()
+        motivo = f"tempo limite de execução do sandbox ({limite_tempo} s) excedido."
+    except (EOFError, OSError) as e:
+        motivo = f"o processo do sandbox foi encerrado ({str(e) or 'limite de memória excedido?'})."
+    finally:
+        if motivo is not None:
+            logger.warning("Sandbox: %s Recriando o processo.", motivo)
+            _encerra_processo(trabalhador)
+            trabalhador = _inicia_processo(limite_memoria_mb)
+        pool['livres'].put(trabalhador)
+    return _erro_sandbox(codigo, motivo)
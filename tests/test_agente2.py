@@ -0,0 +1,27 @@
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+from modules.perfil_colunas import atualiza_perfil
+from agents.agente2 import agente2_gera_codigo_pandas_eda
+from sandboxing.executa_codigo_local import executa_codigo_local
+
+def test_histograma_usa_perfil():
+    df = pd.DataFrame({'Amount': np.linspace(0, 100, 1000), 'V1': np.random.default_rng(0).normal(size=1000), 'Tipo': ['a', 'b'] * 500})
+    codigo, conclusoes = agente2_gera_codigo_pandas_eda("Faça um histograma das colunas", "chave", df, perfil=atualiza_perfil(None, df))
+    assert "histogramas = {'Amount'" in codigo and "'Tipo'" not in codigo
+    assert "perfil" in conclusoes
+
+    local = {}
+    exec(codigo, {'plt': plt}, local)
+    plt.close('all')
+    bordas, contagens = local['histogramas']['Amount']
+    assert sum(contagens) == len(df)
+    assert len(bordas) == len(contagens) + 1
+
+    resultado_texto, _, erro, img_bytes = executa_codigo_local(codigo, df)
+    assert erro is None and img_bytes
+
+def test_histograma_sem_perfil_varre_df():
+    df = pd.DataFrame({'Amount': [1.0, 2.0, 3.0]})
+    codigo, _ = agente2_gera_codigo_pandas_eda("Faça um histograma das colunas", "chave", df)
+    assert "histogramas =" not in codigo and "axes[i].hist(df[col]" in codigo
@@ -0,0 +1,59 @@
+import pandas as pd
+import pytest
+import streamlit as st
+from modules.perfil_colunas import atualiza_perfil
+from agents.agente_consulta_unica import agente_consulta_unica, preenche_modelo_conclusao
+from helpers.modelo_gemini_stub import ModeloGeminiStub
+
+@pytest.fixture
+def df():
+    return pd.DataFrame({'Amount': [10.0, 20.0, 30.0], 'Class': [0, 1, 1]})
+
+@pytest.fixture(autouse=True)
+def sem_cache_llm():
+    # Testes herméticos: sem o cache persistente de respostas
+    st.session_state['cache_llm_ativo'] = False
+    yield
+    st.session_state.clear()
+
+RESPOSTA_VALIDA = {
+    'pergunta_clarificada': "Qual a média de Amount?",
+    'codigo': "```python\nresultado_df = pd.DataFrame({'media': [df['Amount'].mean()]})\n```",
+    'modelo_conclusao': "A média de Amount é {valor}."
+}
+
+def test_consulta_unica_com_modelo_injetado(df):
+    model = ModeloGeminiStub(RESPOSTA_VALIDA)
+    resposta = agente_consulta_unica("qual a media de amont", None, df, perfil=atualiza_perfil(None, df), model=model)
+    assert resposta['pergunta_clarificada'] == "Qual a média de Amount?"
+    assert resposta['codigo'].startswith("resultado_df =")
+    assert len(model.chamadas) == 1
+    prompt, generation_config = model.chamadas[0]
+    assert "qual a media de amont" in prompt
+    assert generation_config['response_mime_type'] == 'application/json'
+    # Tokens registrados por gera_texto_gemini, com o detalhamento do orçamento
+    registro = st.session_state['log_tokens_prompt'][-1]
+    assert registro['prompt'] == 'consulta_unica' and not registro['cache']
+    assert registro['total'] > 0 and 'esquema' in registro
+
+@pytest.mark.parametrize("texto", [
+    "isto não é JSON",
+    '{"pergunta_clarificada": "x", "codigo": "print(1)"}',
+    '{"pergunta_clarificada": "x", "codigo": "   ", "modelo_conclusao": "y"}',
+    '["pergunta", "codigo", "modelo"]',
+])
+def test_consulta_unica_resposta_malformada(df, texto):
+    assert agente_consulta_unica("pergunta", None, df, model=ModeloGeminiStub(texto)) is None
+
+@pytest.mark.parametrize("modelo, esperado", [
+    ("A média é {valor}.", "A média é 20."),
+    ("A média é {valor:.2f} em {num_linhas} linha(s).", "A média é 20 em 1 linha(s)."),
+    ("Média: {media!r}; classe: {Class}.", "Média: 20; classe: 1."),
+    ("Valor desconhecido: {mediana} e {}.", "Valor desconhecido: {mediana} e {}."),
+])
+def test_preenche_modelo_conclusao(modelo, esperado):
+    resultado_df = pd.DataFrame({'media': [20.0], 'Class': [1]})
+    assert preenche_modelo_conclusao(modelo, "", resultado_df) == esperado
+
+def test_preenche_modelo_conclusao_sem_tabela():
+    assert preenche_modelo_conclusao("Total: {valor} ({num_linhas}).", "42\noutra linha", None) == "Total: 42 (0)."
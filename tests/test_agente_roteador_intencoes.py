@@ -0,0 +1,53 @@
+import pandas as pd
+import pytest
+from modules.perfil_colunas import atualiza_perfil
+from agents.agente_roteador_intencoes import agente_roteador_intencoes
+
+@pytest.fixture
+def df():
+    return pd.DataFrame({
+        'Time': [0, 1, 2, 3, 4, 5],
+        'Amount': [10.0, 20.0, None, 40.0, 50.0, 60.0],
+        'Tipo': ['a', 'b', 'a', 'b', 'a', 'b'],
+        'Class': [0, 0, 0, 0, 1, 1],
+    })
+
+# (pergunta, intenção esperada ou None quando a pergunta deve seguir para o Gemini)
+DECISOES = [
+    ("Quantas linhas tem o dataset?", 'formato'),
+    ("Quantos registros existem?", 'formato'),
+    ("Quantos registros têm Class igual a 1?", None),
+    ("Quantas linhas com Amount maior que 100?", None),
+    ("Quantas linhas têm Amount > 50?", None),
+    ("Quantos registros existem em 2023?", None),
+    ("Quais colunas têm valores nulos?", 'nulos'),
+    ("Quantos valores nulos tem a coluna Amount?", 'nulos'),
+    ("Valores nulos de Amount quando Class igual a 1", None),
+    ("Me dê as estatísticas descritivas", 'estatisticas'),
+    ("Qual a frequência de Tipo?", 'contagem_valores'),
+    ("Qual a frequência?", None),
+    ("O dataset está balanceado?", 'balanco_classes'),
+    ("Qual a correlação entre Time e Amount?", 'correlacao'),
+    ("Top 3 maiores Amount", 'top_n'),
+    ("Qual a média de Amount por Tipo?", 'media_por_grupo'),
+    ("Faça um histograma de Amount", None),
+    ("Quantas linhas e qual a correlação entre Time e Amount?", None),
+]
+
+@pytest.mark.parametrize("pergunta, esperada", DECISOES)
+def test_decisoes_do_roteador(df, pergunta, esperada):
+    codigo, conclusoes, intencao = agente_roteador_intencoes(pergunta, df)
+    assert intencao == esperada
+    assert (codigo is None) == (esperada is None)
+
+def test_nulos_filtra_colunas_citadas(df):
+    for perfil in (None, atualiza_perfil(None, df)):
+        codigo, _, intencao = agente_roteador_intencoes("Quantos valores nulos tem a coluna Amount?", df, perfil)
+        assert intencao == 'nulos'
+        assert "Amount" in codigo
+        assert "Tipo" not in codigo and "Class" not in codigo
+
+def test_formato_retorna_dimensoes(df):
+    codigo, conclusoes, _ = agente_roteador_intencoes("Quantas linhas tem o dataset?", df)
+    assert "6 linhas e 4 colunas" in conclusoes
+    assert "df.shape" in codigo